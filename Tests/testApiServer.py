@@ -0,0 +1,216 @@
+#!/usr/bin/python3
+"""TEST api server with a backend stand-in: no database required """
+import asyncio, importlib.util, json, os, shutil, sys, tempfile, threading, time
+import unittest
+from contextlib import nullcontext
+from pathlib import Path
+from types import SimpleNamespace
+from urllib import request
+from urllib.error import HTTPError
+from apiServer import ApiServer, readToken
+from backend import Pasta
+
+class Session:
+  """
+  stand-in of database session: _changes feed with one change (ids and revisions only), afterwards empty long
+  polls; _find with fields of document
+  """
+  def __init__(self):
+    self.results = [{'seq':'1-a', 'id':'x-0', 'changes':[{'rev':'1-abc'}]}]
+    self.doc = {'_id':'x-0', '-type':['x0'], '-branch':[{'stack':[], 'path':'p'}], 'image':'data:image/png;base64,'}
+
+  def get(self, url, params):  # pylint: disable=unused-argument
+    """ reply of long poll """
+    assert 'include_docs' not in params
+    if not self.results:
+      time.sleep(0.1)
+    results, self.results = self.results, []
+    return SimpleNamespace(raise_for_status=lambda: None,
+                           json=lambda: {'results':results, 'last_seq':params['since']})
+
+  def post(self, url, json):  # pylint: disable=unused-argument,redefined-outer-name
+    """ reply of _find: only requested fields """
+    docs = [{key:value for key,value in self.doc.items() if key in json['fields']}]
+    return SimpleNamespace(raise_for_status=lambda: None, json=lambda: {'docs':docs})
+
+
+class Backend:
+  """
+  stand-in of backend: documents in dictionary, scan waits for event
+  """
+  def __init__(self):
+    self.docs = {}
+    self.scanRunning, self.scanDone = threading.Event(), threading.Event()
+    self.db = SimpleNamespace(client=SimpleNamespace(r_session=Session()), db=SimpleNamespace(database_url=''))
+
+  def output(self, docType, printID=False):  # pylint: disable=unused-argument
+    """ table of documents of this docType """
+    return '\n'.join(i['-name'] for i in self.docs.values() if i['-type'][0]==docType)
+
+  def changeHierarchy(self, docID, ctx):
+    """ change into project """
+    ctx.hierStack.append(docID)
+
+  def outputHierarchy(self, onlyHierarchy, addID, ctx):  # pylint: disable=unused-argument
+    """ hierarchy of project """
+    return ' '.join(ctx.hierStack)
+
+  def addData(self, docType, doc, ctx):
+    """ add document """
+    ctx.currentID = 'x-'+str(len(self.docs))
+    self.docs[ctx.currentID] = dict(doc, **{'-type':[docType]})
+    return True
+
+  def scanTree(self, ctx):  # pylint: disable=unused-argument
+    """ long scan """
+    self.scanRunning.set()
+    self.scanDone.wait(10)
+    return True
+
+
+class ExtractorBackend(Backend):
+  """
+  stand-in of backend with extractors of Pasta: file of document is read by extractor
+  """
+  useExtractors = Pasta.useExtractors
+
+  def __init__(self, basePath):
+    super().__init__()
+    self.basePath = self.extractorPath = basePath
+    self.ctx = None
+    self.db.updateDoc = lambda change, docID: self.docs[docID].update(change)
+
+  def getDoc(self, docID):
+    """ document of database """
+    return self.docs[docID]
+
+
+EXTRACTOR = """
+def use(filePath, recipe):
+  return {'image':'<svg>'+str(len(filePath.read_text().splitlines()))+' lines</svg>', 'recipe':recipe+'/lines',
+          'metaVendor':{}, 'metaUser':{}}
+"""
+
+
+class TestStringMethods(unittest.TestCase):
+  """
+  derived class for this test
+  """
+  def startServer(self, be):
+    """
+    start api server in event loop of other thread; stopped at end of test
+
+    Args:
+      be (Backend): backend of all requests
+
+    Returns:
+      tuple: server, url, function(route, data, **changedHeaders) that calls server and returns json reply
+    """
+    os.environ['PASTA_CACHE_DIR'] = tempfile.mkdtemp()  #token is written there
+    self.addCleanup(shutil.rmtree, os.environ['PASTA_CACHE_DIR'])
+    self.addCleanup(os.environ.pop, 'PASTA_CACHE_DIR')
+    server = ApiServer(backendFactory=lambda _: nullcontext(be))
+    loop = asyncio.new_event_loop()
+    loopThread = threading.Thread(target=loop.run_forever, daemon=True)
+    loopThread.start()
+    def stop():
+      asyncio.run_coroutine_threadsafe(server.stop(), loop).result(5)
+      loop.call_soon_threadsafe(loop.stop)
+      loopThread.join(5)
+      loop.close()
+      server.exit()
+    self.addCleanup(stop)
+    port = asyncio.run_coroutine_threadsafe(server.start('127.0.0.1', 0), loop).result().sockets[0].getsockname()[1]
+    url = 'http://127.0.0.1:'+str(port)+'/'
+    headers = {'X-Pasta-Token':readToken(), 'Content-Type':'application/json'}
+
+    def call(route, data=None, **changedHeaders):
+      body = None if data is None else json.dumps(data).encode('utf-8')
+      theHeaders = {key:value for key,value in dict(headers, **changedHeaders).items() if value is not None}
+      with request.urlopen(request.Request(url+route, data=body, headers=theHeaders), timeout=5) as reply:
+        return json.loads(reply.read())
+    return server, url, call
+
+
+  def test_main(self):
+    """
+    main function
+    """
+    be = Backend()
+    server, url, call = self.startServer(be)
+    headers = {'X-Pasta-Token':readToken()}
+
+    # only local clients with token and json body: not web pages the user opens
+    createDoc = {'database':'test', 'doc':{'docType':'x0', '-name':'Created by web page'}}
+    for changedHeaders, status in [({'Host':'evil.example.com'}, 403), ({'Origin':'http://evil.example.com'}, 403),
+                                   ({'X-Pasta-Token':None}, 401), ({'X-Pasta-Token':'guess'}, 401),
+                                   ({'Content-Type':'text/plain'}, 415)]:
+      with self.assertRaises(HTTPError) as error:
+        call('createDoc', createDoc, **changedHeaders)
+      self.assertEqual(error.exception.code, status)
+    self.assertEqual(be.docs, {})
+    self.assertEqual(oct((Path(os.environ['PASTA_CACHE_DIR'])/'apiToken').stat().st_mode & 0o777), '0o600')
+
+    reply = call('createDoc', {'database':'test', 'doc':{'docType':'x0', '-name':'Intermetals at interfaces'}})
+    self.assertEqual(reply, {'result':True, 'docID':'x-0'})
+    self.assertEqual(call('print?label=x0'), {'output':'Intermetals at interfaces'})
+    self.assertEqual(call('hierarchy?docID=x-0'), {'output':'x-0'})
+    with self.assertRaises(HTTPError) as error:
+      call('print', {'label':'x0'})
+    self.assertEqual(error.exception.code, 405)
+    with self.assertRaises(HTTPError) as error:
+      call('hierarchy')
+    self.assertEqual(error.exception.code, 400)
+
+    # reads are not queued behind long scan
+    scanReply = []
+    scan = threading.Thread(target=lambda: scanReply.append(call('scanHierarchy', {'docID':'x-0'})))
+    scan.start()
+    self.assertTrue(be.scanRunning.wait(5))
+    start = time.time()
+    self.assertEqual(call('print?label=x0'), {'output':'Intermetals at interfaces'})
+    self.assertLess(time.time()-start, 1)
+    self.assertEqual(scanReply, [])
+    be.scanDone.set()
+    scan.join()
+    self.assertEqual(scanReply, [{'result':True}])
+
+    # change events as server-sent events
+    with request.urlopen(request.Request(url+'changes', headers=headers), timeout=5) as reply:
+      self.assertEqual(reply.headers['Content-Type'], 'text/event-stream')
+      event = json.loads(reply.readline().decode('utf-8')[len('data: '):])
+    self.assertEqual(event, {'seq':'1-a', 'id':'x-0', 'type':'x0', 'stack':[], 'op':'c'})
+
+    # open event stream ends when server stops
+    stream = request.urlopen(request.Request(url+'changes', headers=headers), timeout=5)  # pylint: disable=consider-using-with
+    self.doCleanups()
+    self.assertEqual(server.streams, set())
+    self.assertEqual(stream.read(), b'')
+    stream.close()
+    return
+
+
+  @unittest.skipUnless(importlib.util.find_spec('datalad'), 'datalad is not installed')
+  def test_redo(self):
+    """
+    redo extraction: extractor reads file at path of document
+    """
+    with tempfile.TemporaryDirectory() as tempDir:
+      basePath = Path(tempDir)
+      (basePath/'project').mkdir()
+      (basePath/'project'/'data.csv').write_text('1,2\n3,4\n', encoding='utf-8')
+      (basePath/'extractor_csv.py').write_text(EXTRACTOR, encoding='utf-8')
+      sys.path.append(tempDir)
+      self.addCleanup(sys.path.remove, tempDir)
+      be = ExtractorBackend(basePath)
+      be.docs['m-0'] = {'_id':'m-0', '-type':['measurement'], 'shasum':'abc', 'image':'',
+                        '-branch':[{'stack':['x-0'], 'path':'project/data.csv'}]}
+      _, _, call = self.startServer(be)
+      self.assertEqual(call('redo', {'docID':'m-0', 'docType':'measurement/csv'}), {'result':True})
+      self.assertEqual(be.docs['m-0']['image'], '<svg>2 lines</svg>')
+      self.assertEqual(be.docs['m-0']['-type'], ['measurement', 'csv', 'lines'])
+    return
+
+
+if __name__ == '__main__':
+  unittest.main()
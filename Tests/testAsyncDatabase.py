@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+"""TEST asynchronous reads with a database stand-in: no database required """
+import asyncio, threading
+import unittest
+from types import SimpleNamespace
+from asyncDatabase import AsyncDatabase
+
+class Session:
+  """
+  stand-in of database session: counts requests at the same time; the first ones wait until 4 are in flight
+  """
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.inFlight, self.maxInFlight = 0, 0
+    self.overlap = threading.Event()
+
+  def request(self, method, url, params=None, json=None):  # pylint: disable=unused-argument
+    """ reply of documents and views """
+    with self.lock:
+      self.inFlight += 1
+      self.maxInFlight = max(self.maxInFlight, self.inFlight)
+      if self.inFlight==4:
+        self.overlap.set()
+    self.overlap.wait(5)
+    with self.lock:
+      self.inFlight -= 1
+    if url.endswith('/_all_docs'):
+      content = {'rows':[{'key':i, 'doc':{'_id':i}} for i in json['keys'] if i!='x-9']}
+    elif '/_view/' in url:
+      content = {'rows':[{'id':'x-1', 'key':params['key'], 'value':[]}]}
+    else:
+      content = {'_id':url.split('/')[-1]}
+    return SimpleNamespace(status_code=200, json=lambda: content)
+
+
+class TestStringMethods(unittest.TestCase):
+  """
+  derived class for this test
+  """
+  def test_main(self):
+    """
+    main function
+    """
+    db = SimpleNamespace(client=SimpleNamespace(r_session=Session()), db=SimpleNamespace(database_url='http://db'),
+                         views={'viewHierarchy/viewPaths':SimpleNamespace(url='http://db/_design/viewHierarchy/_view/viewPaths')})
+    async def main():
+      async with AsyncDatabase(db, concurrency=4) as adb:
+        return await asyncio.gather(adb.getDocs(['x-1', 'x-9']),
+                                    adb.getView('viewHierarchy/viewPaths', preciseKey='p1'),
+                                    *[adb.request('GET', 'http://db/x-'+str(i)) for i in range(4)])
+    results = asyncio.run(main())
+    self.assertEqual(db.client.r_session.maxInFlight, 4)   #6 requests: overlap, at most 4 at the same time
+    self.assertEqual(results[0], {'x-1':{'_id':'x-1'}, 'x-9':None})
+    self.assertEqual(results[1], [{'id':'x-1', 'key':'"p1"', 'value':[]}])
+    self.assertEqual(results[2], (200, {'_id':'x-0'}))
+    return
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+"""TEST native python commonTools against the js2py translation: no database required """
+import json, re, warnings
+import unittest
+from pathlib import Path
+from commonToolsPy import getCommonTools
+
+class TestStringMethods(unittest.TestCase):
+  """
+  derived class for this test
+  """
+  def test_main(self):
+    """
+    main function
+    """
+    warnings.filterwarnings('ignore', module='js2py')
+    cTpy = getCommonTools('python')
+    cTjs = getCommonTools('js')
+
+    ### SIMPLE FUNCTIONS
+    for text in ['Intermetals at interfaces', 'Task 1: a-b_c', 'Ärger über  Straße', '', ' 12 tall Cats ']:
+      self.assertEqual(cTpy.camelCase(text), cTjs.camelCase(text), 'camelCase: '+text)
+    self.assertIsNotNone(re.match(r'^[0-9a-f]{32}$', cTpy.uuidv4()), 'uuidv4')
+    ids = [cTpy.timeOrderedID() for _ in range(1000)]
+    self.assertTrue(all(re.match(r'^[0-9a-f]{32}$', i) for i in ids), 'timeOrderedID')
+    self.assertEqual(ids, sorted(set(ids)), 'timeOrderedID: unique and ordered')
+
+    ### ONTOLOGY
+    with open(Path(__file__).parent.parent/'ontology.json', 'r', encoding='utf-8') as fIn:
+      ontology = json.load(fIn)
+    tableFormat = {'x0':{'-label-':'Projects'}, 'measurement':{'-label-':'Measurements'}}
+    self.assertEqual(cTpy.ontology2Labels(ontology, tableFormat), cTjs.ontology2Labels(ontology, tableFormat))
+
+    ### DOCUMENTS BEFORE CREATION
+    docs = [({'-name':'Big project', 'comment':'#TODO first #3 :area:12.5: rest', 'status':None}, 'x0'),
+            ({'-name':'file.txt', 'comment':'  :a:1e3: :b:0x1F: :c:-Infinity: text ', '-tags':['#P1']}, 'measurement'),
+            ({'-name':'sample', 'comment':'#_tag #Ünicode', 'qrCode':'13 14'}, 'sample'),
+            ({'-name':'procedure', 'comment':'', 'image':'', '-type':['procedure']}, '--')]
+    for doc, docType in docs:
+      resultPy = cTpy.fillDocBeforeCreate(dict(doc), docType)
+      resultJs = cTjs.fillDocBeforeCreate(dict(doc), docType)
+      for result in (resultPy, resultJs):
+        if '_id' in result:
+          self.assertIsNotNone(re.match(r'^[a-z\-]-[0-9a-f]{32}$', result.pop('_id')), '_id')
+        #js2py formats milliseconds below 100 with two digits: .050 -> .50
+        digits = r'\d{3}' if result is resultPy else r'\d{2,3}'
+        self.assertIsNotNone(re.match(r'^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.'+digits+'Z$', result.pop('-date')), '-date')
+      self.assertEqual(resultPy, resultJs, 'fillDocBeforeCreate: '+str(doc))
+
+    ### HIERARCHY: TO STRING AND BACK
+    def branch(stack, path):
+      return [{'stack':stack, 'child':0, 'path':path, 'op':''}]
+    allDocs = {'x-1':{'-name':'Project', 'tags':['#P1','#pretty'], 'objective':'Test', 'comment':'line1\nline2',
+                      '-branch':branch([], 'project')},
+               'x-2':{'-name':'Task one', 'tags':[], 'comment':'', '-branch':branch(['x-1'], 'project/taskOne')},
+               'x-3':{'-name':'Task two', 'tags':['#TODO','#3'], 'comment':'finish',
+                      '-branch':branch(['x-1'], 'project/taskTwo')},
+               'm-4':{'-name':'data.csv', 'tags':['_curated'], 'comment':'a :b:1:',
+                      '-branch':branch(['x-1','x-2'], 'project/taskOne/data.csv')}}
+    view = {'x-1':['x-1', 0, ['x0'], 'Project'],
+            'x-2':['x-1 x-2', 0, ['x1'], 'Task one'],
+            'x-3':['x-1 x-3', 1, ['x1'], 'Task two'],
+            'm-4':['x-1 x-2 m-4', 0, ['measurement'], 'data.csv']}
+    magicTags = ['P1','P2','TODO','WAIT','DONE']
+    for addID in [True, False]:
+      for detail in ['all','tags','none']:
+        stringPy = cTpy.hierarchy2String(view, addID, allDocs.get, detail, magicTags)
+        stringJs = cTjs.hierarchy2String(view, addID, allDocs.get, detail, magicTags)
+        self.assertEqual(stringPy, stringJs, 'hierarchy2String: '+str(addID)+' '+detail)
+        self.assertEqual(cTpy.editString2Docs(stringPy, magicTags), cTjs.editString2Docs(stringJs, magicTags),
+                         'editString2Docs: '+str(addID)+' '+detail)
+    hierTree = cTpy.hierarchy2String(view, True, None, 'none', None)
+    for docID in view:
+      self.assertEqual(cTpy.getChildren(hierTree, docID), cTjs.getChildren(hierTree, docID), 'getChildren '+docID)
+    return
+
+
+if __name__ == '__main__':
+  unittest.main()
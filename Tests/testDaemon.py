@@ -0,0 +1,39 @@
+#!/usr/bin/python3
+"""TEST client of backend daemon: busy or hanging daemon does not block pastaELN.py """
+import socket, tempfile, threading, time
+import unittest
+from pathlib import Path
+from daemon import DaemonServer, sendCommand
+
+class TestStringMethods(unittest.TestCase):
+  """
+  derived class for this test
+  """
+  def test_main(self):
+    """
+    main function
+    """
+    with tempfile.TemporaryDirectory() as tempDir:
+      # daemon that accepts, but never answers
+      socketPath = Path(tempDir)/'hanging.sock'
+      with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as hanging:
+        hanging.bind(str(socketPath))
+        hanging.listen()
+        start = time.time()
+        self.assertIsNone(sendCommand({'command':'print', 'label':'x0'}, socketPath, timeout=0.2))
+        self.assertLess(time.time()-start, 5)
+
+      # daemon busy with command of other client: command is executed by caller, daemon skips it
+      socketPath = Path(tempDir)/'daemon.sock'
+      with DaemonServer(socketPath) as server:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.assertEqual(sendCommand({'command':'ping'}, socketPath), ('1', ''))
+        with server.lock:
+          self.assertIsNone(sendCommand({'command':'print', 'label':'x0'}, socketPath, timeout=0.2))
+        self.assertEqual(sendCommand({'command':'ping'}, socketPath), ('1', ''))
+        server.shutdown()
+    return
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+"""TEST document cache with a database stand-in: no database required """
+import unittest
+from types import SimpleNamespace
+from docCache import DocCache
+
+class Session:
+  """
+  stand-in of database session: _changes feed that returns the changes given to it
+  """
+  def __init__(self):
+    self.results = []
+
+  def get(self, url, params):  # pylint: disable=unused-argument
+    """ reply of normal feed """
+    results, self.results = self.results, []
+    return SimpleNamespace(raise_for_status=lambda: None, json=lambda: {'results':results, 'last_seq':'1-a'})
+
+
+class TestStringMethods(unittest.TestCase):
+  """
+  derived class for this test
+  """
+  def test_main(self):
+    """
+    main function
+    """
+    session = Session()
+    db = SimpleNamespace(client=SimpleNamespace(r_session=session), db=SimpleNamespace(database_url=''))
+    stats = {}
+    cache = DocCache(db, stats, maxEntries=2, maxBytes=200, checkInterval=0)
+    cache.put({'_id':'x-1', '_rev':'1-a', '-name':'project'})
+    doc = cache.get('x-1')
+    self.assertEqual(doc['-name'], 'project')
+    doc['-name'] = 'changed copy'
+    self.assertEqual(cache.get('x-1')['-name'], 'project')
+    # own write is not invalidated, change by other client is
+    cache.put({'_id':'x-2', '_rev':'2-b', '-name':'step'})
+    session.results = [{'id':'x-2', 'changes':[{'rev':'2-b'}]}, {'id':'x-1', 'changes':[{'rev':'2-c'}]}]
+    self.assertIsNone(cache.get('x-1'))
+    self.assertIsNotNone(cache.get('x-2'))
+    # bounded by entries and bytes
+    cache.put({'_id':'x-3', '_rev':'1-d'})
+    cache.put({'_id':'x-4', '_rev':'1-e'})
+    self.assertEqual(list(cache.entries), ['x-3','x-4'])
+    cache.put({'_id':'x-5', '_rev':'1-f', 'image':'a'*150})
+    self.assertEqual(list(cache.entries), ['x-5'])
+    cache.put({'_id':'x-6', '_rev':'1-f', 'image':'a'*250})
+    self.assertNotIn('x-6', cache.entries)
+    self.assertEqual(stats, {'docCacheHits':3, 'docCacheMisses':1, 'docCacheInvalidations':1})
+    return
+
+
+if __name__ == '__main__':
+  unittest.main()
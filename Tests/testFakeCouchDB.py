@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+"""TEST Database against in-process stand-in of CouchDB: no database server required """
+import asyncio, os, shutil, tempfile, time, warnings
+import unittest
+from pathlib import Path
+import requests
+from fakeCouchDB import FakeCouchDB
+from database import Database
+from backend import Batch, Context
+from miscTools import cacheDir, pruneCache
+from changeFeed import ChangeFeed
+
+class TestStringMethods(unittest.TestCase):
+  """
+  derived class for this test
+  """
+  def test_main(self):
+    """
+    main function
+    """
+    warnings.filterwarnings('ignore', module='js2py')
+    os.environ['PASTA_CACHE_DIR'] = tempfile.mkdtemp()  #not the cache of the user
+    self.addCleanup(shutil.rmtree, os.environ['PASTA_CACHE_DIR'])
+    self.addCleanup(os.environ.pop, 'PASTA_CACHE_DIR')
+    fake = FakeCouchDB('admin', 'secret')
+    db = Database('admin', 'secret', 'pasta_tests', None, softwarePath=Path(__file__).parent.parent,
+                  adapter=fake.adapter(), cacheCheck=0)
+    labels = {'x0':'Projects', 'measurement':'Measurements', 'sample':'Samples'}
+    db.initViews(labels, magicTags=['TODO'])
+    for designName in db.createViewCode(labels, ['TODO']):
+      self.assertIsNone(db.client.r_session.get(db.db.database_url+'/_design/'+designName+'-staged').json().get('_id'))
+    project = db.saveDoc({'-name':'Project', '-type':['x0'], 'tags':['#TODO'], 'comment':'', 'objective':'',
+                          '-branch':{'stack':[], 'path':'project', 'child':0, 'op':'c'}})
+    docs = db.saveDocs([{'_id':'m-'+str(i), '-name':'data'+str(i)+'.csv', '-type':['measurement','csv'],
+                         'tags':[], 'comment':'', 'image':'', 'shasum':'abc'+str(i), '-branch':{'stack':[project['_id']],
+                         'path':'project/data'+str(i)+'.csv', 'child':i, 'op':'c'}} for i in range(5)])
+
+    ### VIEWS: same rows as javascript
+    self.assertEqual(db.getView('viewDocType/x0')[0]['key'], project['_id'])
+    self.assertEqual(db.getView('viewIdentify/viewTags', preciseKey='#TODO')[0]['value'], 'Project')
+    self.assertEqual(db.getView('viewIdentify/viewSHAsum', preciseKey='abc1')[0]['id'], 'm-1')
+    self.assertEqual([i['id'] for i in db.iterView('viewHierarchy/viewPaths', startKey='project/data', pageSize=2)],
+                     ['m-'+str(i) for i in range(5)])
+    self.assertEqual(db.getView('viewDocType/measurement', includeDocs=True)[0]['value'][:4],
+                     ['data0.csv', '', '', 'csv'])
+    notModified = db.stats['notModified']
+    db.getView('viewDocType/x0')
+    for _ in range(2):                                                   #listing of projects, e.g. print
+      self.assertEqual([i['id'] for i in db.iterView('viewDocType/x0')], [project['_id']])
+    self.assertEqual(db.stats['notModified'], notModified+2)
+    db.getView('viewDocType/measurement', includeDocs=True)                #documents are not written to disk
+    self.assertEqual(db.stats['notModified'], notModified+2)
+    self.assertFalse([i for i in cacheDir().glob('*.json') if 'data0.csv' in i.read_text(encoding='utf-8')])
+    pruneCache(maxBytes=0)
+    self.assertEqual(list(cacheDir().glob('*.json')), [])
+
+    ### INTERRUPTED SWAP OF DESIGN DOCUMENT: finished when view is missing, in background at next start;
+    ### a failed swap is skipped at start and finished by indexStatus
+    url = db.db.database_url+'/_design/viewDocType'
+    def newDatabase():
+      return Database('admin', 'secret', 'pasta_tests', None, softwarePath=Path(__file__).parent.parent,
+                      adapter=fake.adapter(), cacheCheck=0)
+    def stagedStatus(wait=0):
+      for _ in range(wait*10):                                        #swap in background thread
+        if db.client.r_session.get(url+'-staged').status_code==404:
+          break
+        time.sleep(0.1)
+      return db.client.r_session.get(url+'-staged').status_code
+    for labelsNew in [dict(labels, procedure='Procedures'), dict(labels, instrument='Instruments'),
+                      dict(labels, procedure='Procedures', instrument='Instruments')]:
+      db.swapView = lambda designName, designDoc: None        #process ended before swap
+      db.saveView('viewDocType', db.createViewCode(labelsNew)['viewDocType'])
+      del db.swapView
+      self.assertEqual(stagedStatus(), 200)
+      if len(labelsNew)==4 and 'procedure' in labelsNew:
+        self.assertEqual(db.getView('viewDocType/procedure'), [])
+      elif len(labelsNew)==4:
+        db = newDatabase()
+        self.assertEqual(stagedStatus(wait=5), 404)
+      else:
+        db.recordSwap('viewDocType', {'started':'2026-10-18T10:00:00', 'failed':True})
+        db = newDatabase()
+        self.assertEqual(stagedStatus(), 200)
+        self.assertTrue(db.finishViews())                                #e.g. indexStatus
+        self.assertEqual(stagedStatus(), 404)
+      self.assertNotIn('viewDocType', db.client.r_session.get(db.db.database_url+'/_local/pastaSwaps').json())
+      self.assertIn(list(labelsNew)[-1], db.client.r_session.get(url).json()['views'])
+
+    ### UPDATES: revisions, update handler, cache, conflicts
+    for i in range(3):
+      db.updateDoc({'comment':'edit '+str(i)}, 'm-0')
+    self.assertEqual([i['comment'] for i in db.getHistory('m-0')], ['', 'edit 0', 'edit 1', 'edit 2'])
+    self.assertTrue(db.updateBranch({'-branch':{'stack':[project['_id']], 'path':'project/moved.csv', 'child':0,
+                                                'op':'u', 'oldpath':'project/data1.csv'}}, 'm-1'))
+    self.assertEqual(db.getDoc('m-1')['-name'], 'moved.csv')
+    self.assertEqual(db.getView('viewHierarchy/viewPaths', preciseKey='project/moved.csv')[0]['id'], 'm-1')
+    other = requests.Session()
+    other.mount('http://', fake.adapter())
+    doc = other.get(db.db.database_url+'/m-2').json()
+    other.put(db.db.database_url+'/m-2', json=dict(doc, tags=['#other']))  #other client
+    self.assertEqual(db.getDoc('m-2')['tags'], ['#other'])             #cache follows changes
+    results = db.updateDocs([({'comment':'bulk'}, 'm-2'), ({'comment':'bulk'}, 'm-3')])
+    self.assertEqual(results['m-2']['tags'], ['#other'])
+    async def inEventLoop():  #e.g. in apiServer: many documents are read with concurrent requests
+      return db.getDocs(['m-'+str(i) for i in range(600)])
+    self.assertEqual(sorted(i for i,doc in asyncio.run(inEventLoop()).items() if doc), ['m-'+str(i) for i in range(5)])
+    self.assertIn(project['_id'], [i['id'] for i in db.iterDocs(pageSize=2)])
+    items = ChangeFeed(db).readItems(['m-0', 'm-9'])                    #change feed: no images
+    self.assertEqual((list(items), sorted(items['m-0'])), (['m-0'], ['-branch', '-type', '_id']))
+    docs = db.getDocs(['m-3', 'm-9'])
+    self.assertEqual((docs['m-3']['comment'], docs['m-3']['_rev'], docs['m-9']), ('bulk', db.getDoc('m-3')['_rev'], None))
+    slowCheck = Database('admin', 'secret', 'pasta_tests', None, softwarePath=Path(__file__).parent.parent,
+                         adapter=fake.adapter(), cacheCheck=60)
+    slowCheck.getDoc('m-4')                                             #cached, not checked for 60sec
+    doc = other.get(db.db.database_url+'/m-4').json()
+    other.put(db.db.database_url+'/m-4', json=dict(doc, comment='other'))
+    self.assertEqual(slowCheck.updateDoc({'comment':'after other'}, 'm-4')['comment'], 'after other')
+    self.assertEqual(slowCheck.stats['conflictsLost'], 0)              #update does not use stale cache
+    with Batch(db, Context(), 10) as batch:  #documents that could not be written are reported
+      batch.save({'_id':'m-1', '-name':'duplicate', '-type':['measurement']})
+      batch.update({'comment':'missing'}, 'm-9')
+      batch.save({'_id':'m-10', '-name':'data.csv', '-type':['measurement'], 'shasum':'abc',
+                  '-branch':{'stack':[project['_id']], 'child':9999, 'path':'project/data.csv', 'op':'c'}})
+      self.assertEqual(batch.shasums['abc']['_id'], 'm-10')  #addData finds buffered measurement
+      batch.update({'-branch':{'stack':[project['_id']], 'child':9999, 'path':'project/copy.csv', 'op':'c'}}, 'm-10')
+    self.assertEqual((batch.failed, batch.shasums), (['m-1', 'm-9'], {}))
+    self.assertEqual(len(db.getDoc('m-10')['-branch']), 2)              #second file: branch, not document
+
+    ### LOCAL PORT
+    url = fake.start()
+    self.assertEqual(requests.get(url+'/pasta_tests/m-3').status_code, 401)
+    reply = requests.get(url+'/pasta_tests/_changes', params={'since':0}, auth=('admin', 'secret')).json()
+    self.assertIn('m-3', [i['id'] for i in reply['results']])
+    fake.stop()
+    db.exit(deleteDB=True)
+    self.assertNotIn('pasta_tests', fake.databases)
+    return
+
+
+if __name__ == '__main__':
+  unittest.main()
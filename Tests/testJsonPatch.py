@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+"""TEST json-patch of revisions: no database required """
+import unittest, json, base64
+from pathlib import Path
+import js2py
+from jsonPatch import createPatch, applyPatch, history
+
+class TestStringMethods(unittest.TestCase):
+  """
+  derived class for this test
+  """
+  def test_main(self):
+    """
+    main function
+    """
+    old = {'-name':'Intermetals at interfaces', 'tags':['#TODO'], 'comment':'a/b~c',
+           '-branch':[{'stack':['x-1'], 'path':'p1/s1', 'child':1}], 'a/b':1}
+    new = {'-name':'Intermetals at interfaces', 'tags':['#TODO', '#v1'], 'comment':'changed',
+           '-branch':[{'stack':['x-1'], 'path':'p1/s2', 'child':2}], 'image':'data:image/png'}
+    patch = createPatch(new, old)
+    self.assertEqual(applyPatch(new, patch), old)
+    self.assertIn({'op':'replace', 'path':'/-branch/0/path', 'value':'p1/s1'}, patch)
+    self.assertIn({'op':'add', 'path':'/a~1b', 'value':1}, patch)
+    self.assertEqual(applyPatch(old, createPatch(old, new)), new)
+    self.assertEqual(createPatch(new, new), [])
+    self.assertEqual(createPatch({'a':1}, {'a':True}), [{'op':'replace', 'path':'/a', 'value':True}])
+
+    # versions from patches and old format (changed items)
+    v1 = {'_rev':'2-b', '-name':'step', 'comment':'first'}
+    v2 = {'_rev':'3-c', '-name':'renamed step', 'comment':'first'}
+    deltas = [{'comment':''},
+              createPatch({'-name':'renamed step', 'comment':'first'}, {'-name':'step', 'comment':'first'})+
+              [{'op':'replace', 'path':'/_rev', 'value':'2-b'}]]
+    versions = history(v2, deltas)
+    self.assertEqual(versions[1:], [v1, v2])
+    self.assertEqual(versions[0], {'-name':'step', 'comment':''})
+
+    # update handler of database moves branch and stores reverse patch
+    doc = {'_id':'m-1', '_rev':'1-a', '-name':'s1', '-client':'a',
+           '-branch':[{'stack':['x-1'], 'path':'p1/s1', 'child':1}, {'stack':['x-2'], 'path':'p2/\u00fc', 'child':2}]}
+    change = {'-branch':{'stack':['x-3'], 'path':'p3/new', 'oldpath':'p1/s1', 'child':5, 'op':'u'}, '-client':'b'}
+    code = (Path(__file__).parent.parent/'updateBranch.js').read_text(encoding='utf-8')  #update handler of Database
+    handler = js2py.eval_js('('+code+')')
+    newDoc, reply = handler(json.loads(json.dumps(doc)), {'body':json.dumps(change)}).to_list()
+    self.assertEqual(reply, {'json':{'ok':True, 'changed':True}})
+    self.assertEqual(newDoc['-branch'][0], {'stack':['x-3'], 'path':'p3/new', 'child':1})
+    self.assertEqual(newDoc['-name'], 'new')
+    patch = json.loads(base64.b64decode(newDoc.pop('_attachments')['v0.json']['data']))
+    self.assertEqual(history(dict(newDoc, _rev='2-b'), [patch])[0], doc)
+    return
+
+
+if __name__ == '__main__':
+  unittest.main()
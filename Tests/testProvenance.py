@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+"""TEST provenance ids of call sites: no database required """
+import unittest
+from provenance import Provenance
+
+class TestStringMethods(unittest.TestCase):
+  """
+  derived class for this test
+  """
+  def test_main(self):
+    """
+    main function
+    """
+    registered = []
+    full = Provenance('full', lambda siteID, description: registered.append((siteID, description)))
+    def save():
+      return full.callSite(0)
+    ids = []
+    for _ in range(3):
+      ids.append(save())
+    self.assertEqual(len(set(ids)), 1)
+    self.assertEqual(len(registered), 1)
+    self.assertEqual(registered[0][0], ids[0])
+    self.assertRegex(registered[0][1], r'^testProvenance.py:test_main:\d+\|testProvenance.py:save:\d+$')
+    self.assertNotEqual(full.callSite(0), ids[0])
+    self.assertEqual(len(registered), 2)
+
+    entry = Provenance('entry')
+    entry.callSite(0)
+    self.assertRegex(list(entry.known.values())[0], r'^testProvenance.py:test_main:\d+$')
+    self.assertEqual(Provenance('off').callSite(0), '')
+    return
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+"""TEST embedded SQLite database: no database server required """
+import tempfile, time, uuid
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from sqliteDatabase import SqliteDatabase
+from miscTools import benchHistory, benchIDs
+
+class TestStringMethods(unittest.TestCase):
+  """
+  derived class for this test
+  """
+  def test_main(self):
+    """
+    main function
+    """
+    with tempfile.TemporaryDirectory() as tempDir:
+      db = SqliteDatabase('', '', 'pasta_tests', None, softwarePath=Path(__file__).parent.parent,
+                          sqliteFile=Path(tempDir)/'pasta_tests.sqlite')
+      db.initViews(['x0', 'x1', 'measurement', 'sample'], magicTags=['TODO'])
+      project = db.saveDoc({'-name':'Project', '-type':['x0'], 'tags':['#TODO'], 'comment':'',
+                            '-branch':{'stack':[], 'path':'project', 'child':0, 'op':'c'}})
+      docs = db.saveDocs([{'-name':'data'+str(i)+'.csv', '-type':['measurement','csv'], 'tags':[], 'comment':'',
+                           'image':'', 'shasum':'abc'+str(i), '-branch':{'stack':[project['_id']],
+                           'path':'project/data'+str(i)+'.csv', 'child':i, 'op':'c'}} for i in range(3)])
+      self.assertEqual(db.getView('viewDocType/x0')[0]['key'], project['_id'])
+      self.assertEqual([i['key'] for i in db.getView('viewHierarchy/viewPaths', startKey='project/data')],
+                       ['project/data0.csv', 'project/data1.csv', 'project/data2.csv'])
+      self.assertEqual(db.getView('viewIdentify/viewSHAsum', preciseKey='abc1')[0]['id'], docs[1]['_id'])
+      self.assertEqual(db.getView('viewIdentify/viewTags', preciseKey='#TODO')[0]['value'], 'Project')
+      row = [i for i in db.getView('viewDocType/measurement', includeDocs=True) if i['id']==docs[0]['_id']][0]
+      self.assertEqual(row['value'][:4], ['data0.csv', '', '', 'csv'])
+      self.assertEqual(row['doc']['_id'], row['id'])
+
+      ### UPDATES, HISTORY, CONFLICTS
+      for i in range(3):
+        db.updateDoc({'comment':'edit '+str(i)}, docs[0]['_id'])
+      versions = db.getHistory(docs[0]['_id'])
+      self.assertEqual([i['comment'] for i in versions], ['', 'edit 0', 'edit 1', 'edit 2'])
+      self.assertEqual(db.getAttachment(docs[0]['_id'], 'v0.json')[-1]['value'], docs[0]['_rev'])
+      stale = db.getDoc(docs[1]['_id'])
+      db.updateDoc({'comment':'other process'}, docs[1]['_id'])
+      self.assertIsNone(db.putDoc(stale))
+      results = db.updateDocs([({'tags':['#1']}, docs[1]['_id']), ({'comment':'bulk'}, docs[2]['_id'])])
+      self.assertEqual(results[docs[1]['_id']]['comment'], 'other process')
+      self.assertEqual(db.getDoc(docs[2]['_id'])['comment'], 'bulk')
+      db.updateBranch({'-branch':{'stack':[project['_id']], 'path':'project/moved.csv', 'child':0, 'op':'u',
+                                  'oldpath':'project/data2.csv'}}, docs[2]['_id'])
+      self.assertEqual(db.getView('viewHierarchy/viewPaths', preciseKey='project/moved.csv')[0]['id'], docs[2]['_id'])
+      self.assertEqual(db.getView('viewHierarchy/viewPaths', preciseKey='project/data2.csv'), [])
+      self.assertEqual(len(list(db.iterView('_all_docs', pageSize=2))), db.docCount())
+      with self.assertRaises(KeyError):
+        db.getDoc('m-missing')
+
+      ### FEATURES OF COUCHDB: local implementation or clear error
+      dated = db.saveDoc({'_id':'m-'+uuid.uuid4().hex, '-name':'dated.csv', '-type':['measurement'], 'tags':[],
+                          'comment':'', '-date':'2026-10-18T10:00:00.000000Z', '-branch':{'stack':[], 'path':None}})
+      history = db.historyDB()
+      self.assertEqual((sum(history['measurement']), len(history['-bins-'])), (1, 99))
+      self.assertIn('measurement', history['-score-'])
+      self.assertEqual(sorted(i['id'] for i in db.iterDocs(pageSize=2)), sorted(i['id'] for i in db.iterView('_all_docs')))
+      self.assertIsNone(db.warmViews())
+      self.assertFalse(db.finishViews())
+      self.assertIsNone(db.runAsync(lambda adb: adb.getDoc(dated['_id'])))
+      numDocs = db.docCount()
+      self.assertIn('versions are correct', benchHistory(SimpleNamespace(db=db), numEdits=3))
+      self.assertEqual(db.docCount(), numDocs)                            #temporary document is removed
+      self.assertTrue(benchIDs(SimpleNamespace(db=db)).startswith('**ERROR mbi02'))
+
+      ### LOCAL READS
+      start = time.perf_counter()
+      for _ in range(100):
+        db.getDoc(docs[0]['_id'])
+      self.assertLess((time.perf_counter()-start)/100, 0.001)
+      db.exit(deleteDB=True)
+      self.assertFalse((Path(tempDir)/'pasta_tests.sqlite').exists())
+    return
+
+
+if __name__ == '__main__':
+  unittest.main()
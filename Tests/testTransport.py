@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+"""TEST transport with local http server: no database required """
+import json, threading
+import unittest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from transport import Transport, endpoint
+
+class Handler(BaseHTTPRequestHandler):
+  """
+  server that is unavailable for the first request, writes always fail
+  """
+  requests = 0
+
+  def do_GET(self):  # pylint: disable=invalid-name
+    """ reply json; first request 503 """
+    Handler.requests += 1
+    self.reply(503 if Handler.requests==1 else 200)
+
+  def do_PUT(self):  # pylint: disable=invalid-name
+    """ write failed """
+    Handler.requests += 1
+    self.rfile.read(int(self.headers['Content-Length']))
+    self.reply(503)
+
+  def reply(self, status):
+    """ reply json """
+    body = json.dumps({'rows':[]}).encode('utf-8')
+    self.send_response(status)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, *args):  # pylint: disable=arguments-differ
+    """ no output """
+    return
+
+
+class TestStringMethods(unittest.TestCase):
+  """
+  derived class for this test
+  """
+  def test_main(self):
+    """
+    main function
+    """
+    self.assertEqual(endpoint('GET', 'http://127.0.0.1:5984/pasta_db/_design/viewDocType/_view/x0?limit=1'),
+                     'GET /{db}/_design/viewDocType/_view/x0')
+    self.assertEqual(endpoint('PUT', 'http://127.0.0.1:5984/pasta_db/m-1234/v0.json'), 'PUT /{db}/{id}/{id}')
+    self.assertEqual(endpoint('POST', 'http://127.0.0.1:5984/pasta_db/_bulk_docs'), 'POST /{db}/_bulk_docs')
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    transport = Transport(backoff=0.01)
+    url = 'http://127.0.0.1:'+str(server.server_address[1])+'/pasta_db/_all_docs'
+    reply = transport.session.get(url)
+    self.assertEqual(reply.status_code, 200)    #after retry
+    self.assertEqual(Handler.requests, 2)
+    transport.session.get(url)
+    self.assertEqual(transport.stats['GET /{db}/_all_docs'][0], 2)   #retry is part of request
+    self.assertIn('GET /{db}/_all_docs', transport.report())
+    self.assertEqual(transport.session.put(url[:-len('_all_docs')]+'m-1', json={}).status_code, 503)
+    self.assertEqual(Handler.requests, 4)                           #writes are not repeated
+    server.shutdown()
+    return
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,434 @@
+#!/usr/bin/python3
+""" Local HTTP/JSON API of the backend: alternative to spawning pastaELN.py for every command
+
+Requests are answered by an asyncio loop. The backend is blocking (database requests, datalad,
+extractors) and runs in two thread pools: short reads in one, long changes (scanHierarchy, saveHierarchy,
+...) in the other. Reads are hence never queued behind a long scan. Each request has its own navigation
+context of the backend.
+
+Routes (GET parameters in query string, POST parameters as json body; database = configuration link):
+- GET  /print?database=&label=x0
+- GET  /hierarchy?database=&docID=
+- POST /createDoc      {"database", "docID", "doc":{"docType",...}}
+- POST /saveHierarchy  {"database", "docID", "content"}
+- POST /scanHierarchy  {"database", "docID"}
+- POST /redo           {"database", "docID", "docType"}
+- GET  /changes?database=   server-sent events of changes of database (see changeFeed.py)
+
+Only local clients are answered: web pages that the user opens must not change documents or files (cross-site
+requests, DNS rebinding). Requests are refused if
+- Host or Origin header is not localhost
+- header X-Pasta-Token differs from the secret of this start: it is written to the file apiToken in the
+  on-disk cache (only readable by user, see miscTools.cacheDir); readToken returns it
+- POST body is not Content-Type: application/json
+"""
+import asyncio, hmac, json, threading, traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from urllib.parse import urlsplit, parse_qs
+
+PORT = 8099
+REASONS = {200:'OK', 400:'Bad Request', 401:'Unauthorized', 403:'Forbidden', 404:'Not Found',
+           405:'Method Not Allowed', 415:'Unsupported Media Type', 500:'Internal Server Error'}
+LOCAL_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+
+def writeToken():
+  """
+  Create secret of this start and write it to the on-disk cache: only readable by user
+
+  Returns:
+    string: token
+  """
+  import os, secrets
+  from miscTools import cacheDir
+  token = secrets.token_urlsafe(32)
+  path = cacheDir()/'apiToken'
+  path.parent.mkdir(mode=0o700, exist_ok=True)
+  with os.fdopen(os.open(path, os.O_WRONLY|os.O_CREAT|os.O_TRUNC, 0o600), 'w', encoding='utf-8') as fOut:
+    fOut.write(token)
+  return token
+
+
+def readToken():
+  """
+  Returns:
+    string: token of running server, for header X-Pasta-Token; None if there is none
+  """
+  from miscTools import cacheDir
+  try:
+    return (cacheDir()/'apiToken').read_text(encoding='utf-8').strip()
+  except OSError:
+    return None
+
+
+def isLocal(hostHeader):
+  """
+  Args:
+    hostHeader (string): value of Host header (host:port) or Origin header (scheme://host:port)
+
+  Returns:
+    bool: host is localhost
+  """
+  try:
+    return urlsplit(hostHeader if '//' in hostHeader else '//'+hostHeader).hostname in LOCAL_HOSTS
+  except ValueError:
+    return False
+
+
+def opPrint(be, _, params):
+  """
+  Args:
+    be (Pasta): backend
+    params (dict): label: docType
+
+  Returns:
+    dict: table as string
+  """
+  return {'output': be.output(params.get('label', 'x0'), True)}
+
+
+def opHierarchy(be, ctx, params):
+  """
+  Args:
+    be (Pasta): backend
+    ctx (Context): context of this request
+    params (dict): docID: project
+
+  Returns:
+    dict: hierarchy as org-mode string
+  """
+  be.changeHierarchy(params['docID'], ctx=ctx)
+  return {'output': be.outputHierarchy(True, True, ctx=ctx)}
+
+
+def opCreateDoc(be, ctx, params):
+  """
+  Args:
+    be (Pasta): backend
+    ctx (Context): context of this request
+    params (dict): docID: parent, if any; doc: document incl. docType
+
+  Returns:
+    dict: success and docID of new document
+  """
+  data = dict(params['doc'])
+  docType = data.pop('docType')
+  if len(params.get('docID', ''))>1 and params['docID']!='none':
+    be.changeHierarchy(params['docID'], ctx=ctx)
+  success = be.addData(docType, data, ctx=ctx)
+  return {'result': success, 'docID': ctx.currentID}
+
+
+def opSaveHierarchy(be, ctx, params):
+  """
+  Args:
+    be (Pasta): backend
+    ctx (Context): context of this request
+    params (dict): docID: project; content: org-mode string
+
+  Returns:
+    dict: success
+  """
+  be.changeHierarchy(params['docID'], ctx=ctx)
+  return {'result': be.setEditString(params['content'], ctx=ctx)}
+
+
+def opScanHierarchy(be, ctx, params):
+  """
+  Args:
+    be (Pasta): backend
+    ctx (Context): context of this request
+    params (dict): docID: project
+
+  Returns:
+    dict: success
+  """
+  be.changeHierarchy(params['docID'], ctx=ctx)
+  return {'result': be.scanTree(ctx=ctx)}
+
+
+def opRedo(be, ctx, params):
+  """
+  Args:
+    be (Pasta): backend
+    ctx (Context): context of this request
+    params (dict): docID: measurement; docType: new type, / separated
+
+  Returns:
+    dict: success
+  """
+  from pathlib import Path
+  data = dict(be.getDoc(params['docID']))
+  data['-type'] = params['docType'].split('/')
+  be.useExtractors(Path(data['-branch'][0]['path']), data['shasum'], data, extractorRedo=True, ctx=ctx)
+  if len(data['-type'])>1 and len(data['image'])>1:
+    be.db.updateDoc({'image':data['image'], '-type':data['-type']}, params['docID'])
+    return {'result': True}
+  return {'result': False, 'error': 'error after redo-extraction'}
+
+
+#name: http method, pool, function
+ROUTES = {'print':        ('GET',  'read',  opPrint),
+          'hierarchy':    ('GET',  'read',  opHierarchy),
+          'createDoc':    ('POST', 'write', opCreateDoc),
+          'saveHierarchy':('POST', 'write', opSaveHierarchy),
+          'scanHierarchy':('POST', 'write', opScanHierarchy),
+          'redo':         ('POST', 'write', opRedo)}
+
+
+class ApiServer:
+  """
+  HTTP server on asyncio loop, backend operations in thread pools
+  """
+  def __init__(self, backendFactory=None, readWorkers=4, writeWorkers=1):
+    """
+    Args:
+      backendFactory (function): context manager of backend from configuration-link name; default: pool of
+        open backends, which are closed only after running operations are done
+      readWorkers (int): number of threads for reading operations
+      writeWorkers (int): number of threads for changing operations (datalad, extractors)
+    """
+    if backendFactory is None:
+      from daemon import BackendPool
+      backendFactory = BackendPool().use
+    self.backendFactory = backendFactory
+    self.feedLock = threading.Lock()  #one change feed per database
+    self.feedBackends = ExitStack()   #backends of change feeds: used until server stops
+    self.pools = {'read':ThreadPoolExecutor(readWorkers, thread_name_prefix='apiRead'),
+                  'write':ThreadPoolExecutor(writeWorkers, thread_name_prefix='apiWrite')}
+    self.feeds = {}    #database: ChangeFeed
+    self.streams = set()  #tasks of open event streams: cancelled at stop
+    self.server = None
+    self.token = None     #secret of this start, see writeToken
+
+
+  def getFeed(self, linkName):
+    """
+    Args:
+      linkName (string): name of configuration-link; ''=default
+
+    Returns:
+      ChangeFeed: change feed of database of this backend
+    """
+    from changeFeed import ChangeFeed
+    with self.feedLock:
+      if linkName not in self.feeds:
+        be = self.feedBackends.enter_context(self.backendFactory(linkName))
+        self.feeds[linkName] = ChangeFeed(be.db)
+      return self.feeds[linkName]
+
+
+  def execute(self, function, params):
+    """
+    Execute operation with backend: runs in thread pool
+
+    Args:
+      function (function): operation
+      params (dict): parameters of request
+
+    Returns:
+      tuple: http status, reply
+    """
+    from backend import Context
+    try:
+      with self.backendFactory(params.get('database', '')) as be:
+        return 200, function(be, Context(), params)
+    except KeyError as error:
+      return 400, {'error': 'missing parameter '+str(error)}
+    except:
+      print('**ERROR api01: operation failed\n'+traceback.format_exc())
+      return 500, {'error': traceback.format_exc(limit=1)}
+
+
+  def refuse(self, method, headers):
+    """
+    Check that request comes from local client, see module docstring
+
+    Args:
+      method (string): http method
+      headers (dict): headers of request, lower-case names
+
+    Returns:
+      tuple: http status, reply; None if request is allowed
+    """
+    if not isLocal(headers.get('host', '')) or ('origin' in headers and not isLocal(headers['origin'])):
+      return 403, {'error': 'only local clients are allowed'}
+    if self.token is None or not hmac.compare_digest(headers.get('x-pasta-token', ''), self.token):
+      return 401, {'error': 'missing or wrong X-Pasta-Token'}
+    if method=='POST' and headers.get('content-type', '').split(';')[0].strip()!='application/json':
+      return 415, {'error': 'use Content-Type: application/json'}
+    return None
+
+
+  async def handle(self, reader, writer):
+    """
+    Answer one http request: parse, execute in thread pool, reply json
+
+    Args:
+      reader (StreamReader): input of connection
+      writer (StreamWriter): output of connection
+    """
+    try:
+      requestLine = (await reader.readline()).decode('latin-1').split()
+      headers = {}
+      while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+          break
+        key, _, value = line.decode('latin-1').partition(':')
+        headers[key.strip().lower()] = value.strip()
+      body = await reader.readexactly(int(headers.get('content-length', 0)))
+      url = urlsplit(requestLine[1])
+      params = {key:value[0] for key,value in parse_qs(url.query).items()}
+      refused = self.refuse(requestLine[0], headers)
+      if refused is None and body:
+        params.update(json.loads(body))
+      name = url.path.strip('/')
+      if refused is None and name=='changes' and requestLine[0]=='GET':
+        await self.streamChanges(writer, params)
+        return
+      if refused is not None:
+        status, reply = refused
+      elif name not in ROUTES:
+        status, reply = 404, {'error': 'unknown route '+url.path}
+      elif ROUTES[name][0]!=requestLine[0]:
+        status, reply = 405, {'error': 'use '+ROUTES[name][0]+' for '+url.path}
+      else:
+        loop = asyncio.get_running_loop()
+        status, reply = await loop.run_in_executor(self.pools[ROUTES[name][1]], self.execute,
+                                                   ROUTES[name][2], params)
+    except (IndexError, ValueError, asyncio.IncompleteReadError):
+      status, reply = 400, {'error': 'could not parse request'}
+    data = json.dumps(reply).encode('utf-8')
+    writer.write(f'HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n'
+                 f'Content-Length: {len(data)}\r\nConnection: close\r\n\r\n'.encode('latin-1')+data)
+    try:
+      await writer.drain()
+    finally:
+      writer.close()
+    return
+
+
+  async def streamChanges(self, writer, params):
+    """
+    Send change events as server-sent events until the client disconnects
+    - comment line every 15sec keeps connection open
+    - if the client does not read fast enough, events are dropped and replaced by {"op":"resync"}
+
+    Args:
+      writer (StreamWriter): output of connection
+      params (dict): parameters of request: database
+    """
+    loop = asyncio.get_running_loop()
+    feed = await loop.run_in_executor(self.pools['read'], self.getFeed, params.get('database', ''))
+    events = asyncio.Queue(maxsize=1000)
+    def putEvent(event):
+      if events.full():
+        while not events.empty():
+          events.get_nowait()
+        event = {'op':'resync'}
+      events.put_nowait(event)
+    def push(event):
+      loop.call_soon_threadsafe(putEvent, event)
+    feed.subscribe(push)
+    feed.start()
+    self.streams.add(asyncio.current_task())
+    writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n'
+                 b'Connection: close\r\n\r\n')
+    try:
+      while True:
+        try:
+          event = await asyncio.wait_for(events.get(), 15)
+          writer.write(('data: '+json.dumps(event)+'\n\n').encode('utf-8'))
+        except asyncio.TimeoutError:
+          writer.write(b': keep-alive\n\n')
+        await writer.drain()
+    except ConnectionError:
+      pass
+    finally:
+      self.streams.discard(asyncio.current_task())
+      feed.unsubscribe(push)
+      writer.close()
+    return
+
+
+  async def start(self, host='127.0.0.1', port=PORT):
+    """
+    Start listening
+
+    Args:
+      host (string): address to listen on; only local by default
+      port (int): port; 0=any free port
+
+    Returns:
+      asyncio.Server: server, e.g. to get port
+    """
+    self.token = writeToken()
+    self.server = await asyncio.start_server(self.handle, host, port)
+    return self.server
+
+
+  async def serve(self, host='127.0.0.1', port=PORT):
+    """
+    Serve until cancelled
+
+    Args:
+      host (string): address to listen on; only local by default
+      port (int): port
+    """
+    server = await self.start(host, port)
+    print('API server listens on', ', '.join(str(i.getsockname()) for i in server.sockets))
+    try:
+      async with server:
+        await server.serve_forever()
+    finally:
+      await self.stop()
+
+
+  async def stop(self):
+    """
+    Stop listening and end open event streams: their tasks would otherwise outlive the event loop
+    """
+    if self.server is not None:
+      self.server.close()
+    streams = list(self.streams)
+    for task in streams:
+      task.cancel()
+    await asyncio.gather(*streams, return_exceptions=True)
+    return
+
+
+  def exit(self):
+    """
+    Stop change feeds and close thread pools: wait for running operations
+    """
+    for feed in self.feeds.values():
+      feed.stop()
+    for pool in self.pools.values():
+      pool.shutdown(wait=True)
+    self.feedBackends.close()
+    return
+
+
+def runApiServer(port=PORT):
+  """
+  Run API server until interrupted (Ctrl-C)
+
+  Args:
+    port (int): port
+
+  Returns:
+    bool: success
+  """
+  server = ApiServer()
+  try:
+    asyncio.run(server.serve(port=port))
+  except KeyboardInterrupt:
+    pass
+  except OSError:
+    print('**ERROR api02: could not listen on port |',port)
+    return False
+  finally:
+    server.exit()
+  return True
@@ -0,0 +1,188 @@
+#!/usr/bin/python3
+""" Asynchronous access to the database: many reads at the same time overlap their network latency
+
+Fan-out with a thread pool: each request is sent with the session of the database (connection pool, retries,
+authentication) in one of 'concurrency' threads, and the coroutines wait for them. Writes (saveDoc,
+updateDoc, saveDocs, updateDocs) use the methods of Database in the same pool: confirmation, revisions and
+conflict handling stay the same.
+
+Usage from synchronous code:
+  db.runAsync(lambda adb: asyncio.gather(*[adb.getDoc(i) for i in docIDs]))
+Database.getDocs uses it for many documents, e.g. in checkDB, exportELN and outputHierarchy.
+"""
+import asyncio, json, functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncDatabase:
+  """
+  Asynchronous variant of Database: use as async context manager
+  """
+  def __init__(self, db, concurrency=8):
+    """
+    Args:
+      db (Database): synchronous database: url, session, views and statistics are shared
+      concurrency (int): maximum number of requests at the same time
+    """
+    self.db = db
+    self.concurrency = concurrency
+    self.pool = ThreadPoolExecutor(concurrency, thread_name_prefix='asyncDatabase')
+    self.semaphore = None
+
+
+  async def __aenter__(self):
+    self.semaphore = asyncio.Semaphore(self.concurrency)
+    return self
+
+
+  async def __aexit__(self, *args):
+    await asyncio.to_thread(self.pool.shutdown)  #waits for running requests: not in event loop
+    return False
+
+
+  async def request(self, method, url, params=None, data=None):
+    """
+    Send request with session of database in thread pool
+
+    Args:
+      method (string): GET, POST, PUT
+      url (string): url
+      params (dict): query parameters
+      data (dict): json body
+
+    Returns:
+      tuple: http status, json content of reply
+    """
+    res = await self.inThread(functools.partial(self.db.client.r_session.request, method, url, params=params,
+                                                json=data))
+    return res.status_code, res.json()
+
+
+  async def inThread(self, function, *args):
+    """
+    Run synchronous method of database in thread pool
+
+    Args:
+      function (function): method of Database
+      args (list): arguments
+
+    Returns:
+      object: result of method
+    """
+    async with self.semaphore:
+      loop = asyncio.get_running_loop()
+      return await loop.run_in_executor(self.pool, function, *args)
+
+
+  async def getDoc(self, docID):
+    """
+    Args:
+      docID (string): document id
+
+    Returns:
+      dict: json representation of document
+
+    Raises:
+      KeyError: if document does not exist
+    """
+    from cloudant.document import Document
+    status, doc = await self.request('GET', Document(self.db.db, docID).document_url)
+    if status==404:
+      raise KeyError(docID)
+    if status>=400:
+      raise IOError('**ERROR dag01: could not get document |'+docID+' '+str(doc))
+    return doc
+
+
+  async def getDocs(self, docIDs):
+    """
+    Args:
+      docIDs (list): document ids
+
+    Returns:
+      dict: docID: json representation of document; None if it does not exist
+    """
+    docIDs = list(dict.fromkeys(docIDs))
+    if len(docIDs)==0:
+      return {}
+    status, res = await self.request('POST', self.db.db.database_url+'/_all_docs',
+                                     params={'include_docs':'true'}, data={'keys':docIDs})
+    docs = {docID:None for docID in docIDs}
+    if status>=400:
+      print('**ERROR dgd01: could not get documents |',res)
+      return docs
+    docs.update({row['key']:row['doc'] for row in res['rows'] if row.get('doc')})
+    return docs
+
+
+  async def getView(self, thePath, startKey=None, preciseKey=None, includeDocs=False):
+    """
+    Args:
+      thePath (string): path to view
+      startKey (string): if given, use to filter output, everything that starts with this key
+      preciseKey (string): if given, use to filter output. Match precisely
+      includeDocs (bool): include full document as 'doc' in each row
+
+    Returns:
+      list: list of documents in this view
+    """
+    from cloudant.view import View
+    from cloudant.design_document import DesignDocument
+    if thePath not in self.db.views:
+      self.db.views[thePath] = View(DesignDocument(self.db.db, thePath.split('/')[0]), thePath.split('/')[1])
+    params = {'include_docs':'true'} if includeDocs else {}
+    if startKey is not None:
+      params.update({'startkey':json.dumps(startKey), 'endkey':json.dumps(startKey+'zzz')})
+    elif preciseKey is not None:
+      params['key'] = json.dumps(preciseKey)
+    status, res = await self.request('GET', self.db.views[thePath].url, params=params)
+    if status>=400:
+      print('**ERROR dgv01: Database / Network problem for path |',thePath.split('/')[-1])
+      self.db.views.pop(thePath, None)
+      return []
+    return res['rows']
+
+
+  async def saveDoc(self, doc):
+    """
+    Args:
+      doc (dict): document to save
+
+    Returns:
+      dict: json representation of submitted document
+    """
+    return await self.inThread(self.db.saveDoc, doc)
+
+
+  async def saveDocs(self, docs):
+    """
+    Args:
+      docs (list): documents to save
+
+    Returns:
+      list: for each document: json representation of submitted document; None if it could not be saved
+    """
+    return await self.inThread(self.db.saveDocs, docs)
+
+
+  async def updateDoc(self, change, docID):
+    """
+    Args:
+      change (dict): item to update, see Database.updateDoc
+      docID (string):  id of document to change
+
+    Returns:
+      dict: json representation of updated document
+    """
+    return await self.inThread(self.db.updateDoc, change, docID)
+
+
+  async def updateDocs(self, changes):
+    """
+    Args:
+      changes (list): list of (change, docID); see Database.updateDoc
+
+    Returns:
+      dict: docID: json representation of updated document; None if it could not be updated
+    """
+    return await self.inThread(self.db.updateDocs, changes)
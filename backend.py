@@ -2,7 +2,110 @@
 """ Python Backend: all operations with the filesystem are here
 """
 
-# TODO_P1 reduce relative_to: self.cwd should be always small
+# TODO_P1 reduce relative_to: ctx.cwd should be always small
+
+class Context:
+  """
+  Navigation state of one client of the backend
+  - hierStack: docIDs from project to current step/task
+  - cwd: current directory relative to basePath
+  - currentID: docID of last added document
+
+  Each thread / request uses its own context with the same backend; the methods of the backend use
+  the backend's context, if none is given.
+  """
+  def __init__(self, hierStack=None, cwd='.', currentID=None):
+    from pathlib import Path
+    self.hierStack = [] if hierStack is None else list(hierStack)
+    self.cwd       = Path(cwd)
+    self.currentID = currentID
+    self.batch     = None  #Batch, if documents are buffered
+
+
+class Batch:
+  """
+  Buffer of documents that addData writes with few requests (_bulk_docs) instead of one per document
+  - only documents that are not structure documents (x...): those are written at once, since
+    directories are created from them and children are counted
+  - use: with be.batch(500) as batch: ... be.addData(...) ...; afterwards batch.failed lists documents
+    that could not be written
+  - buffered documents are not in the views yet: addData finds measurements with the same shasum in
+    self.shasums
+  """
+  def __init__(self, db, ctx, chunkSize):
+    self.db        = db
+    self.ctx       = ctx
+    self.chunkSize = chunkSize
+    self.saves     = []
+    self.updates   = []
+    self.previous  = None
+    self.failed    = []  #ids of documents that could not be written
+    self.shasums   = {}  #shasum: buffered document
+
+  def __enter__(self):
+    self.previous, self.ctx.batch = self.ctx.batch, self
+    return self
+
+  def __exit__(self, *args):
+    self.flush()
+    self.ctx.batch = self.previous
+    return False
+
+  def save(self, doc):
+    """
+    Buffer new document
+
+    Args:
+      doc (dict): document
+
+    Returns:
+      dict: document as it will be saved
+    """
+    doc['-client'] = self.db.callStack()
+    self.saves.append(doc)
+    if doc.get('shasum'):
+      self.shasums[doc['shasum']] = doc
+    if len(self.saves)>=self.chunkSize:
+      self.flush()
+    return doc
+
+  def update(self, change, docID):
+    """
+    Buffer change of document
+
+    Args:
+      change (dict): change, see Database.updateDoc
+      docID (string): id of document to change
+    """
+    change['-client'] = self.db.callStack()
+    self.updates.append((change, docID))
+    if len(self.updates)>=self.chunkSize:
+      self.flush()
+    return
+
+  def flush(self):
+    """
+    Write buffered documents: new ones first, since changes might refer to them
+    - documents that could not be written are reported and added to self.failed
+
+    Returns:
+      bool: all documents were written
+    """
+    failed = []
+    if len(self.saves)>0:
+      results = self.db.saveDocs(self.saves)
+      failed += [doc.get('_id', doc.get('-name')) for doc, result in zip(self.saves, results) if result is None]
+      self.saves = []
+      self.shasums = {}
+    if len(self.updates)>0:
+      results = self.db.updateDocs(self.updates)
+      failed += [docID for docID in dict.fromkeys(docID for _, docID in self.updates) if results.get(docID) is None]
+      self.updates = []
+    for docID in failed:
+      print('**ERROR bbf01: document could not be written |',docID)
+    self.failed += failed
+    return len(failed)==0
+
 
 class Pasta:
   """
@@ -19,12 +122,13 @@ class Pasta:
         kwargs (dict): additional parameters
           - initViews (bool): initialize views at startup
           - resetOntology (bool): reset ontology on database from one on file
+          - backgroundViews (bool): build changed views in background thread, see Database.saveView
     """
-    import json, sys
+    import json, sys, hashlib
     from pathlib import Path
     from database import Database
-    from miscTools import upIn, upOut
-    from commonTools import commonTools as cT
+    from miscTools import upIn, upOut, readCache, writeCache
+    from commonToolsPy import getCommonTools, selectEngine, selectIDScheme
     ## CONFIGURATION FOR DATALAD and GIT: has to move to dictionary
     self.vanillaGit = ['*.md','*.rst','*.org','*.tex','*.py','.id_pastaELN.json'] #tracked but in git;
     #   .id_pastaELN.json has to be tracked by git (if ignored: they don't appear on git-status; they have to change by PASTA)
@@ -46,41 +150,60 @@ class Pasta:
     links = configuration['links']
     if 'user' in links[linkDefault]['local']:
       n,s = links[linkDefault]['local']['user'], links[linkDefault]['local']['password']
-    else:
+    elif 'cred' in links[linkDefault]['local']:
       n,s = upOut(links[linkDefault]['local']['cred'])[0].split(':')
+    else:  #sqlite
+      n,s = '', ''
     databaseName = links[linkDefault]['local']['database']
     self.confLinkName= linkDefault
     self.confLink    = links[linkDefault]
     # directories
     #    self.basePath (root of directory tree) is root of all projects
-    #    self.cwd changes during program
+    #    ctx.cwd changes during program (one context per client)
     self.softwarePath = Path(configuration['softwareDir'])
     self.extractorPath = Path(configuration['extractorDir']) if 'extractorDir' in configuration else \
                          self.softwarePath/'extractors'
     sys.path.append(str(self.extractorPath))  #allow extractors
     self.basePath     = Path(links[linkDefault]['local']['path'])
-    self.cwd          = Path('.')
     # decipher configuration and store
     self.userID   = configuration['userID']
     self.magicTags= configuration['magicTags'] #"P1","P2","P3","TODO","WAIT","DONE"
     self.tableFormat = configuration['tableFormat']
+    selectEngine(configuration.get('commonTools', 'python'))
+    selectIDScheme(configuration.get('idScheme', 'time'))
+    cT = getCommonTools()
     # start database
-    self.db = Database(n,s,databaseName,confirm=self.confirm,softwarePath=self.softwarePath, **kwargs)
-    res = cT.ontology2Labels(self.db.ontology,self.tableFormat)
-    self.dataLabels      = res['dataDict']
-    self.hierarchyLabels = res['hierarchyDict']
-    if kwargs.get('initViews', False):
+    options = {'provenance':configuration.get('provenance', 'full')}
+    if 'url' in links[linkDefault]['local']:  #e.g. fakeCouchDB on local port
+      options['url'] = links[linkDefault]['local']['url']
+    if links[linkDefault]['local'].get('engine', 'couchdb')=='sqlite':
+      from sqliteDatabase import SqliteDatabase as Database  # pylint: disable=redefined-outer-name
+      options['sqliteFile'] = links[linkDefault]['local'].get('file', self.basePath.parent/(databaseName+'.sqlite'))
+    self.db = Database(n,s,databaseName,confirm=self.confirm,softwarePath=self.softwarePath,
+                       **dict(options, **kwargs))
+    # labels and view code depend only on ontology, tableFormat, magicTags: use cache if ontology is unchanged
+    maxTabColumns = configuration['GUI']['maxTabColumns'] \
+      if 'GUI' in configuration and 'maxTabColumns' in configuration['GUI'] else 20
+    cacheKey = json.dumps([databaseName, type(self.db).__name__, self.db.ontology['_rev'], self.tableFormat,
+                           self.magicTags, maxTabColumns])
+    cacheKey = hashlib.sha1(cacheKey.encode('utf-8')).hexdigest()
+    res = readCache('ontology_'+linkDefault, cacheKey)
+    if res is None:
+      res = cT.ontology2Labels(self.db.ontology,self.tableFormat)
+      res = {'dataDict':res['dataDict'], 'hierarchyDict':res['hierarchyDict']}
       labels = {}  #one line merging / update does not work
       for i in res['dataDict']:
         labels[i]=res['dataDict'][i]
       for i in res['hierarchyDict']:
         labels[i]=res['hierarchyDict'][i]
-      maxTabColumns = configuration['GUI']['maxTabColumns'] \
-        if 'GUI' in configuration and 'maxTabColumns' in configuration['GUI'] else 20
-      self.db.initViews(labels,self.magicTags, maxTabColumns)
-    # internal hierarchy structure
-    self.hierStack = []
-    self.currentID  = None
+      res['viewCode'] = self.db.createViewCode(labels, self.magicTags, maxTabColumns)
+      writeCache('ontology_'+linkDefault, cacheKey, res)
+    self.dataLabels      = res['dataDict']
+    self.hierarchyLabels = res['hierarchyDict']
+    if kwargs.get('initViews', False):
+      self.db.initViews(None, viewCode=res['viewCode'])
+    # internal hierarchy structure: default context of all clients that do not give their own
+    self.ctx       = Context()
     self.alive     = True
     return
 
@@ -113,9 +236,54 @@ class Pasta:
     return
 
 
+  # state of default context: for clients that use one context
+  @property
+  def hierStack(self):
+    """ hierarchy stack of default context """
+    return self.ctx.hierStack
+
+  @hierStack.setter
+  def hierStack(self, value):
+    self.ctx.hierStack = value
+
+  @property
+  def cwd(self):
+    """ current directory of default context """
+    return self.ctx.cwd
+
+  @cwd.setter
+  def cwd(self, value):
+    self.ctx.cwd = value
+
+  @property
+  def currentID(self):
+    """ docID of last added document of default context """
+    return self.ctx.currentID
+
+  @currentID.setter
+  def currentID(self, value):
+    self.ctx.currentID = value
+
+
   ######################################################
   ### Change in database
   ######################################################
+  def batch(self, chunkSize=500, **kwargs):
+    """
+    Buffer documents of addData and write them in chunks
+    - use: with be.batch(500): ... be.addData(...) ...
+
+    Args:
+        chunkSize (int): number of documents per request
+        kwargs (dict): additional parameter
+            ctx (Context): context of this client; default: context of this backend
+
+    Returns:
+        Batch: context manager
+    """
+    return Batch(self.db, kwargs.get('ctx', self.ctx), chunkSize)
+
+
   def addData(self, docType, doc, hierStack=None, localCopy=False, **kwargs):
     """
     Save doc to database, also after edit
@@ -127,6 +295,7 @@ class Pasta:
         localCopy (bool): copy a remote file to local version
         kwargs (dict): additional parameter, i.e. callback for curation
             forceNewImage (bool): create new image in any case
+            ctx (Context): context of this client; default: context of this backend
 
     Returns:
         bool: success
@@ -135,13 +304,15 @@ class Pasta:
     from pathlib import Path
     from urllib import request
     import datalad.api as datalad
-    from commonTools import commonTools as cT
+    from commonToolsPy import getCommonTools
+    cT = getCommonTools()
     from miscTools import createDirName, generic_hash
     if sys.platform=='win32':
       import win32con, win32api
 
     if hierStack is None:
       hierStack=[]
+    ctx = kwargs.get('ctx', self.ctx)
     callback = kwargs.get('callback', None)
     forceNewImage=kwargs.get('forceNewImage',False)
     doc['-user']  = self.userID
@@ -151,9 +322,9 @@ class Pasta:
     if docType == '-edit-':
       edit = True
       if '-type' not in doc:
-        doc['-type'] = ['x'+str(len(self.hierStack))]
+        doc['-type'] = ['x'+str(len(ctx.hierStack))]
       if len(hierStack) == 0:
-        hierStack = self.hierStack
+        hierStack = ctx.hierStack
       if '_id' not in doc:
         doc['_id'] = hierStack[-1]
       if len(hierStack)>0 and doc['-type'][0][0]=='x':
@@ -164,12 +335,14 @@ class Pasta:
       edit = False
       doc['-type'] = docType.split('/')
       if len(hierStack) == 0:
-        hierStack = self.hierStack
+        hierStack = ctx.hierStack
 
+    if ctx.batch is not None and doc['-type'][0][0]=='x':
+      ctx.batch.flush()  #structure-docs count children and are written at once: write buffered documents before
     # collect structure-doc and prepare
     if doc['-type'][0][0]=='x' and doc['-type'][0]!='x0' and childNum is None:
       #should not have childnumber in other cases
-      thisStack = ' '.join(self.hierStack)
+      thisStack = ' '.join(ctx.hierStack)
       view = self.db.getView('viewHierarchy/viewHierarchy', startKey=thisStack) #not faster with cT.getChildren
       childNum = 0
       for item in view:
@@ -179,7 +352,7 @@ class Pasta:
           childNum += 1
 
     # find path name on local file system; name can be anything
-    if self.cwd is not None and '-name' in doc:
+    if ctx.cwd is not None and '-name' in doc:
       if (doc['-name'].endswith('_pasta.jpg') or
           doc['-name'].endswith('_pasta.svg') or
           doc['-name'].endswith('.id_pastaELN.json') ):
@@ -190,9 +363,9 @@ class Pasta:
         if doc['-type'][0]=='x0':
           childNum = 0
         if edit:      #edit: cwd of the project/step/task: remove last directory from cwd (since cwd contains a / at end: remove two)
-          parentDirectory = self.cwd.parent
+          parentDirectory = ctx.cwd.parent
         else:         #new: below the current project/step/task
-          parentDirectory = self.cwd
+          parentDirectory = ctx.cwd
         path = parentDirectory/createDirName(doc['-name'],doc['-type'][0],childNum) #update,or create (if new doc, update ignored anyhow)
         operation = 'u'
       else:
@@ -202,7 +375,7 @@ class Pasta:
           if localCopy:
             baseName  = Path(doc['-name']).stem
             extension = Path(doc['-name']).suffix
-            path = self.cwd/(cT.camelCase(baseName)+extension)
+            path = ctx.cwd/(cT.camelCase(baseName)+extension)
             request.urlretrieve(doc['-name'], self.basePath/path)
             doc['-name'] = cT.camelCase(baseName)+extension
           else:
@@ -215,17 +388,21 @@ class Pasta:
         elif doc['-name']!='' and (self.basePath/doc['-name']).exists():          #file exists
           path = Path(doc['-name'])
           doc['-name'] = Path(doc['-name']).name
-        elif doc['-name']!='' and (self.basePath/self.cwd/doc['-name']).exists(): #file exists
-          path = self.cwd/doc['-name']
+        elif doc['-name']!='' and (self.basePath/ctx.cwd/doc['-name']).exists(): #file exists
+          path = ctx.cwd/doc['-name']
         else:                                                     #make up name
           shasum  = None
         if shasum is not None: # and doc['-type'][0]=='measurement':         #samples, procedures not added to shasum database, getMeasurement not sensible
           if shasum == '':
             shasum = generic_hash(self.basePath/path, forceFile=True)
-          view = self.db.getView('viewIdentify/viewSHAsum',shasum)
+          pending = None if ctx.batch is None else ctx.batch.shasums.get(shasum)
+          if pending is not None:   #same file earlier in this batch: not in view yet
+            view = [{'id':pending['_id']}]
+          else:
+            view = self.db.getView('viewIdentify/viewSHAsum',shasum)
           if len(view)==0 or forceNewImage:  #measurement not in database: create doc
             while True:
-              self.useExtractors(path,shasum,doc)  #create image/content and add to datalad
+              self.useExtractors(path,shasum,doc,ctx=ctx)  #create image/content and add to datalad
               if not 'image' in doc and not 'content' in doc and not 'otherELNName' in doc:  #did not get valuable data: extractor does not exit
                 return False
               if callback is None or not callback(doc):
@@ -244,7 +421,7 @@ class Pasta:
                     return False
                 break
           if len(view)==1:  #measurement is already in database
-            self.useExtractors(path,shasum,doc,exitAfterDataLad=True)
+            self.useExtractors(path,shasum,doc,exitAfterDataLad=True,ctx=ctx)
             doc['_id'] = view[0]['id']
             doc['shasum'] = shasum
             edit = True
@@ -258,17 +435,23 @@ class Pasta:
     if edit:
       #update document
       keysNone = [key for key in doc if doc[key] is None]
-      doc = cT.fillDocBeforeCreate(doc, '--').to_dict()  #store None entries and save back since js2py gets equalizes undefined and null
+      doc = cT.fillDocBeforeCreate(doc, '--')  #store None entries and save back since js2py gets equalizes undefined and null
       for key in keysNone:
         doc[key]=None
-      doc = self.db.updateDoc(doc, doc['_id'])
+      if ctx.batch is not None and doc['-type'][0][0]!='x':
+        ctx.batch.update(doc, doc['_id'])
+      else:
+        doc = self.db.updateDoc(doc, doc['_id'])
     else:
       # add doc to database
-      doc = cT.fillDocBeforeCreate(doc, doc['-type']).to_dict()
-      doc = self.db.saveDoc(doc)
+      doc = cT.fillDocBeforeCreate(doc, doc['-type'])
+      if ctx.batch is not None and doc['-type'][0][0]!='x':
+        doc = ctx.batch.save(doc)
+      else:
+        doc = self.db.saveDoc(doc)
 
     ## adaptation of directory tree, information on disk: documentID is required
-    if self.cwd is not None and doc['-type'][0][0]=='x':
+    if ctx.cwd is not None and doc['-type'][0][0]=='x':
       #project, step, task
       path = Path(doc['-branch'][0]['path'])
       if not edit:
@@ -322,7 +505,7 @@ class Pasta:
       # cmd = ['datalad','save','-m','Added new subfolder with .id_pastaELN.json', '-d', self.basePath+projectPath ,self.basePath+path+/+'.id_pastaELN.json']
       # output = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
       # print("datalad save",output.stdout.decode('utf-8'))
-    self.currentID = doc['_id']
+    ctx.currentID = doc['_id']
     return True
 
 
@@ -338,19 +521,21 @@ class Pasta:
         docID (string): information on how to change
         dirName (string): change into this directory (absolute path given). For if data is moved
         kwargs (dict): additional parameter
+            ctx (Context): context of this client; default: context of this backend
     """
     from pathlib import Path
+    ctx = kwargs.get('ctx', self.ctx)
     if docID is None or (docID[0]=='x' and docID[1]!='-'):  #cd ..: none. close 'project', 'task'
-      self.hierStack.pop()
-      self.cwd = self.cwd.parent
+      ctx.hierStack.pop()
+      ctx.cwd = ctx.cwd.parent
     else:  # existing ID is given: open that
-      self.hierStack.append(docID)
+      ctx.hierStack.append(docID)
       if dirName is not None:
-        self.cwd = dirName.relative_to(self.basePath)
+        ctx.cwd = dirName.relative_to(self.basePath)
       else:
         doc = self.db.getDoc(docID)
-        self.cwd = Path(doc['-branch'][0]['path'])
-        self.hierStack = doc['-branch'][0]['stack']+[docID]
+        ctx.cwd = Path(doc['-branch'][0]['path'])
+        ctx.hierStack = doc['-branch'][0]['stack']+[docID]
     return
 
 
@@ -365,6 +550,10 @@ class Pasta:
 
     Args:
       kwargs (dict): additional parameter, i.e. callback
+          ctx (Context): context of this client; default: context of this backend
+
+    Returns:
+      bool: success; False if no project is selected or documents could not be written
 
     Raises:
       ValueError: could not add new measurement to database
@@ -373,19 +562,20 @@ class Pasta:
     import datalad.api as datalad
     from datalad.support import annexrepo
     from miscTools import bcolors, generic_hash
-    if len(self.hierStack) == 0:
+    ctx = kwargs.get('ctx', self.ctx)
+    if len(ctx.hierStack) == 0:
       print(f'{bcolors.FAIL}**Warning - scan directory: No project selected{bcolors.ENDC}')
-      return
+      return False
     callback = kwargs.get('callback', None)
-    while len(self.hierStack)>1:
-      self.changeHierarchy(None)
+    while len(ctx.hierStack)>1:
+      self.changeHierarchy(None, ctx=ctx)
 
     #git-annex lists all the files at once
     #   datalad and git give the directories, if untracked/random; and datalad status produces output
     #   also, git-annex status is empty if nothing has to be done
     #   git-annex output is nice to parse
-    fileList = annexrepo.AnnexRepo(self.basePath/self.cwd).status()
-    dlDataset = datalad.Dataset(self.basePath/self.cwd)
+    fileList = annexrepo.AnnexRepo(self.basePath/ctx.cwd).status()
+    dlDataset = datalad.Dataset(self.basePath/ctx.cwd)
     #create dictionary that has shasum as key and [origin and target] as value
     shasumDict = {}   #clean ones are omitted
     for posixPath in fileList:
@@ -411,69 +601,75 @@ class Pasta:
 
     # loop all entries and separate into moved,new,deleted
     print("Number of changed files:",len(shasumDict))
-    for _, (origin, target) in shasumDict.items():
-      print("  File changed:",origin,'->',target)
-      # originDir, _ = o..s.path.split(self.cwd+origin)
-      # find hierStack and parentID of new TARGET location: for new and move
-      if target != '':
-        targetDir = target.parent
-        if not target.exists(): #if dead link
-          linkTarget = target.resolve()
-          for dirI in self.basePath.glob('*'):
-            if (self.basePath/dirI).is_dir():
-              path = self.basePath/dirI/linkTarget
-              if path.exists():
-                target.unlock()
-                shutil.copy(path,target)
-                break
-        parentID = None
-        itemTarget = -1
-        while parentID is None:
-          view = self.db.getView('viewHierarchy/viewPaths', startKey=str(targetDir.relative_to(self.basePath)))
-          for item in view:
-            if item['key']==str(targetDir.relative_to(self.basePath)):
-              parentID = item['id']
-              itemTarget = item
-          targetDir = targetDir.parent
-        parentDoc = self.db.getDoc(parentID)
-        hierStack = parentDoc['-branch'][0]['stack']+[parentID]
-      ### separate into two cases
-      # newly created file
-      if origin == '':
-        newDoc    = {'-name':str(target)}
-        _ = self.addData('measurement', newDoc, hierStack, callback=callback)  #saved to datalad in here
-      # move or delete file
-      else:
-        #update to datalad
-        if target == '':
-          dlDataset.save(path=origin, message='Removed file')
-        else:
-          dlDataset.save(path=origin, message='Moved file from here to '+str(self.cwd/target)   )
-          dlDataset.save(path=target, message='Moved file from '+str(self.cwd/origin)+' to here')
-        #get docID
-        if origin!='' and origin.name == '.id_pastaELN.json':  #if origin has .id_pastaELN.json: parent directory has moved
-          origin = origin.parent
-        if target!='' and target.name == '.id_pastaELN.json':
-          target = target.parent
-        view = self.db.getView('viewHierarchy/viewPaths', preciseKey=str((self.cwd/origin).relative_to(self.basePath)) )
-        if len(view)==1:
-          docID = view[0]['id']
-          if target == '':       #delete
-            self.db.updateDoc( {'-branch':{'path':  str((self.cwd/origin).relative_to(self.basePath)),\
-                                          'oldpath':str((self.cwd/origin).relative_to(self.basePath)),\
-                                          'stack':[None],\
-                                          'child':-1,\
-                                          'op':'d'}}, docID)
-          else:                  #update
-            self.db.updateDoc( {'-branch':{'path':  str((self.cwd/target).relative_to(self.basePath)),\
-                                          'oldpath':str((self.cwd/origin).relative_to(self.basePath)),\
-                                          'stack':hierStack,\
-                                          'child':itemTarget['value'][2],\
-                                          'op':'u'}}, docID)
+    with self.batch(ctx=ctx) as batch:  #write new and changed measurements together
+      for _, (origin, target) in shasumDict.items():
+        print("  File changed:",origin,'->',target)
+        # originDir, _ = o..s.path.split(self.cwd+origin)
+        # find hierStack and parentID of new TARGET location: for new and move
+        if target != '':
+          targetDir = target.parent
+          if not target.exists(): #if dead link
+            linkTarget = target.resolve()
+            for dirI in self.basePath.glob('*'):
+              if (self.basePath/dirI).is_dir():
+                path = self.basePath/dirI/linkTarget
+                if path.exists():
+                  target.unlock()
+                  shutil.copy(path,target)
+                  break
+          parentID = None
+          itemTarget = -1
+          while parentID is None:
+            view = self.db.getView('viewHierarchy/viewPaths', startKey=str(targetDir.relative_to(self.basePath)))
+            for item in view:
+              if item['key']==str(targetDir.relative_to(self.basePath)):
+                parentID = item['id']
+                itemTarget = item
+            targetDir = targetDir.parent
+          parentDoc = self.db.getDoc(parentID)
+          hierStack = parentDoc['-branch'][0]['stack']+[parentID]
+        ### separate into two cases
+        # newly created file
+        if origin == '':
+          newDoc    = {'-name':str(target)}
+          _ = self.addData('measurement', newDoc, hierStack, callback=callback, ctx=ctx)  #saved to datalad in here
+        # move or delete file
         else:
-          if '_pasta.' not in str(origin):  #TODO_P1 is this really needed
-            print("file not in database",self.cwd/origin)
-    return
+          #update to datalad
+          if target == '':
+            dlDataset.save(path=origin, message='Removed file')
+          else:
+            dlDataset.save(path=origin, message='Moved file from here to '+str(ctx.cwd/target)   )
+            dlDataset.save(path=target, message='Moved file from '+str(ctx.cwd/origin)+' to here')
+          #get docID
+          updateDoc = batch.update  #measurements: buffer
+          if origin!='' and origin.name == '.id_pastaELN.json':  #if origin has .id_pastaELN.json: parent directory has moved
+            origin = origin.parent
+            updateDoc = self.db.updateBranch  #structure: at once, since new files are searched by its path
+          if target!='' and target.name == '.id_pastaELN.json':
+            target = target.parent
+          view = self.db.getView('viewHierarchy/viewPaths', preciseKey=str((ctx.cwd/origin).relative_to(self.basePath)) )
+          if len(view)==1:
+            docID = view[0]['id']
+            if target == '':       #delete
+              updateDoc( {'-branch':{'path':  str((ctx.cwd/origin).relative_to(self.basePath)),\
+                                     'oldpath':str((ctx.cwd/origin).relative_to(self.basePath)),\
+                                     'stack':[None],\
+                                     'child':-1,\
+                                     'op':'d'}}, docID)
+            else:                  #update
+              updateDoc( {'-branch':{'path':  str((ctx.cwd/target).relative_to(self.basePath)),\
+                                     'oldpath':str((ctx.cwd/origin).relative_to(self.basePath)),\
+                                     'stack':hierStack,\
+                                     'child':itemTarget['value'][2],\
+                                     'op':'u'}}, docID)
+          else:
+            if '_pasta.' not in str(origin):  #TODO_P1 is this really needed
+              print("file not in database",ctx.cwd/origin)
+    self.db.warmViews()
+    if batch.failed:
+      print('**ERROR bst01: scan could not write',len(batch.failed),'documents')
+    return len(batch.failed)==0
 
   def backup(self, method='backup', **kwargs):
     """
@@ -507,11 +703,9 @@ class Pasta:
       if method=='backup':
         numAttachments = 0
         #write JSON files
-        listDocs = self.db.db
         listFileNames = []
-        for doc in listDocs:
-          if isinstance(doc, str):
-            doc = self.db.getDoc(doc)
+        for row in self.db.iterView('_all_docs', includeDocs=True):
+          doc = row['doc']
           fileName = '__database__/'+doc['_id']+'.json'
           listFileNames.append(fileName)
           zipFile.writestr(Path(dirNameProject)/fileName, json.dumps(doc) )
@@ -520,7 +714,7 @@ class Pasta:
             numAttachments += len(doc['_attachments'])
             for i in range(len(doc['_attachments'])):
               attachmentName = dirNameProject+'/__database__/'+doc['_id']+'/v'+str(i)+'.json'
-              zipFile.writestr(attachmentName, json.dumps(doc.get_attachment('v'+str(i)+'.json')))
+              zipFile.writestr(attachmentName, json.dumps(self.db.getAttachment(doc['_id'], 'v'+str(i)+'.json')))
         #write data-files
         for path, _, files in os.walk(self.basePath):
           if '/.git' in path or '/.datalad' in path:
@@ -538,7 +732,7 @@ class Pasta:
           compressed += doc.compress_size
           fileSize   += doc.file_size
         print(f'  File size: {fileSize:,} byte   Compressed: {compressed:,} byte')
-        print(f'  Num. documents (incl. ontology and views): {len(self.db.db):,}\n')#,    num. attachments: {numAttachments:,}\n')
+        print(f'  Num. documents (incl. ontology and views): {self.db.docCount():,}\n')#,    num. attachments: {numAttachments:,}\n')
         return True
 
       # method compare and restore
@@ -550,7 +744,8 @@ class Pasta:
         filesInZip = zipFile.namelist()
         print('  Number of documents (incl. ontology and views) in file:',len(filesInZip))
         differenceFound, comparedFiles, comparedAttachments = False, 0, 0
-        for doc in self.db.db:
+        for row in self.db.iterView('_all_docs', includeDocs=True):
+          doc = row['doc']
           fileName = doc['_id']+'.json'
           if 'backup/__database__/'+fileName not in filesInZip:
             print("**ERROR bbu02: document not in zip file |",doc['_id'])
@@ -571,7 +766,7 @@ class Pasta:
               else:
                 filesInZip.remove('backup/__database__/'+attachmentName)
                 zipData = json.loads(zipFile.read('backup/__database__/'+attachmentName) )
-                if doc.get_attachment('v'+str(i)+'.json')!=zipData:
+                if self.db.getAttachment(doc['_id'], 'v'+str(i)+'.json')!=zipData:
                   print('  Info: data disagrees database, zipfile ',attachmentName)
                   differenceFound = True
                 comparedAttachments += 1
@@ -586,7 +781,7 @@ class Pasta:
       # method restore: loop through all files in zip and save to database
       #  - skip design and dataDictionary
       if method=='restore':
-        beforeLength, restoredFiles = len(self.db.db), 0
+        beforeLength, restoredFiles = self.db.docCount(), 0
         for fileName in zipFile.namelist():
           if fileName.startswith('backup/__database__') and (not \
             (fileName.startswith('backup/__database__/_') or fileName.startswith('backup/__database__/-'))):  #do not restore design documents and ontology
@@ -599,7 +794,7 @@ class Pasta:
             else:                                                           #normal document
               self.db.saveDoc(zipData)
         print('  Number of documents & revisions in file:',restoredFiles)
-        print('  Number of documents before and after restore:',beforeLength, len(self.db.db),'\n')
+        print('  Number of documents before and after restore:',beforeLength, self.db.docCount(),'\n')
         return True
     return False
 
@@ -616,16 +811,18 @@ class Pasta:
         kwargs (dict): additional parameter
           - maxSize of image
           - saveToFile: save data to files
+          - ctx (Context): context of this client; default: context of this backend
     """
     import importlib, shutil, urllib, tempfile
     from pathlib import Path
     import datalad.api as datalad
+    ctx = kwargs.get('ctx', self.ctx)
     exitAfterDataLad = kwargs.get('exitAfterDataLad',False)
     extension = filePath.suffix[1:]  #cut off initial . of .jpg
     if str(filePath).startswith('http'):
       absFilePath = Path(tempfile.gettempdir())/filePath.name
       urllib.request.urlretrieve(str(filePath).replace(':/','://'), absFilePath)
-      projectDB = self.cwd.parts[0]
+      projectDB = ctx.cwd.parts[0]
       dataset = datalad.Dataset(self.basePath/projectDB)
     else:
       if filePath.is_absolute():
@@ -711,6 +908,20 @@ class Pasta:
     return success
 
 
+  def viewProgress(self):
+    """
+    Progress of views whose index is currently built, e.g. after many changes
+    - if no index is built: finish views that were not swapped before, see Database.finishViews
+
+    Returns:
+      dict: design-document name: progress in percent; empty if all views are up to date
+    """
+    progress = self.db.viewProgress()
+    if len(progress)==0:
+      self.db.finishViews()
+    return progress
+
+
   def checkDB(self, verbose=True, **kwargs):
     """
     Wrapper of check database for consistencies by iterating through all documents
@@ -728,12 +939,12 @@ class Pasta:
     ### check if datalad status is clean for all projects
     if verbose:
       output += "--- DataLad status ---\n"
-    viewProjects   = self.db.getView('viewDocType/x0')
+    viewProjects   = self.db.getView('viewDocType/x0', includeDocs=True)
     viewPaths      = self.db.getView('viewHierarchy/viewPaths')
     listPaths = [item['key'] for item in viewPaths]
     clean, count = True, 0
     for item in viewProjects:
-      doc = self.db.getDoc(item['id'])
+      doc = item['doc']
       dirName =doc['-branch'][0]['path']
       fileList = annexrepo.AnnexRepo(self.basePath/dirName).status()
       for posixPath in fileList:
@@ -799,7 +1010,7 @@ class Pasta:
         outString.append(formatString.format(item['-name']) )
     outString = '|'.join(outString)+'\n'
     outString += '-'*104+'\n'
-    for lineItem in self.db.getView('viewDocType/'+docType):
+    for lineItem in self.db.iterView('viewDocType/'+docType):
       rowString = []
       for idx, item in enumerate(self.db.ontology[docType]):
         if idx<len(widthArray):
@@ -875,25 +1086,31 @@ class Pasta:
        addID (bool): add docID to output
        addTags (string): add tags, comments, objective to output ['all','tags',None]
        kwargs (dict): additional parameter, i.e. callback
+          ctx (Context): context of this client; default: context of this backend
 
     Returns:
         string: output incl. \n
     """
     import re
-    from commonTools import commonTools as cT
-    if len(self.hierStack) == 0:
+    from commonToolsPy import getCommonTools
+    cT = getCommonTools()
+    ctx = kwargs.get('ctx', self.ctx)
+    if len(ctx.hierStack) == 0:
       return 'Warning: pasta.outputHierarchy No project selected'
-    hierString = ' '.join(self.hierStack)
+    hierString = ' '.join(ctx.hierStack)
     view = self.db.getView('viewHierarchy/viewHierarchy', startKey=hierString)
     nativeView = {}
     for item in view:
       if onlyHierarchy and not item['id'].startswith('x-'):
         continue
       nativeView[item['id']] = [item['key']]+item['value']
+    docs = {}
+    if addID and addTags in ('all','tags'):  #documents are needed for output: get only those shown, in one request
+      docs = self.db.getDocs(list(nativeView))
     if addTags=='all':
-      outString = cT.hierarchy2String(nativeView, addID, self.getDoc, 'all', self.magicTags)
+      outString = cT.hierarchy2String(nativeView, addID, docs.get, 'all', self.magicTags)
     elif addTags=='tags':
-      outString = cT.hierarchy2String(nativeView, addID, self.getDoc, 'tags', self.magicTags)
+      outString = cT.hierarchy2String(nativeView, addID, docs.get, 'tags', self.magicTags)
     else:
       outString = cT.hierarchy2String(nativeView, addID, None, 'none', None)
     #remove superficial * from head of all lines
@@ -903,24 +1120,30 @@ class Pasta:
     return outString
 
 
-  def getEditString(self):
+  def getEditString(self, **kwargs):
     """
     Return org-mode markdown string of hierarchy tree
       complicated style: this document and all its children and grandchildren...
 
+    Args:
+       kwargs (dict): additional parameter
+          ctx (Context): context of this client; default: context of this backend
+
     Returns:
         string: output incl. \n
     """
-    return self.outputHierarchy(True,True,'tags')
+    return self.outputHierarchy(True,True,'tags',ctx=kwargs.get('ctx', self.ctx))
 
 
-  def setEditString(self, text, callback=None):
+  def setEditString(self, text, callback=None, **kwargs):
     """
     Using Org-Mode string, replay the steps to update the database
 
     Args:
        text (string): org-mode structured text
        callback (function): function to verify database change
+       kwargs (dict): additional parameter
+          ctx (Context): context of this client; default: context of this backend
 
     Returns:
        success of function: true/false
@@ -928,17 +1151,19 @@ class Pasta:
     import re
     from pathlib import Path
     import datalad.api as datalad
-    from commonTools import commonTools as cT
+    from commonToolsPy import getCommonTools
+    cT = getCommonTools()
     from miscTools import createDirName
+    ctx = kwargs.get('ctx', self.ctx)
     # write backup
     verbose = False #debugging only of this function
     if verbose:
       print('===============START SAVE HIERARCHY===============')
       print(text)
       print('---------------End reprint input   ---------------')
-    dlDataset = datalad.Dataset(self.basePath/self.cwd.parts[0])
+    dlDataset = datalad.Dataset(self.basePath/ctx.cwd.parts[0])
     # add the prefix to org-mode structure lines
-    prefix = '*'*len(self.hierStack)
+    prefix = '*'*len(ctx.hierStack)
     startLine = r'^\*+\ '
     newText = ''
     for line in text.split('\n'):
@@ -977,7 +1202,7 @@ class Pasta:
         continue
 
       # All non-deleted items: identify docType
-      docDB    = self.db.getDoc(doc['_id']) if doc['_id']!='' else None
+      docDB    = self.db.getDoc(doc['_id'], fresh=True) if doc['_id']!='' else None  #changed and saved below
       levelNew = doc['-type']
       if levelOld is None:   #first run-through
         children  = [0]
@@ -1003,7 +1228,7 @@ class Pasta:
         doc = docDB
         doc['childNum'] = children[-1]
         del doc['edit']
-        self.addData('-edit-', doc, self.hierStack)
+        self.addData('-edit-', doc, ctx.hierStack, ctx=ctx)
         levelOld     = levelNew
         continue
 
@@ -1017,12 +1242,12 @@ class Pasta:
       if levelOld is None:   #first run-through
         doc['childNum'] = docDB['-branch'][0]['child']
       else:                   #after first entry
-        lenPath = len(self.cwd.parts)-1 if len(self.cwd.parts[-1])==0 else len(self.cwd.parts)
+        lenPath = len(ctx.cwd.parts)-1 if len(ctx.cwd.parts[-1])==0 else len(ctx.cwd.parts)
         for _ in range(lenPath-levelNew):
-          self.changeHierarchy(None)                        #'cd ..'
+          self.changeHierarchy(None, ctx=ctx)               #'cd ..'
         #check if directory exists on disk
         #move directory; this is the first point where the non-existence of the folder is seen and can be corrected
-        dirName = self.basePath/self.cwd/createDirName(doc['-name'],doc['-type'][0],children[-1])
+        dirName = self.basePath/ctx.cwd/createDirName(doc['-name'],doc['-type'][0],children[-1])
         if not dirName.exists():                     #if move, deletion or because new
           if doc['_id']=='' or doc['_id']=='undefined':     #if new data
             dirName.mkdir()
@@ -1035,36 +1260,36 @@ class Pasta:
             if not (self.basePath/path).exists():        #if still does not exist
               print("**ERROR bse01: doc path was not found and parent path was not found |"+str(doc))
               return False
-            if self.confirm is None or self.confirm(None,"Move directory "+path+" -> "+self.cwd+dirName):
-              (self.basePath/path).rename(self.basePath/self.cwd/dirName)
+            if self.confirm is None or self.confirm(None,"Move directory "+path+" -> "+ctx.cwd+dirName):
+              (self.basePath/path).rename(self.basePath/ctx.cwd/dirName)
               dlDataset.save(path=self.basePath/path, message='SetEditString move directory: origin')
-              dlDataset.save(path=self.basePath/self.cwd/dirName, message='SetEditString move dir: target')
+              dlDataset.save(path=self.basePath/ctx.cwd/dirName, message='SetEditString move dir: target')
         if edit=='-edit-':
-          self.changeHierarchy(doc['_id'], dirName)   #'cd directory'
+          self.changeHierarchy(doc['_id'], dirName, ctx=ctx)   #'cd directory'
           if path is not None:
             #adopt measurements, samples, etc: change / update path by supplying old path
             view = self.db.getView('viewHierarchy/viewPaths', startKey=str(path))
             for item in view:
               if item['value'][1][0][0]=='x':
                 continue  #skip since moved by itself
-              self.db.updateDoc( {'-branch':{'path':str(self.cwd), 'oldpath':str(path),\
-                                            'stack':self.hierStack,\
-                                            'child':item['value'][2],\
-                                            'op':'u'}},item['id'])
+              self.db.updateBranch( {'-branch':{'path':str(ctx.cwd), 'oldpath':str(path),\
+                                               'stack':ctx.hierStack,\
+                                               'child':item['value'][2],\
+                                               'op':'u'}},item['id'])
         doc['childNum'] = children[-1]
       ## FOR DEBUGGING:
       if verbose:
         print(doc['-name'].strip()+'|'+str(doc['-type'])+'||'+doc['_id']+' #:',doc['childNum'])
-        print('  children:',children,'   levelNew, levelOld',levelNew,levelOld,'   cwd:',self.cwd,'\n')
+        print('  children:',children,'   levelNew, levelOld',levelNew,levelOld,'   cwd:',ctx.cwd,'\n')
       # write change to database
       if edit=='-edit-':
         docDB = dict(docDB)
         docDB.update(doc)
         doc = docDB
-      self.addData(edit, doc, self.hierStack)
+      self.addData(edit, doc, ctx.hierStack, ctx=ctx)
       #update variables for next iteration
       if edit!="-edit-" and levelOld is not None:
-        self.changeHierarchy(self.currentID)   #'cd directory'
+        self.changeHierarchy(ctx.currentID, ctx=ctx)   #'cd directory'
       levelOld     = levelNew
 
     #----------------------------------------------------
@@ -1072,24 +1297,28 @@ class Pasta:
     if '-type' in doc and doc['-type'][0][0]!='x':  #remove one child, if last was not an x-element, e.g. a measurement
       children.pop()
     for _ in range(len(children)-1):
-      self.changeHierarchy(None)
-    dataset = datalad.Dataset(self.basePath/self.cwd.parts[0])
+      self.changeHierarchy(None, ctx=ctx)
+    dataset = datalad.Dataset(self.basePath/ctx.cwd.parts[0])
     dataset.save(message='set-edit-string: update the project structure')
+    self.db.warmViews()
     return True
 
 
-  def getChildren(self, docID):
+  def getChildren(self, docID, **kwargs):
     """
     Get children from this parent using outputHierarchy
 
     Args:
         docID (string): id parent document
+        kwargs (dict): additional parameter
+            ctx (Context): context of this client; default: context of this backend
 
     Returns:
         list: list of names, list of document-ids
     """
-    from commonTools import commonTools as cT
-    hierTree = self.outputHierarchy(True,True,False)
+    from commonToolsPy import getCommonTools
+    cT = getCommonTools()
+    hierTree = self.outputHierarchy(True,True,False,ctx=kwargs.get('ctx', self.ctx))
     if hierTree is None:
       print('**ERROR bgc01: No hierarchy tree')
       return None, None
@@ -1105,7 +1334,7 @@ class Pasta:
     """
     outString = f"{'QR': <36}|{'Name': <36}|{'ID': <36}\n"
     outString += '-'*110+'\n'
-    for item in self.db.getView('viewIdentify/viewQR'):
+    for item in self.db.iterView('viewIdentify/viewQR'):
       outString += f"{item['key'][:36]: <36}|{item['value'][:36]: <36}|{item['id'][:36]: <36}\n"
     return outString
 
@@ -1119,7 +1348,7 @@ class Pasta:
     """
     outString = f"{'SHAsum': <32}|{'Name': <40}|{'ID': <25}\n"
     outString += '-'*110+'\n'
-    for item in self.db.getView('viewIdentify/viewSHAsum'):
+    for item in self.db.iterView('viewIdentify/viewSHAsum'):
       key = item['key'] if item['key'] else '-empty-'
       outString += f"{key[:32]: <32}|{item['value'][:40]: <40}|{item['id']: <25}\n"
     return outString
@@ -0,0 +1,153 @@
+#!/usr/bin/python3
+""" Follow the _changes feed of the database and distribute compact change events
+
+Clients (e.g. the frontend via the /changes endpoint of apiServer.py) patch their tables with these events
+instead of querying whole views after every change. Event:
+  {"seq":..., "id":docID, "type":"measurement/tif", "stack":[docIDs of parents], "op":"c"/"u"/"d"}
+The feed has only the latest revision of each document: a document that was created and changed between
+two polls is reported once with "op":"u". Clients hence add rows of unknown ids also for "u".
+The feed has only ids and revisions: -type and -branch of the changed documents are read with one _find
+request per poll (Mango query with fields), so that images and other content do not travel.
+"""
+import threading, time, traceback
+
+
+def compactEvent(row, doc=None):
+  """
+  Convert row of _changes feed and items of document into compact event
+  - 'c' only for the first revision: created and changed since the last poll is 'u'
+
+  Args:
+    row (dict): row of _changes feed
+    doc (dict): -type and -branch of document; default: doc of row (include_docs)
+
+  Returns:
+    dict: event; None for design documents
+  """
+  if row['id'].startswith('_design/'):
+    return None
+  doc = doc or row.get('doc') or {}
+  if row.get('deleted', False):
+    op = 'd'
+  elif row['changes'][0]['rev'].startswith('1-'):
+    op = 'c'
+  else:
+    op = 'u'
+  docType = '/'.join(doc['-type']) if isinstance(doc.get('-type'), list) else doc.get('-type')
+  branch = doc.get('-branch', [])
+  stack = branch[0]['stack'] if isinstance(branch, list) and len(branch)>0 else []
+  return {'seq':row['seq'], 'id':row['id'], 'type':docType, 'stack':stack, 'op':op}
+
+
+class ChangeFeed:
+  """
+  Thread that follows the _changes feed (long polling) and calls the subscribers with every event
+  """
+  def __init__(self, db, since='now', timeout=30):
+    """
+    Args:
+      db (Database): database
+      since (string): start after this sequence; 'now'=only future changes
+      timeout (int): seconds of each long poll
+    """
+    self.db = db
+    self.since = since
+    self.timeout = timeout
+    self.subscribers = []
+    self.lock = threading.Lock()
+    self.alive = False
+    self.thread = None
+
+
+  def subscribe(self, callback):
+    """
+    Args:
+      callback (function): called with each event (dict); runs in thread of feed and should return fast
+    """
+    with self.lock:
+      self.subscribers.append(callback)
+    return
+
+
+  def unsubscribe(self, callback):
+    """
+    Args:
+      callback (function): callback given to subscribe
+    """
+    with self.lock:
+      if callback in self.subscribers:
+        self.subscribers.remove(callback)
+    return
+
+
+  def start(self):
+    """
+    Start following feed in background thread
+    """
+    if self.alive:
+      return
+    self.alive = True
+    self.thread = threading.Thread(target=self.run, daemon=True)
+    self.thread.start()
+    return
+
+
+  def stop(self):
+    """
+    Stop following feed: ends after current poll
+    """
+    self.alive = False
+    return
+
+
+  def readItems(self, docIDs):
+    """
+    Read only the items of events of changed documents
+
+    Args:
+      docIDs (list): ids of changed documents
+
+    Returns:
+      dict: docID: document with _id, -type, -branch
+    """
+    if len(docIDs)==0:
+      return {}
+    res = self.db.client.r_session.post(self.db.db.database_url+'/_find',
+                                        json={'selector':{'_id':{'$in':docIDs}}, 'fields':['_id','-type','-branch'],
+                                              'limit':len(docIDs)})
+    res.raise_for_status()
+    return {doc['_id']:doc for doc in res.json()['docs']}
+
+
+  def run(self):
+    """
+    Loop of long polls until stopped
+    - after network problems wait increasingly longer (max. 1min) before next try
+    """
+    wait = 1
+    while self.alive:
+      try:
+        res = self.db.client.r_session.get(self.db.db.database_url+'/_changes',
+                                           params={'feed':'longpoll', 'since':self.since,
+                                                   'timeout':self.timeout*1000})  #read timeout of transport is longer
+        res.raise_for_status()
+        res = res.json()
+        docs = self.readItems([row['id'] for row in res['results'] if not row.get('deleted', False)
+                               and not row['id'].startswith('_design/')])
+      except:
+        if wait==1:
+          print('**ERROR dcf01: could not follow changes of database\n'+traceback.format_exc())
+        time.sleep(wait)
+        wait = min(2*wait, 60)
+        continue
+      wait = 1
+      for row in res['results']:
+        event = compactEvent(row, docs.get(row['id']))
+        if event is None:
+          continue
+        with self.lock:
+          subscribers = list(self.subscribers)
+        for callback in subscribers:
+          callback(event)
+      self.since = res['last_seq']
+    return
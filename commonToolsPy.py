@@ -0,0 +1,608 @@
+""" Native python version of commonTools
+
+commonTools.py is translated from the javascript source (commonTools.js) by js2py and every call runs
+through its javascript interpreter. This module implements the same functions in plain python: same
+arguments, same results, incl. the javascript conversions of numbers, null and undefined to strings.
+Results are plain python objects (dict, list, string).
+
+Select the implementation with getCommonTools(); Tests/testCommonTools.py compares both.
+"""
+import re, secrets, threading, time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+#javascript character classes and trim of js2py, which uses python's unicode \w \d \b
+JS_SPACE    = ' \f\n\r\t\v\u00a0\u1680\u180e\u2000-\u200a\u2028\u2029\u202f\u205f\u3000\ufeff'
+JS_NONSPACE = '\u0000-\u0008\u000e-\u001f!-\u009f\u00a1-\u167f\u1681-\u180d\u180f-\u1fff'+\
+              '\u200b-\u2027\u202a-\u202e\u2030-\u205e\u2060-\u2fff\u3001-\ufefe\uff00-\uffff'
+JS_STRIP    = '\t\n\v\f\r \u00a0\u1680\u180e\u2028\u2029\u202f\u205f\u3000\ufeff'+''.join(chr(i) for i in range(0x2000,0x200b))
+RE_RATING    = re.compile(r'#\d')
+RE_OTHERTAGS = re.compile(r'(^|['+JS_SPACE+r'])#{1}[a-zA-Z][\w]+')
+RE_TAGS      = re.compile(r'(^|['+JS_SPACE+r'])#{1}[\w]+')
+RE_FIELDS    = re.compile(r':['+JS_NONSPACE+r']+:['+JS_NONSPACE+r']+:')
+RE_NONSPACE  = re.compile(r'['+JS_NONSPACE+r']|$')
+RE_SPACE     = re.compile(r'['+JS_SPACE+r']+')
+RE_CAMEL     = re.compile(r'(?:^\w|[A-Z]|\b\w|['+JS_SPACE+r']+)')
+RE_NONWORD   = re.compile(r'\W')
+RE_EDITLINE  = re.compile(r'\|\|\w-')
+JS_NULL      = SimpleNamespace()    #javascript null: None is undefined, as in js2py
+
+
+def _jsFalse(value):
+  """
+  javascript truthiness: undefined, null, false, 0 and '' are false; [] and {} are true
+
+  Args:
+    value (any): value to test
+
+  Returns:
+    bool: value is false
+  """
+  if value is None or value is JS_NULL:
+    return True
+  if isinstance(value, bool):
+    return not value
+  if isinstance(value, (int, float)):
+    return value==0 or value!=value
+  return isinstance(value, str) and value==''
+
+
+def _jsString(value, inArray=False):
+  """
+  javascript conversion of value to string
+
+  Args:
+    value (any): value to convert
+    inArray (bool): value is element of array, where null and undefined are empty strings
+
+  Returns:
+    string: value as string
+  """
+  if value is None or value is JS_NULL:
+    if inArray:
+      return ''
+    return 'undefined' if value is None else 'null'
+  if isinstance(value, bool):
+    return 'true' if value else 'false'
+  if isinstance(value, float):
+    if value.is_integer():
+      return str(int(value))
+    return repr(value)
+  if isinstance(value, (list, tuple)):
+    return ','.join(_jsString(i, True) for i in value)
+  if isinstance(value, dict):
+    return '[object Object]'
+  return str(value)
+
+
+def _jsNumber(text):
+  """
+  javascript conversion of string to number, e.g. +'12', as done by js2py
+
+  Args:
+    text (string): string to convert
+
+  Returns:
+    int, float, None: number; None if not a number
+  """
+  text = text.strip()
+  if text=='':
+    return 0
+  if 'x' in text or 'X' in text[:3]:  #hex
+    try:
+      return int(text, 16)
+    except ValueError:
+      return None
+  sign = 1
+  if text[0] in '+-':
+    sign = -1 if text[0]=='-' else 1
+    text = text[1:]
+  if text=='Infinity':
+    return sign*float('inf')
+  try:
+    number = sign*float(text)
+  except ValueError:
+    return None
+  if number!=number:
+    return None
+  return int(number) if number.is_integer() else number
+
+
+def _jsSplice(array, start):
+  """
+  javascript array.splice(start, 1)
+
+  Args:
+    array (list): list that is changed
+    start (int): start index; None is NaN / undefined
+  """
+  start = 0 if start is None else int(start)
+  if start<0:
+    start = max(len(array)+start, 0)
+  del array[start:start+1]
+  return
+
+
+def uuidv4():
+  """
+  Create a random id: 32 hex characters
+
+  Returns:
+    string: id
+  """
+  return secrets.token_hex(16)
+
+
+_lastID = [0, 0]  #milliseconds, random part of last time-ordered id
+_lockID = threading.Lock()
+
+def timeOrderedID():
+  """
+  Create a time-ordered id, like ULID: 32 hex characters
+  - 12 characters: milliseconds since 1970; ids of later documents sort after earlier ones, which keeps inserts
+    into the id-tree of the database local
+  - 20 characters: random; incremented if created in the same millisecond to keep order
+
+  Returns:
+    string: id
+  """
+  milliseconds = int(time.time()*1000)
+  with _lockID:
+    if milliseconds<=_lastID[0]:
+      milliseconds = _lastID[0]
+      random = _lastID[1]+1+secrets.randbelow(1<<16)
+      if random>=1<<80:   #overflow: move to next millisecond
+        milliseconds, random = milliseconds+1, secrets.randbits(79)
+    else:
+      random = secrets.randbits(79)  #leave room for increments
+    _lastID[:] = [milliseconds, random]
+  return f'{milliseconds:012x}{random:020x}'
+
+
+ID_SCHEME = ['time']  #default scheme of new document ids, set by backend from configuration
+
+def selectIDScheme(scheme):
+  """
+  Set the scheme of new document ids
+
+  Args:
+    scheme (string): 'time' (time-ordered) or 'random' (uuidv4)
+  """
+  if scheme not in ('time', 'random'):
+    print('**ERROR cts02: unknown id scheme |',scheme)
+    return
+  ID_SCHEME[0] = scheme
+  return
+
+
+def fillDocBeforeCreate(data, docType):
+  """
+  Fill the data before submission to database with common data
+  - type, project, childs
+  - separate comment into tags and fields
+  - protect and trim strings
+
+  Args:
+    data (dict): document to fill
+    docType (list, string): document type; used if data has no type
+
+  Returns:
+    dict: filled document; the given document is not changed
+  """
+  protectedKeys = ['comment','tags','image']
+  data = dict(data)
+  if _jsFalse(data.get('-type')):
+    data['-type'] = [docType]
+  if isinstance(data['-type'], str):
+    data['-type'] = data['-type'].split('/')
+  if _jsFalse(data.get('_id')):
+    prefix = 'x' if docType[0]=='x' else docType[0][0]
+    data['_id'] = prefix+'-'+(timeOrderedID() if ID_SCHEME[0]=='time' else uuidv4())
+  data['-date'] = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00','Z')
+  if _jsFalse(data.get('-branch')):
+    data['-branch'] = [{'stack':[], 'path':None}]
+  if _jsFalse(data.get('comment')):
+    data['comment'] = ''
+  if _jsFalse(data.get('tags')):
+    data['tags'] = []
+  # tags and fields from comment
+  rating    = RE_RATING.search(data['comment'])
+  rating    = [] if rating is None else [rating.group(0)]
+  otherTags = [i.group(0) for i in RE_OTHERTAGS.finditer(data['comment'])]
+  tags = data['tags'] if isinstance(data['tags'], list) else [data['tags']]
+  data['tags'] = rating+tags+otherTags
+  data['comment'] = RE_TAGS.sub(' ', data['comment'])
+  for item in RE_FIELDS.findall(data['comment']):
+    aList = item.split(':')
+    if not _jsFalse(data.get(aList[1])):
+      continue
+    number = _jsNumber(aList[2])
+    data[aList[1]] = aList[2] if number is None else number
+  data['comment'] = RE_FIELDS.sub('', data['comment'])
+  # indentation of comment: even number of spaces
+  comment = ''
+  for line in data['comment'].split('\n'):
+    initSpaces = RE_NONSPACE.search(line).start()
+    comment += ' '*((initSpaces+1)//2*2) + line.strip(JS_STRIP)+'\n'
+  data['comment'] = comment[:-1]
+  data['tags'] = [i.strip(JS_STRIP) for i in data['tags']]
+  # doc-type specific
+  if data['-type'][0]=='sample':
+    if _jsFalse(data.get('qrCode')):
+      data['qrCode'] = []
+    if isinstance(data['qrCode'], str):
+      data['qrCode'] = data['qrCode'].split(' ')
+  if data['-type'][0]=='measurement':
+    if _jsFalse(data.get('image')):
+      data['image'] = ''
+    if _jsFalse(data.get('shasum')):
+      data['shasum'] = ''
+  # remove empty strings, trim all others
+  for key in list(data.keys()):
+    if isinstance(data[key], str):
+      if data[key]=='' and key not in protectedKeys:
+        del data[key]
+      else:
+        data[key] = data[key].strip(JS_STRIP)
+  return data
+
+
+def ontology2Labels(ontology, tableFormat):
+  """
+  Extract labels of document types from ontology
+
+  Args:
+    ontology (dict): ontology
+    tableFormat (dict): tableFormat branch from .pastaELN.json
+
+  Returns:
+    dict: dataDict and hierarchyDict of docType: label
+  """
+  dataDict, hierarchyDict = {}, {}
+  for key in ontology:
+    if key in ('_id', '_rev'):
+      continue
+    if key in tableFormat and '-label-' in tableFormat[key]:
+      label = tableFormat[key]['-label-']
+    elif key[0]=='x':
+      labels = ['Projects', 'Tasks', 'Subtasks', 'Subsubtasks']
+      label = labels[int(key[1])] if key[1:2].isdigit() and int(key[1])<len(labels) else None
+    else:
+      label = key[0].upper()+key[1:]+'s'
+    if key[0]=='x':
+      hierarchyDict[key] = label
+    else:
+      dataDict[key] = label
+  return {'dataDict':dataDict, 'hierarchyDict':hierarchyDict}
+
+
+def hierarchy2String(data, addID, callback, detail, magicTags):
+  """
+  Convert hierarchy-view of database into org-mode string
+
+  Args:
+    data (dict): docID: [view-key, childNum, -type, -name]
+    addID (bool): add docID to output
+    callback (function): function to get document from docID; if None, only names are given
+    detail (string): 'all', 'tags', 'none'
+    magicTags (list): magic tags that are prefixed to the names
+
+  Returns:
+    string: output incl. \n
+  """
+  dataList = []
+  for key, value in data.items():
+    if value[0]==key:
+      hierString = key
+    else:
+      hierarchyIDs = value[0].split(' ')
+      hierString = hierarchyIDs[0]
+      for docID in hierarchyIDs[1:]:
+        childNum = data[docID][1] if docID in data else 0
+        if isinstance(childNum, (int, float)) and childNum>9999:
+          print('**ERROR** commonTools:ChildNUM>9999 **ERROR** '+key)
+        hierString += ' '+('00'+_jsString(childNum))[-3:]+' '+docID
+    dataList.append({'hierarchy':hierString, 'label':value[2:]})
+  dataList.sort(key=lambda item: item['hierarchy'])
+  outString = []
+  for item in dataList:
+    hierarchyArray = item['hierarchy'].split(' ')
+    prefix = '*'*(int(len(hierarchyArray)/2-0.5)+1)
+    if addID is True:
+      docID = hierarchyArray[-1]
+      partString = _jsString(item['label'][1])+'||'+docID
+      if callable(callback):
+        doc = callback(docID)
+        i = None                                  #counter of branches: reused below, as in js-code
+        if detail=='all':
+          for branch in doc['-branch']:
+            partString += '\nPath: '+_jsString(branch['path'])
+          partString += '\nInheritance: '
+          for branch in doc['-branch']:
+            partString += _jsString(branch['stack'])+' '
+          i = len(doc['-branch'])
+        tags = list(doc['tags'])
+        for tag in magicTags:
+          if '#'+tag in tags:
+            prefix += ' '+tag
+            i3 = 0
+            while i3<len(tags):
+              if tags[i3]=='#'+tag:
+                _jsSplice(tags, i)
+                i = None if i is None else i-1
+              i3 += 1
+        partString += '\nTags: '+' '.join(_jsString(i, True) for i in tags)+'\n'+_jsString(doc.get('comment'))
+      partString = prefix+' '+partString
+    else:
+      partString = prefix+' '+_jsString(item['label'][0])+': '+_jsString(item['label'][1])
+    outString.append(partString)
+  return '\n'.join(outString)
+
+
+def editString2Docs(text, magicTags):
+  """
+  Split org-mode string into documents
+
+  Args:
+    text (string): org-mode string
+    magicTags (list): magic tags that can prefix names
+
+  Returns:
+    list: list of documents, '-type' is the hierarchy level, 'edit' is '-new-', '-edit-', '-delete-'
+  """
+  def createDoc():
+    """
+    Document from current state
+
+    Returns:
+      dict: document
+    """
+    docI = {'-name':title, 'tags':_jsNull(tags), 'comment':_jsNull(comment), '_id':docID, '-type':docType}
+    if not _jsFalse(objective):
+      docI['objective'] = objective
+    if title=='-delete-' and docID!='':
+      docI['edit'] = '-delete-'
+    elif docID=='':
+      docI['edit'] = '-new-'
+    else:
+      docI['edit'] = '-edit-'
+    return docI
+
+  docs = []
+  objective, tags, comment = JS_NULL, JS_NULL, JS_NULL
+  title, docID, docType = '', '', ''
+  for line in text.split('\n'):
+    if re.match(r'\*{1,6} ', line):
+      if not _jsFalse(comment):
+        comment = comment.strip(JS_STRIP)
+      if docID!='' or title!='':
+        docs.append(createDoc())
+      objective, tags, comment = JS_NULL, JS_NULL, JS_NULL
+      title, docID, docType = '', '', ''
+      parts = line.split('||')
+      title = ' '.join(parts[0].split(' ')[1:]).strip(JS_STRIP)
+      for tag in magicTags[::-1]:
+        if title[:4]==tag:
+          title = title[len(tag)+1:]
+          tags = _jsString(tags)+'#'+tag+' '
+      if not _jsFalse(tags):
+        tags = tags.strip(JS_STRIP)
+      if len(parts)>1:
+        docID = parts[-1]
+      docType = len(line.split(' ')[0])-1
+    elif line[:10]=='Objective:':
+      objective = line[10:].strip(JS_STRIP)
+    elif line[:5]=='Tags:':
+      tags = line[5:].strip(JS_STRIP) if tags is JS_NULL else tags+line[5:].strip(JS_STRIP)
+    elif RE_EDITLINE.search(line) is None:
+      comment = line+'\n' if comment is JS_NULL else comment+line+'\n'
+  if not _jsFalse(comment):
+    comment = comment.strip(JS_STRIP)
+  docs.append(createDoc())
+  return docs
+
+
+def _jsNull(value):
+  """
+  Convert javascript null to None for output
+
+  Args:
+    value (any): value
+
+  Returns:
+    any: value or None
+  """
+  return None if value is JS_NULL else value
+
+
+def getChildren(data, docID):
+  """
+  Get children of document from org-mode string
+
+  Args:
+    data (string): org-mode string incl. ids
+    docID (string): id of parent
+
+  Returns:
+    dict: names and ids of children
+  """
+  names, ids = [], []
+  saveLine = False
+  numStarsParent = -1
+  for line in data.split('\n'):
+    items = line.split('||')
+    itemID = items[1] if len(items)>1 else None
+    if saveLine:
+      nStars = len(items[0].split(' ')[0])
+      if nStars==numStarsParent:
+        break
+      if nStars==numStarsParent+1:
+        ids.append(itemID)
+        names.append(items[0][numStarsParent+2:])
+    if itemID==docID:
+      if items[0][:1]=='*':
+        numStarsParent = len(items[0].split(' '))
+      else:
+        numStarsParent = 0
+      saveLine = True
+  return {'names':names, 'ids':ids}
+
+
+def camelCase(text):
+  """
+  Convert string to camel-case, e.g. for directory names
+
+  Args:
+    text (string): input string
+
+  Returns:
+    string: camel-case string
+  """
+  def replace(match):
+    """
+    Replace: remove spaces, upper case all others
+
+    Args:
+      match (re.Match): match
+
+    Returns:
+      string: replacement
+    """
+    if RE_SPACE.search(match.group(0)):
+      return ''
+    return match.group(0).upper()
+  return RE_NONWORD.sub('', RE_CAMEL.sub(replace, text))
+
+
+commonTools = SimpleNamespace(uuidv4=uuidv4, timeOrderedID=timeOrderedID,
+                              fillDocBeforeCreate=fillDocBeforeCreate,
+                              ontology2Labels=ontology2Labels, hierarchy2String=hierarchy2String,
+                              editString2Docs=editString2Docs, getChildren=getChildren, camelCase=camelCase)
+
+
+class JsCommonTools:
+  """
+  commonTools translated by js2py with results converted to python objects
+  """
+  def __init__(self):
+    from commonTools import commonTools as cT  #not globally imported since slow
+    self.cT = cT
+
+  def uuidv4(self):
+    """
+    Returns:
+      string: id
+    """
+    return str(self.cT.uuidv4())
+
+  def timeOrderedID(self):
+    """
+    Returns:
+      string: time-ordered id; not part of javascript commonTools
+    """
+    return timeOrderedID()
+
+  def fillDocBeforeCreate(self, data, docType):
+    """
+    Args:
+      data (dict): document to fill
+      docType (list, string): document type
+
+    Returns:
+      dict: filled document
+    """
+    if _jsFalse(data.get('_id')) and ID_SCHEME[0]=='time':  #javascript only knows random ids
+      data = dict(data, _id=('x' if docType[0]=='x' else docType[0][0])+'-'+timeOrderedID())
+    return self.cT.fillDocBeforeCreate(data, docType).to_dict()
+
+  def ontology2Labels(self, ontology, tableFormat):
+    """
+    Args:
+      ontology (dict): ontology
+      tableFormat (dict): tableFormat branch from .pastaELN.json
+
+    Returns:
+      dict: dataDict and hierarchyDict
+    """
+    return self.cT.ontology2Labels(ontology, tableFormat).to_dict()
+
+  def hierarchy2String(self, data, addID, callback, detail, magicTags):
+    """
+    Args:
+      data (dict): docID: [view-key, childNum, -type, -name]
+      addID (bool): add docID to output
+      callback (function): function to get document from docID
+      detail (string): 'all', 'tags', 'none'
+      magicTags (list): magic tags
+
+    Returns:
+      string: output incl. \n
+    """
+    return str(self.cT.hierarchy2String(data, addID, callback, detail, magicTags))
+
+  def editString2Docs(self, text, magicTags):
+    """
+    Args:
+      text (string): org-mode string
+      magicTags (list): magic tags
+
+    Returns:
+      list: list of documents
+    """
+    return self.cT.editString2Docs(text, magicTags).to_list()
+
+  def getChildren(self, data, docID):
+    """
+    Args:
+      data (string): org-mode string incl. ids
+      docID (string): id of parent
+
+    Returns:
+      dict: names and ids of children
+    """
+    return self.cT.getChildren(data, docID).to_dict()
+
+  def camelCase(self, text):
+    """
+    Args:
+      text (string): input string
+
+    Returns:
+      string: camel-case string
+    """
+    return str(self.cT.camelCase(text))
+
+
+ENGINES = {'python':commonTools}
+ENGINE = ['python']  #default engine, set by backend from configuration
+
+
+def selectEngine(engine):
+  """
+  Set the default implementation of commonTools
+
+  Args:
+    engine (string): 'python' (native) or 'js' (translated by js2py)
+  """
+  if engine not in ('python', 'js'):
+    print('**ERROR cts01: unknown commonTools engine |',engine)
+    return
+  ENGINE[0] = engine
+  return
+
+
+def getCommonTools(engine=None):
+  """
+  Get implementation of commonTools
+
+  Args:
+    engine (string): 'python' (native) or 'js' (translated by js2py); None=default
+
+  Returns:
+    object: commonTools with functions uuidv4, timeOrderedID, fillDocBeforeCreate, ontology2Labels, hierarchy2String,
+      editString2Docs, getChildren, camelCase
+  """
+  engine = engine or ENGINE[0]
+  if engine not in ENGINES:
+    ENGINES[engine] = JsCommonTools()
+  return ENGINES[engine]
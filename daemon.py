@@ -0,0 +1,230 @@
+#!/usr/bin/python3
+""" Backend daemon: keep backends open and serve pastaELN.py commands over a local socket
+
+Every pastaELN.py call otherwise reads the configuration, connects to the database, loads the
+ontology and translates it, before any work is done. The daemon does this once per configuration
+link and answers the commands of pastaELN.py, which falls back to in-process execution if no daemon
+is running.
+"""
+import os, json, socket, socketserver, threading, traceback
+from contextlib import contextmanager
+from pathlib import Path
+
+SOCKET_PATH = Path.home()/'.pastaELN.sock'
+#commands that do not use a backend or that change the configuration/database setup: never forwarded
+LOCAL_COMMANDS = ['help', 'up', 'daemon', 'daemonStop', 'newDB', 'extractorScan', 'scramble', 'decipher',
+                  'verifyConfiguration', 'verifyConfigurationDev', 'test', 'testDev', 'updatePASTA',
+                  'benchStartup', 'apiServer']
+ARGUMENTS = ['command', 'docID', 'content', 'label', 'database']
+CONNECT_TIMEOUT = 1  #seconds to connect to daemon
+START_TIMEOUT = 10   #seconds until daemon starts command, e.g. after long scan of other client; see sendCommand
+
+
+class BackendPool:
+  """
+  Open backends: one per configuration link
+  - after a change of the configuration, the new backends are opened first; the old ones are closed
+    when their last user (see use) is done
+  """
+  def __init__(self):
+    self.backends = {}
+    self.configTime = None
+    self.users = {}     #id of backend: number of users in other threads
+    self.retired = []   #backends of old configuration: close once unused
+    self.lock = threading.RLock()
+
+
+  def get(self, linkName):
+    """
+    Get backend of this configuration link and open it, if it is not open yet
+    - backend is not counted as used: only for one caller at a time, e.g. daemon; concurrent callers use 'use'
+
+    Args:
+      linkName (string): name of configuration/link; if empty, use default
+
+    Returns:
+      Pasta: backend with new context
+    """
+    from backend import Pasta, Context
+    with self.lock:
+      configTime = (Path.home()/'.pastaELN.json').stat().st_mtime
+      if configTime != self.configTime:  #configuration changed: start from scratch
+        self.retired += list(self.backends.values())
+        self.backends = {}
+        self.configTime = configTime
+      if linkName=='':
+        with open(Path.home()/'.pastaELN.json','r', encoding='utf-8') as confFile:
+          linkName = json.load(confFile)['default']
+      if linkName not in self.backends or not self.backends[linkName].alive:
+        self.backends[linkName] = Pasta(linkDefault=linkName, backgroundViews=True)  #process stays: swap views in background
+        self.backends[linkName].db.warmViews()  #first queries of clients should not wait for indexing
+      self.closeRetired()
+      be = self.backends[linkName]
+      be.ctx = Context()  #every request starts without project
+    return be
+
+
+  @contextmanager
+  def use(self, linkName):
+    """
+    Use backend of this configuration link: it stays open until the end of the with-block, even if the
+    configuration changes in the meantime
+    - use: with pool.use(''): ...
+
+    Args:
+      linkName (string): name of configuration/link; if empty, use default
+
+    Yields:
+      Pasta: backend
+    """
+    with self.lock:
+      be = self.get(linkName)
+      self.users[id(be)] = self.users.get(id(be), 0)+1
+    try:
+      yield be
+    finally:
+      with self.lock:
+        self.users[id(be)] -= 1
+        if self.users[id(be)]==0:
+          del self.users[id(be)]
+        self.closeRetired()
+
+
+  def closeRetired(self):
+    """
+    Close backends of old configuration that are not used anymore
+    """
+    for be in [i for i in self.retired if id(i) not in self.users]:
+      self.retired.remove(be)
+      if be.alive:
+        be.exit()
+    return
+
+
+  def exit(self):
+    """
+    Close all backends
+    """
+    with self.lock:
+      for be in list(self.backends.values())+self.retired:
+        if be.alive:
+          be.exit()
+      self.backends, self.retired = {}, []
+    return
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+  """
+  Handle one request: one line of json with the arguments of pastaELN.py
+  """
+  def handle(self):
+    import argparse, io
+    from contextlib import redirect_stdout
+    from pastaELN import commands
+    request = json.loads(self.rfile.readline())
+    if request['command']=='ping':
+      self.wfile.write(json.dumps({'result':'1', 'output':''}).encode()+b'\n')
+      return
+    if request['command']=='daemonStop':
+      self.wfile.write(json.dumps({'result':'1', 'output':'Daemon stopped\n'}).encode()+b'\n')
+      threading.Thread(target=self.server.shutdown).start()
+      return
+    args = argparse.Namespace(**{key:request.get(key, '') for key in ARGUMENTS})
+    output = io.StringIO()
+    with self.server.lock:  #one command at a time: stdout, working directory and backends are shared
+      try:
+        self.wfile.write(json.dumps({'started':True}).encode()+b'\n')
+      except OSError:  #client waited too long and executes command itself
+        return
+      try:
+        os.chdir(request.get('cwd', Path.home()))  #relative file names are those of the client
+        with redirect_stdout(output):
+          result = commands(False, args, self.server.pool)
+      except:
+        output.write('**ERROR dae01: daemon could not execute command\n'+traceback.format_exc())
+        result = '-1'
+    self.wfile.write(json.dumps({'result':result, 'output':output.getvalue()}).encode()+b'\n')
+    return
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+  """
+  Unix-socket server that holds the pool of open backends
+  """
+  daemon_threads = True
+  def __init__(self, socketPath):
+    super().__init__(str(socketPath), DaemonHandler)
+    self.pool = BackendPool()
+    self.lock = threading.Lock()
+
+
+def runDaemon(socketPath=SOCKET_PATH):
+  """
+  Run daemon until daemonStop is received
+
+  Args:
+    socketPath (Path): path of unix socket
+
+  Returns:
+    bool: success
+  """
+  if not hasattr(socket, 'AF_UNIX'):
+    print('**ERROR dae02: daemon requires unix sockets, which this system does not offer')
+    return False
+  if socketPath.exists():
+    if sendCommand({'command':'ping'}, socketPath) is not None:
+      print('**ERROR dae03: daemon is already running |',socketPath)
+      return False
+    socketPath.unlink()  #left over from crashed daemon
+  with DaemonServer(socketPath) as server:
+    socketPath.chmod(0o600)
+    try:
+      server.pool.get('')  #open default backend and update its views
+    except:
+      print('**ERROR dae04: could not open default backend\n'+traceback.format_exc())
+    print('Daemon listens on',socketPath)
+    try:
+      server.serve_forever()
+    finally:
+      server.pool.exit()
+      socketPath.unlink()
+  return True
+
+
+def sendCommand(args, socketPath=SOCKET_PATH, timeout=None):
+  """
+  Send command to daemon
+  - daemon confirms the start of the command. If it does not within timeout, e.g. since it is busy or hangs,
+    the daemon is treated as not running: the caller executes the command and the daemon skips it
+  - once started, wait for the result: executing it again would repeat changes
+
+  Args:
+    args (dict, argparse.Namespace): arguments of pastaELN.py
+    socketPath (Path): path of unix socket
+    timeout (float): seconds until start of command; default: environment variable PASTA_DAEMON_TIMEOUT or
+      START_TIMEOUT
+
+  Returns:
+    tuple: result, printed output; None if daemon is not running
+  """
+  if not hasattr(socket, 'AF_UNIX') or not socketPath.exists():
+    return None
+  if not isinstance(args, dict):
+    args = {key:getattr(args, key) for key in ARGUMENTS}
+  args['cwd'] = os.getcwd()
+  if timeout is None:
+    timeout = float(os.environ.get('PASTA_DAEMON_TIMEOUT', START_TIMEOUT))
+  try:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+      client.settimeout(CONNECT_TIMEOUT)
+      client.connect(str(socketPath))
+      client.settimeout(timeout)
+      client.sendall(json.dumps(args).encode()+b'\n')
+      with client.makefile('rb') as fIn:
+        reply = json.loads(fIn.readline())
+        if reply.get('started', False):
+          client.settimeout(None)
+          reply = json.loads(fIn.readline())
+  except (OSError, ValueError):  #incl. timeout
+    return None
+  return reply['result'], reply['output']
@@ -2,9 +2,14 @@
 """
 import traceback
 from pathlib import PosixPath
-from serverActions import testUser
+from designDocuments import DesignDocuments
 
-class Database:
+CACHE_BYTES = 4*2**20  #responses larger than this are not written to on-disk cache
+UPDATE_ATTEMPTS = 6    #writes of one update after version conflicts
+DOCS_PER_REQUEST = 250 #getDocs: more documents are read with concurrent requests of this size
+
+
+class Database(DesignDocuments):
   """
   Class for interaction with couchDB
   """
@@ -18,34 +23,55 @@ class Database:
         confirm (function): confirm changes to database and file-tree
         softwarePath (string): path to software and default dataDictionary.json
         kwargs (dict): additional parameter
+          - url (string): url of server; default http://127.0.0.1:5984
+          - adapter (HTTPAdapter): transport adapter of requests, e.g. of fakeCouchDB for tests without server
+          - backgroundViews (bool): build changed views in background thread; only for long-running processes
     """
     import json
     from cloudant.client import CouchDB
+    from cloudant.database import CouchDatabase
+    from cloudant.document import Document
+    from requests.exceptions import HTTPError
+    from docCache import DocCache
+    from provenance import Provenance
+    from transport import Transport
     self.confirm = confirm
     try:
-      self.client = CouchDB(user, password, url='http://127.0.0.1:5984', connect=True)
+      self.client = CouchDB(user, password, url=kwargs.get('url', 'http://127.0.0.1:5984'), connect=True,
+                            adapter=kwargs.get('adapter'))
     except:
       print('**ERROR dit01: Something unexpected has happend\n'+traceback.format_exc())
       raise
+    self.transport = Transport(self.client.r_session, timeout=kwargs.get('timeout', (5, 300)))
     self.databaseName = databaseName
-    if self.databaseName in self.client.all_dbs():
-      self.db = self.client[self.databaseName]
-    else:
-      self.db = self.client.create_database(self.databaseName)
+    self.views = {}  #cache of getView: path: View
+    self.backgroundViews = kwargs.get('backgroundViews', False)
+    self.stats = {'viewRoundTripsSaved':0, 'notModified':0, 'updates':0, 'conflicts':0, 'conflictsMerged':0,
+                  'conflictsLost':0}
+    self.cache = DocCache(self, self.stats, maxEntries=kwargs.get('cacheEntries', 2000),
+                          maxBytes=kwargs.get('cacheBytes', 64*2**20), checkInterval=kwargs.get('cacheCheck', 1))
+    self.provenance = Provenance(kwargs.get('provenance', 'full'), self.registerCallSite)
+    self.db = CouchDatabase(self.client, self.databaseName)  #do not list all databases on server
+    if not self.db.exists():
+      self.db.create()
     # check if default documents exist and create
-    if '-ontology-' not in self.db or kwargs.get('resetOntology', False):
-      if '-ontology-' in self.db:
+    self.ontology = Document(self.db, '-ontology-')
+    try:
+      self.ontology.update(self.getCached(self.ontology.document_url))
+    except HTTPError:
+      self.ontology = None
+    if self.ontology is None or kwargs.get('resetOntology', False):
+      if self.ontology is not None:
         print('Info: remove old ontology')
-        self.db['-ontology-'].delete()
+        self.ontology.delete()
       with open(softwarePath.joinpath('ontology.json'), 'r', encoding='utf-8') as fIn:
         doc = json.load(fIn)
-      _ = self.db.create_document(doc)
-    # check if default views exist and create them
-    self.ontology    = self.db['-ontology-']
+      self.ontology = self.db.create_document(doc)
+    self.finishViews(wait=False)  #start must not wait for views that were not finished
     return
 
 
-  def initViews(self, docTypesLabels, magicTags=['TODO','v1'], guiMaxColumns=16):
+  def initViews(self, docTypesLabels, magicTags=['TODO','v1'], guiMaxColumns=16, viewCode=None):
     """
     initialize all views
 
@@ -53,7 +79,30 @@ class Database:
       docTypesLabels (list): pair of (docType,docLabel) used to create views
       magicTags (list): magic tags used for view creation
       guiMaxColumns (int): max. colums in view
+      viewCode (dict): code of all design documents, e.g. from cache; None=create from ontology
+    """
+    if viewCode is None:
+      viewCode = self.createViewCode(docTypesLabels, magicTags, guiMaxColumns)
+    for designName, views in viewCode.items():
+      self.saveView(designName, views)
+    #same as applyChange and attachRevision of updateDoc for changes of -branch: document incl. image does not travel
+    self.saveUpdates('pastaUpdate', {'branch':'updateBranch.js'})
+    return
+
+
+  def createViewCode(self, docTypesLabels, magicTags=['TODO','v1'], guiMaxColumns=16):
+    """
+    create javascript code of all views from ontology
+
+    Args:
+      docTypesLabels (list): pair of (docType,docLabel) used to create views
+      magicTags (list): magic tags used for view creation
+      guiMaxColumns (int): max. colums in view
+
+    Returns:
+      dict: design-document name: {view name: javascript code}
     """
+    designDocs = {}
     # for the individual docTypes
     jsDefault = "if ($docType$) {emit($key$, [$outputList$]);}"
     viewCode = {}
@@ -88,7 +137,7 @@ class Database:
       outputList = ','.join(outputList)
       jsString = jsString.replace('$outputList$', outputList)
       viewCode[docType.replace('/','__')]=jsString
-    self.saveView('viewDocType', viewCode)
+    designDocs['viewDocType'] = viewCode
     # general views: Hierarchy, Identify
     jsHierarchy  = '''
       if ('-type' in doc) {
@@ -101,14 +150,13 @@ class Database:
         else                {doc['-branch'].forEach(function(branch){if(branch.path){emit(branch.path,[branch.stack,doc['-type'],branch.child,''        ]);}});}
       }
     '''
-    self.saveView('viewHierarchy',{'viewHierarchy':jsHierarchy,'viewPaths':jsPath})
+    designDocs['viewHierarchy'] = {'viewHierarchy':jsHierarchy,'viewPaths':jsPath}
     jsSHA= "if (doc['-type'][0]==='measurement'){emit(doc.shasum, doc['-name']);}"
     jsQR = "if (doc.qrCode.length > 0)"
     jsQR+= "{doc.qrCode.forEach(function(thisCode) {emit(thisCode, doc['-name']);});}"
     jsTags=str(magicTags)+".forEach(function(tag){if(doc.tags.indexOf('#'+tag)>-1) emit('#'+tag, doc['-name']);});"
-    views = {'viewQR':jsQR, 'viewSHAsum':jsSHA, 'viewTags':jsTags}
-    self.saveView('viewIdentify', views)
-    return
+    designDocs['viewIdentify'] = {'viewQR':jsQR, 'viewSHAsum':jsSHA, 'viewTags':jsTags}
+    return designDocs
 
 
   def exit(self, deleteDB=False):
@@ -126,17 +174,161 @@ class Database:
     return
 
 
-  def getDoc(self, docID):
+  def getDoc(self, docID, fresh=False):
     """
     Wrapper for get from database function
+    - from cache of documents, if it is there and did not change
 
     Args:
         docID (dict): document id
+        fresh (bool): read from database, not from cache, which can be checkInterval old: for documents that
+          are changed and saved, since a stale base would look like a concurrent change
+
+    Returns:
+        Document: json representation of document; can be changed and saved
+    """
+    from cloudant.document import Document
+    from requests.exceptions import HTTPError
+    doc = Document(self.db, docID)
+    cached = None if fresh else self.cache.get(docID)
+    if cached is not None:
+      doc.update(cached)
+      return doc
+    try:
+      doc.fetch()
+    except HTTPError as error:
+      if error.response is not None and error.response.status_code==404:
+        raise KeyError(docID) from None
+      raise
+    self.cache.put(doc)
+    return doc
+
+
+  def getCached(self, url, params=None):
+    """
+    GET json from database and revalidate with ETag of on-disk cache (miscTools.cacheDir)
+    - unchanged: server replies 304 without content, the cached content is used
+    - changed: content and new ETag are written to cache
+    - only for repeated requests without user documents: ontology, design documents, views without include_docs
+
+    Args:
+        url (string): url of document or view
+        params (dict): query parameters
+
+    Returns:
+        dict: content
+
+    Raises:
+        HTTPError: if request failed, e.g. 404
+    """
+    import json, hashlib
+    from miscTools import readCache, writeCache
+    request = url+'?'+json.dumps(params or {}, sort_keys=True)
+    name = 'http_'+hashlib.sha1(request.encode('utf-8')).hexdigest()
+    entry = readCache(name, request)
+    headers = {'If-None-Match':entry['etag']} if entry is not None else {}
+    res = self.client.r_session.get(url, params=params, headers=headers)
+    if res.status_code==304 and entry is not None:
+      self.stats['notModified'] += 1
+      return entry['content']
+    res.raise_for_status()
+    content = res.json()
+    if 'ETag' in res.headers and len(res.content)<CACHE_BYTES:
+      writeCache(name, request, {'etag':res.headers['ETag'], 'content':content})
+    return content
+
+
+  def getDocs(self, docIDs):
+    """
+    Get many documents with one request (_all_docs with keys)
+    - more than DOCS_PER_REQUEST documents: concurrent requests with AsyncDatabase
+
+    Args:
+        docIDs (list): document ids
+
+    Returns:
+        dict: docID: json representation of document; None if it does not exist or could not be read
+    """
+    import asyncio
+    docIDs = list(dict.fromkeys(docIDs))
+    if len(docIDs)==0:
+      return {}
+    if len(docIDs)>DOCS_PER_REQUEST:
+      chunks = [docIDs[i:i+DOCS_PER_REQUEST] for i in range(0, len(docIDs), DOCS_PER_REQUEST)]
+      docs = {}
+      for result in self.runAsync(lambda adb: asyncio.gather(*[adb.getDocs(i) for i in chunks])):
+        docs.update(result)
+      return docs
+    try:
+      res = self.client.r_session.post(self.db.database_url+'/_all_docs', params={'include_docs':'true'},
+                                       json={'keys':docIDs})
+      res.raise_for_status()
+    except:
+      print('**ERROR dgd01: could not get documents\n'+traceback.format_exc())
+      return {docID:None for docID in docIDs}
+    docs = {docID:None for docID in docIDs}
+    docs.update({row['key']:row['doc'] for row in res.json()['rows'] if row.get('doc')})
+    return docs
+
+
+  def callStack(self):
+    """
+    Call stack of PASTA functions: stored as '-client' in documents
+    - id of call site, see provenance.py; resolve with callSiteDescription
+
+    Returns:
+        string: id of call stack of caller
+    """
+    return self.provenance.callSite(skip=1)
+
+
+  def registerCallSite(self, siteID, description):
+    """
+    Add call site to '-provenance-' document, if it is not there already
+    - all call sites of that document are known afterwards: they are not registered again
+
+    Args:
+        siteID (string): id of call site
+        description (string): | separated list of file:function:line
+    """
+    url = self.db.database_url+'/-provenance-'
+    try:
+      for _ in range(3):  #retry if other client registered at the same time
+        res = self.client.r_session.get(url)
+        if res.status_code==404:
+          doc = {'_id':'-provenance-', 'callSites':{}}
+        else:
+          res.raise_for_status()
+          doc = res.json()
+        self.provenance.known.update(doc['callSites'])
+        if siteID in doc['callSites']:
+          return
+        doc['callSites'][siteID] = description
+        res = self.client.r_session.put(url, json=doc)
+        if res.status_code!=409:
+          res.raise_for_status()
+          return
+    except:
+      print('**Warning dpr01: could not register call site |',siteID,description)
+    return
+
+
+  def callSiteDescription(self, siteID):
+    """
+    Args:
+        siteID (string): id of call site, as in '-client' of documents
 
     Returns:
-        string: json representation of document
+        string: | separated list of file:function:line; None if unknown
     """
-    return self.db[docID]
+    if siteID not in self.provenance.known:
+      try:
+        res = self.client.r_session.get(self.db.database_url+'/-provenance-')
+        res.raise_for_status()
+        self.provenance.known.update(res.json()['callSites'])
+      except:
+        return None
+    return self.provenance.known.get(siteID)
 
 
   def saveDoc(self, doc):
@@ -149,16 +341,14 @@ class Database:
     Returns:
         dict: json representation of submitted document
     """
-    tracebackString = traceback.format_stack()
-    tracebackString = [item for item in tracebackString if 'backend.py' in item or 'database.py' in item or 'Tests' in item or 'pasta' in item]
-    tracebackString = '|'.join([item.split('\n')[1].strip() for item in tracebackString])  #| separated list of stack excluding last
-    doc['-client'] = tracebackString
+    doc['-client'] = self.callStack()
     if '-branch' in doc and 'op' in doc['-branch']:
       del doc['-branch']['op']  #remove operation, saveDoc creates and therefore always the same
       doc['-branch'] = [doc['-branch']]
     if self.confirm is None or self.confirm(doc,"Create this document?"):
       try:
         res = self.db.create_document(doc)
+        self.cache.put(res)
       except:
         print('**ERROR: database.py:saveDoc could not save, likely JSON issue')
         print(doc)
@@ -168,13 +358,188 @@ class Database:
     return res
 
 
+  def saveDocs(self, docs):
+    """
+    Save many documents with one request (_bulk_docs)
+
+    Args:
+        docs (list): documents to save; '-client' is kept if given, e.g. from time of buffering
+
+    Returns:
+        list: for each document: json representation of submitted document; None if it could not be saved
+    """
+    client = self.callStack()
+    results, submit = [], []  #submit: index in results
+    for doc in docs:
+      if '-client' not in doc:
+        doc['-client'] = client
+      if '-branch' in doc and 'op' in doc['-branch']:
+        del doc['-branch']['op']  #remove operation, saveDoc creates and therefore always the same
+        doc['-branch'] = [doc['-branch']]
+      if self.confirm is None or self.confirm(doc,"Create this document?"):
+        submit.append(len(results))
+      results.append(doc)
+    if len(submit)==0:
+      return results
+    try:
+      res = self.client.r_session.post(self.db.database_url+'/_bulk_docs', json={'docs':[results[i] for i in submit]})
+      res.raise_for_status()
+    except:
+      print('**ERROR dsd01: database.py:saveDocs could not save, likely JSON issue\n'+traceback.format_exc())
+      return [None if i in submit else doc for i, doc in enumerate(results)]
+    for idx, reply in zip(submit, res.json()):
+      if 'error' in reply:
+        print('**ERROR dsd02: could not save document |',reply['id'],reply['error'],reply.get('reason',''))
+        results[idx] = None
+      else:
+        results[idx]['_id'], results[idx]['_rev'] = reply['id'], reply['rev']
+        self.cache.put(results[idx])
+    return results
+
+
+  def applyChange(self, change, newDoc):
+    """
+    Apply change to document: used by updateDoc(s)
+
+    Args:
+        change (dict): item to update, see updateDoc
+        newDoc (dict): document that stays live; is changed
+
+    Returns:
+        dict: older revision: content that was changed; None if nothing changed
+    """
+    import os
+    if 'edit' in change:     #if delete
+      oldDoc = dict(newDoc)
+      for item in oldDoc:
+        if item not in ('_id', '_rev', '-branch'):
+          del newDoc[item]
+      newDoc['-client'] = change['-client']
+      newDoc['-user']   = change['-user']
+      return oldDoc
+    #if update
+    oldDoc = {}            #this is an older revision of the document
+    nothingChanged = True
+    # handle branch
+    if '-branch' in change and len(change['-branch']['stack'])>0:
+      op = change['-branch'].pop('op')
+      oldpath = change['-branch'].pop('oldpath',None)
+      if change['-branch']['path'] is None:
+        change['-branch']['path']=newDoc['-branch'][0]['path']
+      if not change['-branch'] in newDoc['-branch']:       #skip if new branch is already in branch
+        oldDoc['-branch'] = newDoc['-branch'].copy()
+        for branch in newDoc['-branch']:
+          if op=='c' and branch['path']==change['-branch']['path']:
+            op='u'
+        if op=='c':    #create, append
+          newDoc['-branch'] += [change['-branch']]
+          nothingChanged = False
+        elif op=='u':  #update
+          if oldpath is not None:
+            for branch in newDoc['-branch']:
+              if branch['path'].startswith(oldpath):
+                if os.path.basename(branch['path']) == newDoc['-name'] and \
+                   os.path.basename(change['-branch']['path'])!='':
+                  newDoc['-name'] = os.path.basename(change['-branch']['path'])
+                branch['path'] = branch['path'].replace(oldpath ,change['-branch']['path'])
+                branch['stack']= change['-branch']['stack']
+                break
+          else:
+            newDoc['-branch'][0] = change['-branch'] #change the initial one
+          nothingChanged = False
+        elif op=='d':  #delete
+          originalLength = len(newDoc['-branch'])
+          newDoc['-branch'] = [branch for branch in newDoc['-branch'] if branch['path']!=change['-branch']['path']]
+          if originalLength!=len(newDoc['-branch']):
+            nothingChanged = False
+        else:
+          return None
+    #handle other items
+    # change has to be dict, not Document
+    for item in change:
+      if item in ['_id','_rev','-branch']:                #skip items cannot do not result in change
+        continue
+      if item=='-type' and change['-type']=='--':          #skip non-set type
+        continue
+      if item=='image' and change['image']=='':          #skip if non-change in image
+        continue
+      if change[item] is None or item not in newDoc:      #skip empty entries
+        continue
+      ## Discussion: What if content only differs by whitespace changes?
+      # These changes should occur in the database, the user wanted it so
+      # Do these changes justify a new revision?
+      # Hence one could update the doc and previous-revision(with the current _rev)
+      #  - but that would lead to special cases, more code, chaos
+      #  - also not sure how often simple white space changes occur, how important
+      # To identify these cases use the following
+      # if (isinstance(change[item], str) and " ".join(change[item].split())!=" ".join(newDoc[item].split()) ) or \
+      #    (isinstance(change[item], list) and change[item]!=newDoc[item] ):
+      # Add to testBasic to test for it:
+      #       myString = myString.replace('A long comment','A long   comment')
+      if change[item]!=newDoc[item]:
+        if item not in ['-date','-client','-user']:      #if only date/client change, no significant change
+          nothingChanged = False
+        if item == 'image':
+          oldDoc[item] = 'image changed'       #don't backup images: makes database big and are only thumbnails anyhow
+        else:
+          oldDoc[item] = newDoc[item]
+        newDoc[item] = change[item]
+    if nothingChanged:
+      return None
+    return oldDoc
+
+
+  def attachRevision(self, doc, previousDoc):
+    """
+    Add older revision as inline attachment vN.json to document: saved with the document in the same request
+    - attachment is JSON-patch from new to previous version (see jsonPatch.py), incl. previous _rev
+    - images are not backed up: makes database big and are only thumbnails anyhow
+
+    Args:
+        doc (dict): document to save; existing attachments are stubs
+        previousDoc (dict): previous version of document
+    """
+    import json, base64
+    from jsonPatch import createPatch
+    current  = {key:value for key,value in doc.items() if key not in ('_id','_rev','_attachments')}
+    previous = {key:value for key,value in previousDoc.items() if key not in ('_id','_rev','_attachments')}
+    if 'image' in previous and previous['image']!=current.get('image'):
+      previous['image'] = 'image changed'
+    patch = createPatch(current, previous)
+    if '_rev' in previousDoc:
+      patch.append({'op':'replace', 'path':'/_rev', 'value':previousDoc['_rev']})
+    doc['_attachments'] = doc.get('_attachments', {})
+    attachmentName = 'v'+str(len(doc['_attachments']))+'.json'
+    doc['_attachments'][attachmentName] = {'content_type':'application/json-patch+json',
+      'data':base64.b64encode(json.dumps(patch).encode('utf-8')).decode('ascii')}
+    return
+
+
+  def revisionSaved(self, doc, rev):
+    """
+    After saving document with inline attachments: they are stubs on server now; update cache
+
+    Args:
+        doc (dict): saved document
+        rev (string): new revision from reply of server
+    """
+    doc['_rev'] = rev
+    for attachment in doc.get('_attachments', {}).values():
+      if 'data' in attachment:
+        del attachment['data']
+        attachment['stub'] = True
+    self.cache.put(doc)
+    return
+
+
   def updateDoc(self, change, docID):
     """
     Update document by
     - saving changes to oldDoc (revision document)
-    - updating new-document concurrently
-    - create a docID for oldDoc
+    - updating new-document concurrently: oldDoc is inline attachment of the same request (one new revision)
     - Bonus: save '_rev' from newDoc to oldDoc in order to track that updates cannot happen by accident
+    - version conflict (other client saved in the meantime): read again and apply change again, if the other
+      client changed other items; retry with increasing wait
 
     Args:
         change (dict): item to update
@@ -185,103 +550,237 @@ class Database:
     Returns:
         dict: json representation of updated document
     """
-    import json, os
-    tracebackString = traceback.format_stack()
-    tracebackString = [item for item in tracebackString if 'backend.py' in item or 'database.py' in item or 'Tests' in item or 'pasta' in item]
-    tracebackString = '|'.join([item.split('\n')[1].strip() for item in tracebackString])  #| separated list of stack excluding last
-    change['-client'] = tracebackString
-    newDoc = self.db[docID]  #this is the document that stays live
-    initialDocCopy = dict(newDoc)
-    if 'edit' in change:     #if delete
-      oldDoc = dict(newDoc)
-      for item in oldDoc:
-        if item not in ('_id', '_rev', '-branch'):
-          del newDoc[item]
-      newDoc['-client'] = tracebackString
-      newDoc['-user']   = change['-user']
-    else:                    #if update
-      oldDoc = {}            #this is an older revision of the document
-      nothingChanged = True
-      # handle branch
-      if '-branch' in change and len(change['-branch']['stack'])>0:
-        op = change['-branch'].pop('op')
-        oldpath = change['-branch'].pop('oldpath',None)
-        if change['-branch']['path'] is None:
-          change['-branch']['path']=newDoc['-branch'][0]['path']
-        if not change['-branch'] in newDoc['-branch']:       #skip if new branch is already in branch
-          oldDoc['-branch'] = newDoc['-branch'].copy()
-          for branch in newDoc['-branch']:
-            if op=='c' and branch['path']==change['-branch']['path']:
-              op='u'
-          if op=='c':    #create, append
-            newDoc['-branch'] += [change['-branch']]
-            nothingChanged = False
-          elif op=='u':  #update
-            if oldpath is not None:
-              for branch in newDoc['-branch']:
-                if branch['path'].startswith(oldpath):
-                  if os.path.basename(branch['path']) == newDoc['-name'] and \
-                     os.path.basename(change['-branch']['path'])!='':
-                    newDoc['-name'] = os.path.basename(change['-branch']['path'])
-                  branch['path'] = branch['path'].replace(oldpath ,change['-branch']['path'])
-                  branch['stack']= change['-branch']['stack']
-                  break
-            else:
-              newDoc['-branch'][0] = change['-branch'] #change the initial one
-            nothingChanged = False
-          elif op=='d':  #delete
-            originalLength = len(newDoc['-branch'])
-            newDoc['-branch'] = [branch for branch in newDoc['-branch'] if branch['path']!=change['-branch']['path']]
-            if originalLength!=len(newDoc['-branch']):
-              nothingChanged = False
-          else:
-            return newDoc
-      #handle other items
-      # change has to be dict, not Document
-      for item in change:
-        if item in ['_id','_rev','-branch']:                #skip items cannot do not result in change
-          continue
-        if item=='-type' and change['-type']=='--':          #skip non-set type
-          continue
-        if item=='image' and change['image']=='':          #skip if non-change in image
-          continue
-        if change[item] is None or item not in newDoc:      #skip empty entries
-          continue
-        ## Discussion: What if content only differs by whitespace changes?
-        # These changes should occur in the database, the user wanted it so
-        # Do these changes justify a new revision?
-        # Hence one could update the doc and previous-revision(with the current _rev)
-        #  - but that would lead to special cases, more code, chaos
-        #  - also not sure how often simple white space changes occur, how important
-        # To identify these cases use the following
-        # if (isinstance(change[item], str) and " ".join(change[item].split())!=" ".join(newDoc[item].split()) ) or \
-        #    (isinstance(change[item], list) and change[item]!=newDoc[item] ):
-        # Add to testBasic to test for it:
-        #       myString = myString.replace('A long comment','A long   comment')
-        if change[item]!=newDoc[item]:
-          if item not in ['-date','-client','-user']:      #if only date/client change, no significant change
-            nothingChanged = False
-          if item == 'image':
-            oldDoc[item] = 'image changed'       #don't backup images: makes database big and are only thumbnails anyhow
-          else:
-            oldDoc[item] = newDoc[item]
-          newDoc[item] = change[item]
-      if nothingChanged:
+    import copy, time, random
+    change['-client'] = self.callStack()
+    originalChange = copy.deepcopy(change)  #applyChange changes it
+    self.stats['updates'] += 1
+    baseDoc, touched = None, set()
+    for attempt in range(UPDATE_ATTEMPTS):
+      newDoc = self.getDoc(docID, fresh=True)  #this is the document that stays live
+      initialDocCopy = copy.deepcopy(dict(newDoc))
+      if baseDoc is not None:
+        otherChanged = self.changedItems(baseDoc, initialDocCopy)
+        if touched & otherChanged:
+          print('**ERROR duc01: other client changed the same items in the meantime |',docID,sorted(touched & otherChanged))
+          self.stats['conflictsLost'] += 1
+          return None
+      change = copy.deepcopy(originalChange)
+      oldDoc = self.applyChange(change, newDoc)
+      if oldDoc is None:
+        return newDoc
+      #For both cases: delete and update
+      if baseDoc is None and self.confirm is not None and \
+         not self.confirm({'new':newDoc,'old':oldDoc},"Update this document?"):
         return newDoc
-    #For both cases: delete and update
-    if self.confirm is None or self.confirm({'new':newDoc,'old':oldDoc},"Update this document?"):
+      self.attachRevision(newDoc, initialDocCopy)
       try:
-        newDoc.save()
+        rev = self.putDoc(newDoc)
+        if rev is None:
+          self.stats['conflicts'] += 1
+          self.cache.pop(docID)
+          if baseDoc is None:
+            baseDoc, touched = initialDocCopy, self.changedItems(initialDocCopy, newDoc)
+          if attempt<UPDATE_ATTEMPTS-1:  #no wait before giving up
+            time.sleep(0.05*2**attempt*random.uniform(0.5, 1.5))
+          continue
       except:
-        print('**ERROR: could not update document. Likely version conflict. Initial and current version:')
+        print('**ERROR: could not update document. Initial and current version:')
         print(initialDocCopy)
         print(newDoc)
+        self.cache.pop(docID)
         return None
-      attachmentName = 'v0.json'
-      if '_attachments' in newDoc:
-        attachmentName = 'v'+str(len(newDoc['_attachments']))+'.json'
-      newDoc.put_attachment(attachmentName, 'application/json', json.dumps(oldDoc))
-    return newDoc
+      self.revisionSaved(newDoc, rev)
+      if baseDoc is not None:
+        self.stats['conflictsMerged'] += 1
+      return newDoc
+    print('**ERROR duc02: could not update document: version conflicts persist |',docID)
+    self.stats['conflictsLost'] += 1
+    return None
+
+
+  def putDoc(self, doc):
+    """
+    Save existing document incl. inline attachments with one request
+
+    Args:
+        doc (Document): document with _id and _rev of the version it is based on
+
+    Returns:
+        string: new revision; None if version conflict (other client saved in the meantime)
+
+    Raises:
+        HTTPError: if request failed otherwise
+    """
+    res = self.client.r_session.put(doc.document_url, json=doc)
+    if res.status_code==409:
+      return None
+    res.raise_for_status()
+    return res.json()['rev']
+
+
+  def docCount(self):
+    """
+    Returns:
+        int: number of documents incl. ontology and design documents
+    """
+    return self.db.doc_count()
+
+
+  def changedItems(self, doc, otherDoc):
+    """
+    Items that differ between two versions of a document: used to decide if concurrent changes can be merged
+    - items that change with every update (_rev, -client, -date, -user, _attachments) are not included
+
+    Args:
+        doc (dict): one version
+        otherDoc (dict): other version
+
+    Returns:
+        set: names of items
+    """
+    items = set(doc)|set(otherDoc)
+    items -= {'_rev', '_attachments', '-client', '-date', '-user'}
+    return {item for item in items if doc.get(item)!=otherDoc.get(item)}
+
+
+  def updateDocs(self, changes):
+    """
+    Update many documents with two requests: get all (_all_docs), save all (_bulk_docs)
+    - same as updateDoc, all documents are saved in one request
+    - changes of the same document are applied in order
+
+    Args:
+        changes (list): list of (change, docID); see updateDoc
+
+    Returns:
+        dict: docID: json representation of updated document; None if it could not be updated
+    """
+    import copy
+    client = self.callStack()
+    docIDs = list(dict.fromkeys(docID for _, docID in changes))
+    docs = {docID:doc for docID, doc in self.getDocs(docIDs).items() if doc is not None}
+    changed, baseDocs, originalChanges = [], {}, []
+    for change, docID in changes:
+      if docID not in docs:
+        print('**ERROR dud02: document does not exist |',docID)
+        continue
+      if '-client' not in change:
+        change['-client'] = client
+      originalChanges.append((copy.deepcopy(change), docID))  #applyChange changes it
+      initialDoc = copy.deepcopy(docs[docID])
+      baseDocs.setdefault(docID, initialDoc)
+      oldDoc = self.applyChange(change, docs[docID])
+      if oldDoc is None:
+        continue
+      if self.confirm is None or self.confirm({'new':docs[docID],'old':oldDoc},"Update this document?"):
+        self.attachRevision(docs[docID], initialDoc)
+        if docID not in changed:
+          changed.append(docID)
+      else:
+        docs[docID] = initialDoc
+    results = {docID:docs.get(docID) for docID in docIDs}
+    if len(changed)==0:
+      return results
+    submit = [docs[docID] for docID in changed]
+    try:
+      res = self.client.r_session.post(self.db.database_url+'/_bulk_docs', json={'docs':submit})
+      res.raise_for_status()
+    except:
+      print('**ERROR dud03: could not update documents\n'+traceback.format_exc())
+      return {docID:None for docID in docIDs}
+    self.stats['updates'] += len(submit)
+    conflicts = []
+    for reply in res.json():
+      if reply.get('error')=='conflict':
+        self.stats['conflicts'] += 1
+        self.cache.pop(reply['id'])
+        conflicts.append(reply['id'])
+      elif 'error' in reply:
+        print('**ERROR dud04: could not update document |',reply['id'],reply['error'])
+        results[reply['id']] = None
+      else:
+        self.revisionSaved(docs[reply['id']], reply['rev'])
+    #version conflicts: apply changes again one by one, if the other client changed other items
+    for docID, currentDoc in self.getDocs(conflicts).items():
+      results[docID] = None
+      overlap = self.changedItems(baseDocs[docID], docs[docID]) & \
+                self.changedItems(baseDocs[docID], currentDoc or {})
+      if currentDoc is None or overlap:
+        print('**ERROR dud05: other client changed the same items in the meantime |',docID,sorted(overlap))
+        self.stats['conflictsLost'] += 1
+        continue
+      for change, changeID in originalChanges:
+        if changeID==docID:
+          results[docID] = self.updateDoc(copy.deepcopy(change), docID)
+      if results[docID] is not None:
+        self.stats['conflictsMerged'] += 1
+    return results
+
+
+  def updateBranch(self, change, docID):
+    """
+    Update -branch of document on server with update handler pastaUpdate/branch: only the change is sent,
+    the document (incl. image) is neither read nor written by client
+    - same result as updateDoc, incl. revision attachment
+    - if changes have to be confirmed or handler does not exist: use updateDoc
+
+    Args:
+        change (dict): item to update, see updateDoc
+        docID (string):  id of document to change
+
+    Returns:
+        bool: success
+    """
+    import time, random
+    from urllib.parse import quote
+    change['-client'] = self.callStack()
+    if self.confirm is not None:
+      return self.updateDoc(change, docID) is not None
+    self.stats['updates'] += 1
+    try:
+      for attempt in range(UPDATE_ATTEMPTS):  #version conflict: other client saved between read and write of handler
+        res = self.client.r_session.post(self.db.database_url+'/_design/pastaUpdate/_update/branch/'+
+                                         quote(docID, safe=''), json=change)
+        if res.status_code!=409:
+          break
+        self.stats['conflicts'] += 1
+        if attempt<UPDATE_ATTEMPTS-1:
+          time.sleep(0.05*2**attempt*random.uniform(0.5, 1.5))
+      if res.status_code==404 and res.json().get('error')!='document missing':  #handler does not exist
+        return self.updateDoc(change, docID) is not None
+      res.raise_for_status()
+    except:
+      print('**ERROR dub01: could not update branch of document |',docID,'\n'+traceback.format_exc(limit=1))
+      return False
+    self.cache.pop(docID)
+    return True
+
+
+  def getHistory(self, docID):
+    """
+    Get all versions of document with one request: document incl. all revision attachments
+
+    Args:
+        docID (string): id of document
+
+    Returns:
+        list: all versions, oldest first; last is current version; empty list on error
+    """
+    import json, base64, re
+    from cloudant.document import Document
+    from jsonPatch import history
+    try:
+      res = self.client.r_session.get(Document(self.db, docID).document_url, params={'attachments':'true'},
+                                      headers={'Accept':'application/json'})
+      res.raise_for_status()
+      doc = res.json()
+    except:
+      print('**ERROR dgh01: could not get document with history |',docID)
+      return []
+    attachments = doc.pop('_attachments', {})
+    names = sorted([i for i in attachments if re.match(r'^v\d+\.json$', i)], key=lambda i: int(i[1:-5]))
+    deltas = [json.loads(base64.b64decode(attachments[i]['data'])) for i in names]
+    return history(doc, deltas)
 
 
   def addAttachment(self, docID, name, content):
@@ -297,7 +796,7 @@ class Database:
         bool: success of method
     """
     try:
-      doc = self.db[docID]
+      doc = self.getDoc(docID)
       if not '-attachment' in doc:
         doc['-attachment'] = {}
       if name in doc['-attachment']:
@@ -305,62 +804,193 @@ class Database:
       else:
         doc['-attachment'][name] = [content]
       doc.save()
+      self.cache.put(doc)
       return True
     except:
       return False
 
 
 
-  def getView(self, thePath, startKey=None, preciseKey=None):
+  def getView(self, thePath, startKey=None, preciseKey=None, includeDocs=False):
     """
     Wrapper for getting view function
+    - full views without documents are revalidated with ETag: unchanged ones are read from on-disk cache
 
     Args:
         thePath (string): path to view
         startKey (string): if given, use to filter output, everything that starts with this key
         preciseKey (string): if given, use to filter output. Match precisely
+        includeDocs (bool): include full document as 'doc' in each row: no getDoc per row needed
 
     Returns:
         list: list of documents in this view
     """
+    import json
     from cloudant.view import View
+    from cloudant.design_document import DesignDocument
+    if thePath not in self.views:
+      #View only needs url of design document: do not fetch it
+      self.views[thePath] = View(DesignDocument(self.db, thePath.split('/')[0]), thePath.split('/')[1])
+    v = self.views[thePath]
+    self.stats['viewRoundTripsSaved'] += 1  #fetch of design document
     thePath = thePath.split('/')
-    designDoc = self.db.get_design_document(thePath[0])
-    v = View(designDoc, thePath[1])
     try:
+      params = {'include_docs':'true'} if includeDocs else {}
       if startKey is not None:
-        res = v(startkey=startKey, endkey=startKey+'zzz')['rows']
+        params.update({'startkey':json.dumps(startKey), 'endkey':json.dumps(startKey+'zzz')})
       elif preciseKey is not None:
-        res = v(key=preciseKey)['rows']
-      else:
-        res = list(v.result)
+        params['key'] = json.dumps(preciseKey)
+      res = self.queryView(v.url, params, cached=startKey is None and preciseKey is None and not includeDocs)
     except:
       print('**ERROR dgv01: Database / Network problem for path |',thePath[1])
+      self.views.pop('/'.join(thePath), None)
       res = []
     return res
 
 
-  def saveView(self, designName, viewCode):
+  def iterView(self, thePath, startKey=None, preciseKey=None, includeDocs=False, pageSize=1000):
     """
-    Adopt the view by defining a new jsCode
+    Iterate through view page by page: only one page is in memory at any time
+    - keyset pagination: next page starts at key and docID of the first row not yet given
+    - same rows as getView; first page of full views without documents is revalidated with ETag, e.g. the
+      repeated listing of projects
 
     Args:
-        designName (string): name of the design
-        viewCode (dict): viewName: js-code
+        thePath (string): path to view; '_all_docs' iterates all documents
+        startKey (string): if given, use to filter output, everything that starts with this key
+        preciseKey (string): if given, use to filter output. Match precisely
+        includeDocs (bool): include full document as 'doc' in each row
+        pageSize (int): number of rows per request
+
+    Yields:
+        dict: row of view
     """
+    import json
+    from cloudant.view import View
     from cloudant.design_document import DesignDocument
-    if '_design/'+designName in self.db:
-      designDoc = self.db['_design/'+designName]
-      designDoc.delete()
-    designDoc = DesignDocument(self.db, designName)
-    for view in viewCode:
-      thisJsCode = 'function (doc) {' + viewCode[view] + '}'
-      designDoc.add_view(view, thisJsCode)
+    if thePath=='_all_docs':
+      url = self.db.database_url+'/_all_docs'
+    else:
+      if thePath not in self.views:
+        self.views[thePath] = View(DesignDocument(self.db, thePath.split('/')[0]), thePath.split('/')[1])
+      self.stats['viewRoundTripsSaved'] += 1
+      url = self.views[thePath].url
+    params = {'limit':pageSize+1}
+    if includeDocs:
+      params['include_docs'] = 'true'
+    if startKey is not None:
+      params['startkey'], params['endkey'] = json.dumps(startKey), json.dumps(startKey+'zzz')
+    elif preciseKey is not None:
+      params['key'] = json.dumps(preciseKey)
+    cached = thePath!='_all_docs' and startKey is None and preciseKey is None and not includeDocs
+    while True:
+      try:
+        rows = self.queryView(url, params, cached)
+        cached = False
+      except:
+        print('**ERROR div01: Database / Network problem for path |',thePath)
+        self.views.pop(thePath, None)
+        return
+      yield from rows[:pageSize]
+      if len(rows)<=pageSize:
+        return
+      params['startkey'] = json.dumps(rows[pageSize]['key'])
+      if thePath!='_all_docs':
+        params['startkey_docid'] = rows[pageSize]['id']
+      params.pop('key', None)
+      if preciseKey is not None:
+        params['endkey'] = json.dumps(preciseKey)
+
+
+  def queryView(self, url, params, cached):
+    """
+    Rows of view or _all_docs
+    - missing view: finish swap of staged design documents and try again
+
+    Args:
+        url (string): url of view
+        params (dict): query parameters
+        cached (bool): revalidate with ETag of on-disk cache, see getCached
+
+    Returns:
+        list: rows
+
+    Raises:
+        HTTPError: if request failed
+    """
+    from requests.exceptions import HTTPError
+    for attempt in range(2):
+      try:
+        if cached:
+          return self.getCached(url, params)['rows']
+        res = self.client.r_session.get(url, params=params)
+        res.raise_for_status()
+        return res.json()['rows']
+      except HTTPError as error:  #swap of design document might not be finished
+        if attempt>0 or error.response is None or error.response.status_code!=404 or not self.finishViews():
+          raise
+    return []
+
+
+  def iterDocs(self, pageSize=1000):
+    """
+    Iterate through all documents: ids are listed first, documents are read pageSize at a time with concurrent
+    requests (see getDocs)
+
+    Args:
+        pageSize (int): number of documents in memory
+
+    Yields:
+        dict: row with id and doc, as of iterView('_all_docs', includeDocs=True)
+    """
+    docIDs = [row['id'] for row in self.iterView('_all_docs', pageSize=10000)]
+    for start in range(0, len(docIDs), pageSize):
+      for docID, doc in self.getDocs(docIDs[start:start+pageSize]).items():
+        if doc is not None:
+          yield {'id':docID, 'doc':doc}
+
+
+  def getAttachment(self, docID, name):
+    """
+    Get json attachment of document without reading document
+
+    Args:
+        docID (string): id of document
+        name (string): name of attachment
+
+    Returns:
+        dict: content of attachment
+    """
+    from cloudant.document import Document
+    res = self.client.r_session.get(Document(self.db, docID).document_url+'/'+name)
+    res.raise_for_status()
+    return res.json()
+
+
+  def runAsync(self, function, concurrency=8):
+    """
+    Run asynchronous requests from synchronous code, e.g. many reads at the same time
+    - if this thread runs an event loop already (e.g. apiServer), the requests run in a loop of another thread
+
+    Args:
+        function (function): gets AsyncDatabase and returns awaitable
+        concurrency (int): maximum number of requests at the same time
+
+    Returns:
+        object: result of awaitable
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from asyncDatabase import AsyncDatabase
+    async def main():
+      async with AsyncDatabase(self, concurrency) as adb:
+        return await function(adb)
     try:
-      designDoc.save()
-    except:
-      print('**ERROR dsv01: something unexpected has happend. Log-file has traceback')
-    return
+      asyncio.get_running_loop()
+    except RuntimeError:  #no event loop in this thread
+      return asyncio.run(main())
+    with ThreadPoolExecutor(1) as pool:
+      return pool.submit(asyncio.run, main()).result()
 
 
   def replicateDB(self, dbInfo, removeAtStart=False):
@@ -377,6 +1007,7 @@ class Database:
     import time
     from cloudant.client import CouchDB
     from cloudant.replicator import Replicator
+    from serverActions import testUser
     try:
       rep = Replicator(self.client)
       try:
@@ -413,14 +1044,20 @@ class Database:
     return False  #should not reach here
 
 
-  def historyDB(self):
+  def historyDB(self, docs=None):
     """
     Collect last modification days of documents
+
+    Args:
+        docs (iterable): documents; None=all documents of database
+
+    Returns:
+        dict: docType: histogram of modification dates; '-bins-': dates of bins; '-score-': docType: score
     """
     from datetime import datetime
     import numpy as np
     collection = {}
-    for doc in self.db:
+    for doc in self.db if docs is None else docs:
       if doc['_id'][1]=='-' and len(doc['_id'])==34:
         if '-type' in doc and '-date' in doc:
           docType = doc['-type'][0]
@@ -434,20 +1071,20 @@ class Database:
             collection[docType] = [date]
     #determine bins for histogram
     firstSubmit = datetime.now().timestamp()
-    for key in collection.items():
+    for key in collection:
       if np.min(collection[key]) < firstSubmit:
         firstSubmit = np.min(collection[key])
     bins = np.linspace(firstSubmit, datetime.now().timestamp(), 100 )
     #calculate histgram and save it
     collectionCopy = dict(collection)
-    for key in collection.items():
+    for key in collection:
       hist, _ = np.histogram(collection[key], bins)
       collectionCopy[key] = hist
     collectionCopy['-bins-'] = (bins[:-1]+bins[1:])/2
     #calculate score
     bias = np.exp(( collectionCopy['-bins-']-collectionCopy['-bins-'][-1] ) / 1.e7)
     score = {}
-    for key in collectionCopy.items():
+    for key in collection:
       score[key] = np.sum(collectionCopy[key]*bias)
     #reformat dates into string
     collectionCopy['-bins-'] = [datetime.fromtimestamp(i).isoformat() for i in collectionCopy['-bins-']]
@@ -473,6 +1110,7 @@ class Database:
     """
     import os, re, base64, io
     from PIL import Image
+    from cloudant.document import Document
     from miscTools import bcolors
     if verbose:
       outstring = f'{bcolors.UNDERLINE}**** LEGEND ****{bcolors.ENDC}\n'
@@ -489,12 +1127,22 @@ class Database:
     if repair:
       print('REPAIR MODE IS ON: afterwards, full-reload and create views')
     ## loop all documents
-    for doc in self.db:
+    parentChecks = []   #(docID, path, parentID): check if all parents in doc have a corresponding path
+    parentBranches = {} #docID: -branch of all text documents
+    for row in self.iterDocs():
+      doc = row['doc']
+      if repair:  #repair saves documents
+        doc = Document(self.db, row['id'])
+        doc.update(row['doc'])
       try:
         if '_design' in doc['_id']:
           if verbose:
             outstring+= f'{bcolors.OKGREEN}..info: Design document '+doc['_id']+f'{bcolors.ENDC}\n'
           continue
+        if doc['_id'] == '-provenance-':
+          if verbose:
+            outstring+= f'{bcolors.OKGREEN}..info: provenance exists{bcolors.ENDC}\n'
+          continue
         if doc['_id'] == '-ontology-':
           if repair:
             if '-hierarchy-' in doc:
@@ -553,6 +1201,8 @@ class Database:
         if '-branch' not in doc:
           outstring+= f'{bcolors.FAIL}**ERROR dch01: branch does not exist '+doc['_id']+f'{bcolors.ENDC}\n'
           continue
+        if doc['_id'].startswith('x-'):
+          parentBranches[doc['_id']] = doc['-branch']
         if len(doc['-branch'])>1 and doc['-type'] =='x':                 #text elements only one branch
           outstring+= f'{bcolors.FAIL}**ERROR dch02: branch length >1 for text'+doc['_id']+' '+str(doc['-type'])+f'{bcolors.ENDC}\n'
         for branch in doc['-branch']:
@@ -591,18 +1241,8 @@ class Database:
               if verbose:
                 outstring+= f'{bcolors.OKBLUE}**ok-ish branch stack and path lengths not equal: '+doc['_id']+'|'+branch['path']+f'{bcolors.ENDC}\n'
             if branch['child'] != 9999:
-              for parentID in branch['stack']:                              #check if all parents in doc have a corresponding path
-                parentDoc = self.getDoc(parentID)
-                if not '-branch' in parentDoc:
-                  outstring+= f'{bcolors.FAIL}**ERROR dch07: branch not in parent with id '+parentID+f'{bcolors.ENDC}\n'
-                  continue
-                parentDocBranches = parentDoc['-branch']
-                onePathFound = False
-                for parentBranch in parentDocBranches:
-                  if parentBranch['path'] is not None and parentBranch['path'] in branch['path']:
-                    onePathFound = True
-                if not onePathFound:
-                  outstring+= f'{bcolors.FAIL}**ERROR dch08: parent does not have corresponding path '+doc['_id']+'| parentID '+parentID+f'{bcolors.ENDC}\n'
+              for parentID in branch['stack']:                              #check after loop: parents are read only once
+                parentChecks.append((doc['_id'], branch['path'], parentID))
 
         #every doc should have a name
         if not '-name' in doc:
@@ -644,18 +1284,33 @@ class Database:
         outstring+= f'{bcolors.FAIL}**ERROR dch15: critical error in '+doc['_id']+f'{bcolors.ENDC}\n'
         outstring+= traceback.format_exc()
 
+    ## parents of all documents: those that are not text documents are read in one request
+    missingIDs = [parentID for _, _, parentID in parentChecks if parentID not in parentBranches]
+    for parentID, parentDoc in self.getDocs(missingIDs).items():
+      if parentDoc is not None and '-branch' in parentDoc:
+        parentBranches[parentID] = parentDoc['-branch']
+    for docID, path, parentID in parentChecks:
+      if parentID not in parentBranches:
+        outstring+= f'{bcolors.FAIL}**ERROR dch07: branch not in parent with id '+parentID+f'{bcolors.ENDC}\n'
+        continue
+      onePathFound = False
+      for parentBranch in parentBranches[parentID]:
+        if parentBranch['path'] is not None and parentBranch['path'] in path:
+          onePathFound = True
+      if not onePathFound:
+        outstring+= f'{bcolors.FAIL}**ERROR dch08: parent does not have corresponding path '+docID+'| parentID '+parentID+f'{bcolors.ENDC}\n'
+
     ##TEST views
     if verbose:
       outstring+= f'{bcolors.UNDERLINE}**** List problematic VIEWS ****{bcolors.ENDC}\n'
-    view = self.getView('viewIdentify/viewSHAsum')
-    shasumKeys = []
-    for item in view:
+    lastKey = None  #view is sorted by key: same shasums follow each other
+    for item in self.iterView('viewIdentify/viewSHAsum'):
       if item['key']=='':
         if verbose:
           outstring+= f'{bcolors.OKBLUE}**warning: measurement without shasum: '+item['id']+' '+item['value']+f'{bcolors.ENDC}\n'
       else:
-        if item['key'] in shasumKeys:
+        if item['key']==lastKey:
           key = item['key'] if item['key'] else '-empty-'
           outstring+= f'{bcolors.FAIL}**ERROR dch16: shasum twice in view: '+key+' '+item['id']+' '+item['value']+f'{bcolors.ENDC}\n'
-        shasumKeys.append(item['key'])
+        lastKey = item['key']
     return outstring
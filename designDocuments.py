@@ -0,0 +1,261 @@
+"""Design documents of couchDB: views and update handlers
+
+Part of class Database: changed views are built under a staged name, while the old views answer queries,
+and copied when done (saveView, swapView, finishViews). Javascript of update handlers is in files next to
+this module, e.g. updateBranch.js.
+"""
+SWAP_RECORD = '_local/pastaSwaps'  #started and failed swaps: not replicated, not in _all_docs and _changes
+
+class DesignDocuments:
+  """
+  Views and update handlers of Database: uses its client, db, views and getCached
+  """
+
+  def saveView(self, designName, viewCode, wait=None):
+    """
+    Adopt the view by defining a new jsCode
+    - unchanged code (same hash as on server): nothing to do
+    - new design document: save directly
+    - changed code: save as designName-staged, build its index and copy it to designName when done.
+      CouchDB identifies indexes by their code and reuses the built one. In long-running processes
+      (backgroundViews, e.g. daemon) this happens in a background thread and the old views answer
+      queries in the meantime. If the process ends before, finishViews continues, see there.
+
+    Args:
+        designName (string): name of the design
+        viewCode (dict): viewName: js-code
+        wait (bool): wait until changed views are built and copied; default: if not backgroundViews
+    """
+    import json, hashlib, threading
+    from requests.exceptions import HTTPError
+    views = {}
+    for view in viewCode:
+      views[view] = {'map': 'function (doc) {' + viewCode[view] + '}'}
+    codeHash = hashlib.sha1(json.dumps(views, sort_keys=True).encode('utf-8')).hexdigest()
+    designDoc = {'_id':'_design/'+designName, 'language':'javascript', 'views':views, 'codeHash':codeHash}
+    url = self.db.database_url+'/_design/'
+    try:
+      try:
+        current = self.getCached(url+designName)
+      except HTTPError as error:
+        if error.response is None or error.response.status_code!=404:
+          raise
+        self.client.r_session.put(url+designName, json=designDoc).raise_for_status()
+        self.clearViews(designName)
+        return
+      if current.get('codeHash')==codeHash:
+        return
+      staged = self.client.r_session.get(url+designName+'-staged')
+      if staged.status_code!=200 or staged.json().get('codeHash')!=codeHash:
+        stagedDoc = dict(designDoc, _id='_design/'+designName+'-staged')
+        if staged.status_code==200:
+          stagedDoc['_rev'] = staged.json()['_rev']
+        self.client.r_session.put(url+designName+'-staged', json=stagedDoc).raise_for_status()
+    except:
+      print('**ERROR dsv01: something unexpected has happend. Log-file has traceback')
+      return
+    if wait is None:
+      wait = not self.backgroundViews
+    if wait:
+      self.swapView(designName, designDoc)
+    else:
+      threading.Thread(target=self.swapView, args=(designName, designDoc), daemon=True).start()
+    return
+
+
+  def saveUpdates(self, designName, updates):
+    """
+    Save update handlers in design document, if code changed (hash as on server)
+
+    Args:
+        designName (string): name of the design
+        updates (dict): name: file with js-function(doc, req), in directory of this module
+    """
+    import json, hashlib
+    from pathlib import Path
+    updates = {name:(Path(__file__).parent/fileName).read_text(encoding='utf-8') for name, fileName in updates.items()}
+    codeHash = hashlib.sha1(json.dumps(updates, sort_keys=True).encode('utf-8')).hexdigest()
+    designDoc = {'_id':'_design/'+designName, 'language':'javascript', 'updates':updates, 'codeHash':codeHash}
+    url = self.db.database_url+'/_design/'+designName
+    try:
+      current = self.client.r_session.get(url)
+      if current.status_code==200:
+        if current.json().get('codeHash')==codeHash:
+          return
+        designDoc['_rev'] = current.json()['_rev']
+      self.client.r_session.put(url, json=designDoc).raise_for_status()
+    except:
+      print('**ERROR dsu01: could not save update handlers |',designName)
+    return
+
+
+  def swapView(self, designName, designDoc, recorded=False):
+    """
+    Build index of staged design document, copy it to final name and remove staged one
+    - start and failure are recorded, see finishViews
+
+    Args:
+        designName (string): name of the design
+        designDoc (dict): final design document
+        recorded (bool): start is recorded already
+    """
+    from datetime import datetime
+    url = self.db.database_url+'/_design/'
+    started = datetime.now().isoformat(timespec='seconds')
+    if not recorded:
+      self.recordSwap(designName, {'started':started, 'failed':False})
+    try:
+      #query returns once index is built
+      self.client.r_session.get(url+designName+'-staged/_view/'+list(designDoc['views'])[0],
+                                params={'limit':0}).raise_for_status()
+      current = self.client.r_session.get(url+designName)
+      if current.status_code!=404:
+        current.raise_for_status()
+        designDoc = dict(designDoc, _rev=current.json()['_rev'])
+      self.client.r_session.put(url+designName, json=designDoc).raise_for_status()
+      self.clearViews(designName)
+      staged = self.client.r_session.get(url+designName+'-staged')
+      staged.raise_for_status()
+      self.client.r_session.delete(url+designName+'-staged', params={'rev':staged.json()['_rev']})
+      self.client.r_session.post(self.db.database_url+'/_view_cleanup', json={})  #remove old index files
+    except:
+      print('**ERROR dsv02: could not build and swap view |',designName)
+      self.recordSwap(designName, {'started':started, 'failed':True})
+      return
+    self.recordSwap(designName, None)
+    return
+
+
+  def recordSwap(self, designName, state):
+    """
+    Record state of swap in local document of database: processes that start later skip it
+
+    Args:
+        designName (string): name of the design
+        state (dict): started (iso date) and failed (bool); None=swap is done
+    """
+    url = self.db.database_url+'/'+SWAP_RECORD
+    try:
+      res = self.client.r_session.get(url)
+      if res.status_code!=404:
+        res.raise_for_status()
+      record = res.json() if res.status_code==200 else {'_id':SWAP_RECORD}
+      if state is None:
+        record.pop(designName, None)
+      else:
+        record[designName] = state
+      self.client.r_session.put(url, json=record).raise_for_status()
+    except:
+      print('**Warning dsr01: could not record swap of views |',designName)
+    return
+
+
+  def finishViews(self, wait=True):
+    """
+    Finish swaps of staged design documents that were not copied, e.g. since the process ended before
+    - wait: swap now, e.g. for a missing view or indexStatus
+    - else, at start of process: swap in background thread. Swaps that failed or that another process started
+      (see recordSwap) are skipped with a warning, as they can take long; only daemon (backgroundViews) and
+      indexStatus try them again
+
+    Args:
+        wait (bool): swap now and wait until done
+
+    Returns:
+        bool: a staged design document was found and swapped
+    """
+    import threading
+    from datetime import datetime
+    url = self.db.database_url+'/_design/'
+    try:
+      res = self.client.r_session.get(self.db.database_url+'/_all_docs',
+                                      params={'startkey':'"_design/"', 'endkey':'"_design0"'})
+      res.raise_for_status()
+      stagedNames = [row['id'][len('_design/'):] for row in res.json()['rows'] if row['id'].endswith('-staged')]
+      records = {}
+      if stagedNames and not wait:
+        res = self.client.r_session.get(self.db.database_url+'/'+SWAP_RECORD)
+        records = res.json() if res.status_code==200 else {}
+      for stagedName in stagedNames:
+        designName = stagedName[:-len('-staged')]
+        record = records.get(designName)
+        if isinstance(record, dict) and not self.backgroundViews:
+          print('**Warning dfv02: views of',designName,'are not finished: swap '+
+                ('failed' if record.get('failed') else 'started')+' '+str(record.get('started'))+
+                '. Run: pastaELN.py indexStatus')
+          continue
+        staged = self.client.r_session.get(url+stagedName)
+        staged.raise_for_status()
+        designDoc = {key:value for key,value in staged.json().items() if key!='_rev'}
+        designDoc['_id'] = '_design/'+designName
+        if wait:
+          self.swapView(designName, designDoc)
+        else:
+          print('**Warning dfv03: views of',designName,'were not finished: build and swap in background')
+          self.recordSwap(designName, {'started':datetime.now().isoformat(timespec='seconds'), 'failed':False})
+          threading.Thread(target=self.swapView, args=(designName, designDoc, True), daemon=True).start()
+    except:
+      print('**ERROR dfv01: could not finish staged design documents')
+      return False
+    return wait and len(stagedNames)>0
+
+
+  def clearViews(self, designName):
+    """
+    Remove views of this design document from cache of getView
+
+    Args:
+        designName (string): name of the design
+    """
+    for path in [i for i in self.views if i.split('/')[0]==designName]:
+      self.views.pop(path, None)
+    return
+
+
+  def warmViews(self):
+    """
+    Trigger the update of all view indexes without waiting for it
+    - after many changes, the next query would otherwise wait until CouchDB caught up
+    - update=lazy answers at once and updates the index afterwards
+    """
+    import asyncio
+    try:
+      res = self.client.r_session.get(self.db.database_url+'/_all_docs',
+                                      params={'startkey':'"_design/"', 'endkey':'"_design0"', 'include_docs':'true'})
+      res.raise_for_status()
+      urls = []
+      for row in res.json()['rows']:
+        views = row['doc'].get('views', {})
+        if len(views)==0 or row['id'].endswith('-staged'):  #staged views are built by swapView
+          continue
+        urls.append(self.db.database_url+'/'+row['id']+'/_view/'+list(views)[0])
+      self.runAsync(lambda adb: asyncio.gather(*[adb.request('GET', url, params={'update':'lazy', 'limit':'0'})
+                                                 for url in urls]))
+    except:
+      print('**ERROR dwv01: could not trigger update of views')
+    return
+
+
+  def viewProgress(self):
+    """
+    Progress of view indexes that are currently built, from the active tasks of CouchDB
+    - CouchDB builds the index of each database shard separately: sum them
+
+    Returns:
+      dict: design-document name: progress in percent; empty if all views are up to date
+    """
+    try:
+      res = self.client.r_session.get(self.client.server_url+'/_active_tasks')
+      res.raise_for_status()
+    except:
+      print('**ERROR dvp01: could not get active tasks of database server')
+      return {}
+    changes = {}
+    for task in res.json():
+      #database of shard: shards/00000000-7fffffff/databaseName.1612345678
+      if task.get('type')!='indexer' or task['database'].split('/')[-1].split('.')[0]!=self.databaseName:
+        continue
+      designName = task['design_document'].replace('_design/','')
+      done, total = changes.get(designName, (0,0))
+      changes[designName] = (done+task.get('changes_done',0), total+task.get('total_changes',0))
+    return {key:int(100*done/total) if total>0 else 0 for key,(done, total) in changes.items()}
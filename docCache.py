@@ -0,0 +1,128 @@
+#!/usr/bin/python3
+""" Read-through cache of documents: least recently used documents are removed first
+
+Cached documents stay correct by following the _changes feed of the database: before a cached document
+is given out, changes since the last check are read (at most every 'checkInterval' seconds) and changed
+documents are removed, unless their revision is the cached one (own writes).
+"""
+import json, threading, time, traceback
+from collections import OrderedDict
+
+
+class DocCache:
+  """
+  LRU cache of documents, bounded by number of documents and bytes
+  """
+  def __init__(self, db, stats, maxEntries=2000, maxBytes=64*2**20, checkInterval=1):
+    """
+    Args:
+      db (Database): database
+      stats (dict): statistics of database: hits, misses, invalidations are counted in there
+      maxEntries (int): maximum number of documents
+      maxBytes (int): maximum size of all documents (json)
+      checkInterval (float): seconds between checks of _changes feed; 0=check before each hit
+    """
+    self.db = db
+    self.stats = stats
+    self.stats.update({'docCacheHits':0, 'docCacheMisses':0, 'docCacheInvalidations':0})
+    self.maxEntries = maxEntries
+    self.maxBytes = maxBytes
+    self.checkInterval = checkInterval
+    self.entries = OrderedDict()  #docID: (json of doc, size, _rev)
+    self.size = 0
+    self.since = None             #sequence of last check; None=not started
+    self.lastCheck = 0
+    self.lock = threading.RLock()
+
+
+  def get(self, docID):
+    """
+    Args:
+      docID (string): document id
+
+    Returns:
+      dict: copy of cached document; None if not cached
+    """
+    with self.lock:
+      self.validate()
+      if docID not in self.entries:
+        self.stats['docCacheMisses'] += 1
+        return None
+      self.entries.move_to_end(docID)
+      self.stats['docCacheHits'] += 1
+      return json.loads(self.entries[docID][0])
+
+
+  def put(self, doc):
+    """
+    Add or replace document: after reading and writing it
+
+    Args:
+      doc (dict): document incl. _id and _rev
+    """
+    if doc is None or '_id' not in doc or '_rev' not in doc:
+      return
+    content = json.dumps(doc)
+    with self.lock:
+      if self.since is None:   #changes before this document are irrelevant
+        self.validate()
+      self.pop(doc['_id'])
+      if self.since is None or len(content)>self.maxBytes:
+        return
+      self.entries[doc['_id']] = (content, len(content), doc['_rev'])
+      self.size += len(content)
+      while len(self.entries)>self.maxEntries or self.size>self.maxBytes:
+        _, (_, size, _) = self.entries.popitem(last=False)
+        self.size -= size
+    return
+
+
+  def pop(self, docID):
+    """
+    Remove document
+
+    Args:
+      docID (string): document id
+    """
+    with self.lock:
+      if docID in self.entries:
+        self.size -= self.entries.pop(docID)[1]
+    return
+
+
+  def clear(self):
+    """
+    Remove all documents
+    """
+    with self.lock:
+      self.entries.clear()
+      self.size = 0
+    return
+
+
+  def validate(self):
+    """
+    Remove documents that changed in database since last check
+    - if changes cannot be read, the cache is cleared
+    """
+    if self.checkInterval>0 and time.time()-self.lastCheck<self.checkInterval:
+      return
+    try:
+      res = self.db.client.r_session.get(self.db.db.database_url+'/_changes',
+                                         params={'since':'now' if self.since is None else self.since})
+      res.raise_for_status()
+      res = res.json()
+    except:
+      print('**ERROR ddc01: could not read changes of database, clear cache\n'+traceback.format_exc(limit=1))
+      self.clear()
+      self.since = None
+      self.lastCheck = time.time()
+      return
+    for row in res['results']:
+      if row['id'] in self.entries:
+        if row.get('deleted', False) or self.entries[row['id']][2] not in [i['rev'] for i in row['changes']]:
+          self.pop(row['id'])
+          self.stats['docCacheInvalidations'] += 1
+    self.since = res['last_seq']
+    self.lastCheck = time.time()
+    return
@@ -0,0 +1,870 @@
+#!/usr/bin/python3
+""" Stand-in of CouchDB for tests and benchmarks: the part of the HTTP API that Database uses, all data in memory
+
+Usage
+- in the same process: requests go through a transport adapter, no socket and no server
+    fake = FakeCouchDB()
+    db = Database('admin', 'secret', 'pasta_tests', None, softwarePath=..., adapter=fake.adapter())
+- on a local port: real HTTP server, e.g. for the tests in Tests/ that connect to 127.0.0.1:5984
+    python3 fakeCouchDB.py --port 5984 --user admin --password secret
+
+Supported: databases, documents incl. attachments and revisions (version conflicts), _all_docs, _bulk_docs
+(also new_edits=false), _changes (normal and longpoll), _revs_diff, views, update handlers, ETag/If-None-Match,
+_session, _active_tasks, _compact, _find (selector on _id only, fields), _local documents
+- views created by Database.createViewCode are emulated in python (same rows as the javascript, see
+  sqliteDatabase.viewRows); other map functions and update handlers are run with js2py, if it is installed
+- strings in views are sorted by code point, not by the ICU collation of CouchDB
+- the in-process adapter does not check authentication
+"""
+import base64, hashlib, json, re, threading, uuid
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qsl, unquote
+from types import SimpleNamespace
+
+
+def collate(key):
+  """
+  Sort key of view key, in the order of CouchDB: null, false, true, numbers, strings, arrays, objects
+
+  Args:
+    key (object): json-object
+
+  Returns:
+    tuple: comparable representation
+  """
+  if key is None:
+    return (0,)
+  if isinstance(key, bool):
+    return (1, key)
+  if isinstance(key, (int, float)):
+    return (2, key)
+  if isinstance(key, str):
+    return (3, key)
+  if isinstance(key, list):
+    return (4, tuple(collate(i) for i in key))
+  return (5, tuple((name, collate(value)) for name, value in key.items()))
+
+
+def jsFunction(code):
+  """
+  Translate javascript function with js2py
+
+  Args:
+    code (string): javascript code of function
+
+  Returns:
+    function: javascript function; None if js2py is not installed
+  """
+  try:
+    import js2py
+  except ImportError:
+    print('**Warning fcd01: js2py is not installed: javascript of design documents is not run')
+    return None
+  return js2py.eval_js('('+code+')')
+
+
+def mapFunction(viewName, code):
+  """
+  Python function of map function: views of Database.createViewCode are recognized and emulated, others are
+  run with js2py
+
+  Args:
+    viewName (string): name of view in design document
+    code (string): javascript code of map function
+
+  Returns:
+    function: document -> list of (key, value)
+  """
+  from database import Database
+  from sqliteDatabase import viewRows
+  createViewCode = lambda ontology, docTypes, magicTags: Database.createViewCode(  # pylint: disable=unnecessary-lambda-assignment
+    SimpleNamespace(ontology=ontology), docTypes, magicTags, max([len(i) for i in ontology.values()]+[0]))
+  # general views: same code for the magic tags that are in it
+  magicTags = []
+  if code.startswith('function (doc) {[') and '].forEach' in code:
+    try:
+      magicTags = json.loads(code[len('function (doc) {'):code.index('].forEach')+1].replace("'", '"'))
+    except ValueError:
+      pass
+  for views in createViewCode({}, [], magicTags).values():
+    if viewName in views and code=='function (doc) {'+views[viewName]+'}':
+      kind = {'viewHierarchy':'hierarchy', 'viewPaths':'paths', 'viewQR':'qr', 'viewSHAsum':'shasum',
+              'viewTags':'tags'}[viewName]
+      spec = {'map':kind, 'magicTags':magicTags}
+      return lambda doc: viewRows(spec, doc)
+  # views of document types: guess columns from code, accept if the code created from them is the same
+  docType = viewName.replace('__','/')
+  columns = []
+  if 'emit(' in code and ', [' in code[code.index('emit('):] and code.endswith(']);}}'):
+    names = {'(doc.image.length>3).toString()':'image', 'doc.tags.join(" ")':'tags',
+             'doc["-type"].slice(1).join("/")':'-type', 'doc.content?doc.content.slice(0, 100):""':'content'}
+    outputList = code[code.index(', [', code.index('emit('))+3:-len(']);}}')]
+    for item in [i for i in outputList.replace(',doc', '\ndoc').replace(',(doc', '\n(doc').split('\n') if i]:
+      if item in names:
+        columns.append(names[item])
+      else:  #doc["name"] or stacked requests doc["metaVendor"] ? doc["metaVendor"]["date"]: ""
+        columns.append('/'.join(re.findall(r'\["(.*?)"\]', item.split(' ? ')[-1])))
+  views = createViewCode({docType:[{'name':i} for i in columns]}, [docType], [])['viewDocType']
+  if code=='function (doc) {'+views.get(viewName, '')+'}':
+    spec = {'map':'docType', 'docType':docType, 'columns':columns}
+    return lambda doc: viewRows(spec, doc)
+  # any other view
+  function = jsFunction('function(doc){var rows=[]; function emit(key, value) {rows.push([key===undefined?null:key, '
+                        'value===undefined?null:value]);}; ('+code+')(doc); return rows;}')
+  def jsMap(doc):
+    if function is None:
+      return []
+    try:
+      return [tuple(i) for i in function(doc).to_list()]
+    except Exception:  # pylint: disable=broad-except
+      return []      #exception in map function: document has no rows
+  return jsMap
+
+
+class FakeDatabase:
+  """
+  Database of FakeCouchDB: documents with revisions, log of changes, indexes of views
+  """
+  def __init__(self, name):
+    """
+    Args:
+      name (string): name of database
+    """
+    self.name = name
+    self.docs = {}      #docID: {'rev', 'revs', 'content', 'attachments', 'deleted', 'seq'}
+    self.log = []       #docID of each change: sequence number = index+1
+    self.indexes = {}   #designID/viewName: {'code', 'map', 'seq', 'rows':{docID:rows}, 'sorted'}
+    self.fileSize = 0   #bytes written since last compaction, as append-only file
+    self.local = {}     #docID: content of _local documents: not in _all_docs and _changes, revision 0-N
+
+
+  def output(self, docID, attachments=False):
+    """
+    Args:
+      docID (string): document id
+      attachments (bool): include content of attachments; else stubs
+
+    Returns:
+      dict: json representation of document; None if it does not exist
+    """
+    entry = self.docs.get(docID)
+    if entry is None or entry['deleted']:
+      return None
+    doc = dict(entry['content'], _id=docID, _rev=entry['rev'])
+    if entry['attachments']:
+      doc['_attachments'] = {}
+      for name, attachment in entry['attachments'].items():
+        item = {'content_type':attachment['content_type'], 'revpos':attachment['revpos'],
+                'digest':attachment['digest']}
+        if attachments:
+          item['data'] = base64.b64encode(attachment['data']).decode('ascii')
+        else:
+          item.update({'length':len(attachment['data']), 'stub':True})
+        doc['_attachments'][name] = item
+    return doc
+
+
+  def write(self, docID, doc, rev=None, newEdits=True):
+    """
+    Save document: new revision
+
+    Args:
+      docID (string): document id
+      doc (dict): document incl. _rev of version it is based on; inline attachments (data) or stubs
+      rev (string): revision, if not in document
+      newEdits (bool): False: keep revision of document, as in replication
+
+    Returns:
+      tuple: http status, reply
+    """
+    doc = json.loads(json.dumps(doc))
+    entry = self.docs.get(docID)
+    given = doc.pop('_rev', rev)
+    if newEdits:
+      current = entry['rev'] if entry is not None and not entry['deleted'] else None
+      if given!=current and not (entry is not None and entry['deleted'] and given in (None, entry['rev'])):
+        return 409, {'error':'conflict', 'reason':'Document update conflict.'}
+      number = int(entry['rev'].split('-')[0])+1 if entry is not None else 1
+      newRev = str(number)+'-'+uuid.uuid4().hex
+      revs = (entry['revs'] if entry is not None else [])+[newRev]
+    else:
+      newRev, number = given, int(given.split('-')[0])
+      revisions = doc.pop('_revisions', None)
+      if entry is not None and int(entry['rev'].split('-')[0])>number:
+        return 201, {'ok':True, 'id':docID, 'rev':newRev}   #older revision does not win
+      revs = [str(revisions['start']-i)+'-'+j for i, j in enumerate(revisions['ids'])][::-1] if revisions \
+             else [newRev]
+    attachments = {}
+    for name, attachment in doc.pop('_attachments', {}).items():
+      if 'data' in attachment:
+        data = base64.b64decode(attachment['data'])
+        attachments[name] = {'content_type':attachment.get('content_type', 'application/octet-stream'),
+                             'data':data, 'revpos':number,
+                             'digest':'md5-'+base64.b64encode(hashlib.md5(data).digest()).decode('ascii')}
+      elif entry is not None and name in entry['attachments']:
+        attachments[name] = entry['attachments'][name]
+      else:
+        return 412, {'error':'missing_stub', 'reason':'Attachment stub has no corresponding attachment: '+name}
+    deleted = doc.pop('_deleted', False)
+    doc.pop('_id', None)
+    self.log.append(docID)
+    self.docs[docID] = {'rev':newRev, 'revs':revs, 'content':{} if deleted else doc, 'deleted':deleted,
+                        'attachments':{} if deleted else attachments, 'seq':len(self.log)}
+    self.fileSize += len(json.dumps(doc))+sum(len(i['data']) for i in attachments.values())
+    return 201, {'ok':True, 'id':docID, 'rev':newRev}
+
+
+  def info(self):
+    """
+    Returns:
+      dict: information on database, as GET /db
+    """
+    alive = [i for i in self.docs.values() if not i['deleted']]
+    active = sum(len(json.dumps(i['content']))+sum(len(j['data']) for j in i['attachments'].values())
+                 for i in alive)
+    return {'db_name':self.name, 'doc_count':len(alive), 'doc_del_count':len(self.docs)-len(alive),
+            'update_seq':len(self.log), 'compact_running':False,
+            'sizes':{'file':max(self.fileSize, active), 'active':active, 'external':active}}
+
+
+  def viewIndex(self, designID, viewName):
+    """
+    Index of view: brought up to date with changes since last query
+
+    Args:
+      designID (string): id of design document
+      viewName (string): name of view
+
+    Returns:
+      list: sorted rows (collated key, docID, key, value); None if view does not exist
+    """
+    design = self.output(designID)
+    if design is None or viewName not in design.get('views', {}):
+      return None
+    code = design['views'][viewName]['map']
+    index = self.indexes.get(designID+'/'+viewName)
+    if index is None or index['code']!=code:
+      index = {'code':code, 'map':mapFunction(viewName, code), 'seq':0, 'rows':{}, 'sorted':None}
+      self.indexes[designID+'/'+viewName] = index
+    for docID in set(self.log[index['seq']:]):
+      doc = self.output(docID)
+      index['rows'].pop(docID, None)
+      if doc is not None and not docID.startswith('_design/'):
+        index['rows'][docID] = index['map'](doc)
+      index['sorted'] = None
+    index['seq'] = len(self.log)
+    if index['sorted'] is None:
+      index['sorted'] = sorted([(collate(key), docID, key, value) for docID, rows in index['rows'].items()
+                                for key, value in rows], key=lambda i: i[:2])
+    return index['sorted']
+
+
+class FakeCouchDB:
+  """
+  CouchDB server in memory
+  """
+  def __init__(self, user=None, password=None):
+    """
+    Args:
+      user (string): name of admin; None=no authentication on local port
+      password (string): password of admin
+    """
+    self.user = user
+    self.password = password
+    self.databases = {}   #name: FakeDatabase
+    self.condition = threading.Condition()  #lock of all data; notifies longpoll of changes
+    self.token = uuid.uuid4().hex           #cookie of session
+    self.handlers = {}    #code: update handler translated by js2py
+    self.server = None
+
+
+  def adapter(self):
+    """
+    Returns:
+      FakeAdapter: transport adapter of requests: mount on session, e.g. with adapter of cloudant CouchDB
+    """
+    return FakeAdapter(self)
+
+
+  def start(self, port=0, host='127.0.0.1'):
+    """
+    Serve on local port in background thread
+
+    Args:
+      port (int): port; 0=any free port
+      host (string): host
+
+    Returns:
+      string: url of server
+    """
+    from http.server import ThreadingHTTPServer
+    self.server = ThreadingHTTPServer((host, port), requestHandler(self))
+    self.server.daemon_threads = True
+    threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    return 'http://'+host+':'+str(self.server.server_address[1])
+
+
+  def stop(self):
+    """
+    Stop server on local port
+    """
+    if self.server is not None:
+      self.server.shutdown()
+      self.server.server_close()
+      self.server = None
+    return
+
+
+  def authorized(self, headers):
+    """
+    Args:
+      headers (dict): headers of request
+
+    Returns:
+      bool: request has cookie of session or basic authentication of admin
+    """
+    if self.user is None:
+      return True
+    if 'AuthSession='+self.token in headers.get('Cookie', ''):
+      return True
+    basic = base64.b64encode((self.user+':'+self.password).encode('utf-8')).decode('ascii')
+    return headers.get('Authorization', '')=='Basic '+basic
+
+
+  def handle(self, method, url, headers, body, trusted=False):
+    """
+    Answer request
+
+    Args:
+      method (string): http method
+      url (string): url incl. query
+      headers (dict): headers of request
+      body (bytes): body of request
+      trusted (bool): skip authentication, e.g. in the same process
+
+    Returns:
+      tuple: http status, headers, body of reply
+    """
+    headers = {name.title():value for name, value in headers.items()}
+    parts = urlsplit(url)
+    segments = [unquote(i) for i in parts.path.split('/') if i]
+    params = dict(parse_qsl(parts.query, keep_blank_values=True))
+    contentType = headers.get('Content-Type', '') or ''
+    if body and 'json' in contentType or (body and method in ('PUT','POST') and
+                                           body[:1] in (b'{', b'[') and 'form' not in contentType):
+      try:
+        content = json.loads(body)
+      except ValueError:
+        return reply(400, {'error':'bad_request', 'reason':'invalid UTF-8 JSON'})
+    else:
+      content = body
+    if segments==['_session'] and method=='POST':
+      form = content if isinstance(content, dict) else dict(parse_qsl((body or b'').decode('utf-8')))
+      if self.user is not None and (form.get('name'), form.get('password'))!=(self.user, self.password):
+        return reply(401, {'error':'unauthorized', 'reason':'Name or password is incorrect.'})
+      return reply(200, {'ok':True, 'name':form.get('name'), 'roles':['_admin']},
+                   {'Set-Cookie':'AuthSession='+self.token+'; Version=1; Path=/; HttpOnly'})
+    if not trusted and not self.authorized(headers):
+      return reply(401, {'error':'unauthorized', 'reason':'You are not authorized to access this db.'})
+    with self.condition:
+      status, result, extra = self.route(method, segments, params, headers, content)
+    if isinstance(result, tuple):  #raw content: content type, bytes
+      return status, dict(extra, **{'Content-Type':result[0]}), result[1]
+    if status==200 and method in ('GET','HEAD'):
+      data = json.dumps(result).encode('utf-8')
+      etag = '"'+hashlib.md5(data).hexdigest()+'"'
+      if headers.get('If-None-Match')==etag:
+        return 304, {'ETag':etag}, b''
+      extra = dict(extra, ETag=etag)
+    return reply(status, result, extra)
+
+
+  def route(self, method, segments, params, headers, content):
+    """
+    Answer request: data is locked
+
+    Args:
+      method (string): http method
+      segments (list): unquoted parts of path
+      params (dict): query parameters
+      headers (dict): headers of request
+      content (object): json of body; bytes if not json
+
+    Returns:
+      tuple: status, json reply (or tuple of content type and bytes), headers
+    """
+    if len(segments)==0:
+      return 200, {'couchdb':'Welcome', 'version':'3.2.2', 'vendor':{'name':'fakeCouchDB'}}, {}
+    if segments[0]=='_session':
+      if method=='DELETE':
+        return 200, {'ok':True}, {}
+      return 200, {'ok':True, 'userCtx':{'name':self.user, 'roles':['_admin']}}, {}
+    if segments[0]=='_all_dbs':
+      return 200, sorted(self.databases), {}
+    if segments[0]=='_active_tasks':
+      return 200, [], {}
+    if segments[0]=='_uuids':
+      return 200, {'uuids':[uuid.uuid4().hex for _ in range(int(params.get('count', 1)))]}, {}
+    name = segments[0]
+    if len(segments)==1:
+      if method=='PUT':
+        if name in self.databases:
+          return 412, {'error':'file_exists', 'reason':'The database could not be created, the file already exists.'}, {}
+        self.databases[name] = FakeDatabase(name)
+        return 201, {'ok':True}, {}
+      if name not in self.databases:
+        return 404, {'error':'not_found', 'reason':'Database does not exist.'}, {}
+      if method=='DELETE':
+        del self.databases[name]
+        self.condition.notify_all()
+        return 200, {'ok':True}, {}
+      if method=='POST':
+        docID = content.get('_id', uuid.uuid4().hex)
+        return self.written(self.databases[name].write(docID, content))
+      return 200, self.databases[name].info(), {}
+    if name not in self.databases:
+      return 404, {'error':'not_found', 'reason':'Database does not exist.'}, {}
+    db = self.databases[name]
+    special = segments[1]
+    if special=='_all_docs':
+      return 200, self.allDocs(db, params, content if method=='POST' else {}), {}
+    if special=='_bulk_docs':
+      return self.bulkDocs(db, content)
+    if special=='_changes':
+      return 200, self.changes(db, params), {}
+    if special=='_find':
+      return self.find(db, content)
+    if special=='_revs_diff':
+      missing = {}
+      for docID, revs in content.items():
+        known = db.docs[docID]['revs'] if docID in db.docs else []
+        if [i for i in revs if i not in known]:
+          missing[docID] = {'missing':[i for i in revs if i not in known]}
+      return 200, missing, {}
+    if special=='_compact':
+      db.fileSize = db.info()['sizes']['active']
+      return 202, {'ok':True}, {}
+    if special in ('_view_cleanup', '_ensure_full_commit'):
+      return 202 if special=='_view_cleanup' else 201, {'ok':True}, {}
+    if special=='_local' and len(segments)==3:
+      return self.localDocument(db, method, special+'/'+segments[2], params, content)
+    if special in ('_design', '_local'):
+      if len(segments)<3:
+        return 404, {'error':'not_found', 'reason':'missing'}, {}
+      docID, rest = special+'/'+segments[2], segments[3:]
+      if special=='_design' and len(rest)>=2 and rest[0]=='_view':
+        return self.view(db, docID, rest[1], params)
+      if special=='_design' and len(rest)>=2 and rest[0]=='_update':
+        return self.update(db, docID, rest[1], '/'.join(rest[2:]), params, content)
+    elif special.startswith('_'):
+      return 400, {'error':'illegal_docid', 'reason':'Only reserved document ids may start with underscore.'}, {}
+    else:
+      docID, rest = special, segments[2:]
+    if rest:
+      return self.attachment(db, method, docID, '/'.join(rest), params, headers, content)
+    return self.document(db, method, docID, params, content)
+
+
+  def written(self, result):
+    """
+    Args:
+      result (tuple): status, reply of FakeDatabase.write
+
+    Returns:
+      tuple: status, reply, headers incl. ETag; waiting longpolls are notified
+    """
+    status, result = result
+    if status<300:
+      self.condition.notify_all()
+      return status, result, {'ETag':'"'+result['rev']+'"'}
+    return status, result, {}
+
+
+  def document(self, db, method, docID, params, content):
+    """
+    GET, HEAD, PUT, DELETE of document
+
+    Returns:
+      tuple: status, reply, headers
+    """
+    if method in ('GET', 'HEAD'):
+      doc = db.output(docID, attachments=params.get('attachments')=='true')
+      if doc is None:
+        reason = 'deleted' if docID in db.docs else 'missing'
+        return 404, {'error':'not_found', 'reason':reason}, {}
+      if params.get('revs')=='true':
+        doc['_revisions'] = {'start':int(doc['_rev'].split('-')[0]),
+                             'ids':[i.split('-')[1] for i in reversed(db.docs[docID]['revs'])]}
+      return 200, doc, {}
+    if method=='PUT':
+      if params.get('new_edits')=='false':
+        return self.written(db.write(docID, content, newEdits=False))
+      return self.written(db.write(docID, content, params.get('rev')))
+    if method=='DELETE':
+      return self.written(db.write(docID, {'_deleted':True}, params.get('rev')))
+    return 405, {'error':'method_not_allowed', 'reason':'Only GET,HEAD,PUT,DELETE allowed'}, {}
+
+
+  def localDocument(self, db, method, docID, params, content):
+    """
+    GET, PUT, DELETE of local document: not replicated, no history
+
+    Returns:
+      tuple: status, reply, headers
+    """
+    current = db.local.get(docID)
+    if method in ('GET', 'HEAD'):
+      if current is None:
+        return 404, {'error':'not_found', 'reason':'missing'}, {}
+      return 200, current, {}
+    if method not in ('PUT', 'DELETE'):
+      return 405, {'error':'method_not_allowed', 'reason':'Only GET,HEAD,PUT,DELETE allowed'}, {}
+    given = content.get('_rev') if method=='PUT' else params.get('rev')
+    if given!=(current['_rev'] if current is not None else None):
+      return 409, {'error':'conflict', 'reason':'Document update conflict.'}, {}
+    if method=='DELETE':
+      del db.local[docID]
+      return 200, {'ok':True, 'id':docID, 'rev':'0-0'}, {}
+    rev = '0-'+str(int(current['_rev'].split('-')[1])+1 if current is not None else 1)
+    db.local[docID] = dict(content, _id=docID, _rev=rev)
+    return 201, {'ok':True, 'id':docID, 'rev':rev}, {}
+
+
+  def attachment(self, db, method, docID, name, params, headers, content):
+    """
+    GET, PUT, DELETE of attachment
+
+    Returns:
+      tuple: status, reply, headers
+    """
+    doc = db.output(docID, attachments=True)
+    if method in ('GET', 'HEAD'):
+      if doc is None or name not in doc.get('_attachments', {}):
+        return 404, {'error':'not_found', 'reason':'Document is missing attachment'}, {}
+      attachment = db.docs[docID]['attachments'][name]
+      return 200, (attachment['content_type'], attachment['data']), {}
+    doc = doc or {'_id':docID}
+    doc['_rev'] = params.get('rev', doc.get('_rev'))
+    doc.setdefault('_attachments', {})
+    if method=='PUT':
+      data = content if isinstance(content, bytes) else json.dumps(content).encode('utf-8')
+      doc['_attachments'][name] = {'content_type':headers.get('Content-Type', 'application/octet-stream'),
+                                   'data':base64.b64encode(data or b'').decode('ascii')}
+    elif method=='DELETE':
+      doc['_attachments'].pop(name, None)
+    return self.written(db.write(docID, doc))
+
+
+  def allDocs(self, db, params, content):
+    """
+    Rows of _all_docs: all documents or those with given keys
+
+    Returns:
+      dict: reply
+    """
+    includeDocs = params.get('include_docs')=='true'
+    if 'keys' in content:
+      rows = []
+      for docID in content['keys']:
+        entry = db.docs.get(docID)
+        if entry is None:
+          rows.append({'key':docID, 'error':'not_found'})
+          continue
+        row = {'id':docID, 'key':docID, 'value':{'rev':entry['rev']}}
+        if entry['deleted']:
+          row['value']['deleted'] = True
+        if includeDocs:
+          row['doc'] = db.output(docID)
+        rows.append(row)
+      return {'total_rows':len(db.docs), 'rows':rows}
+    rows = [(collate(docID), docID, docID, {'rev':entry['rev']}) for docID, entry in sorted(db.docs.items())
+            if not entry['deleted']]
+    rows = selectRows(rows, params)
+    for row in rows:
+      if includeDocs:
+        row['doc'] = db.output(row['id'])
+    return {'total_rows':len(db.docs), 'offset':0, 'rows':rows}
+
+
+  def find(self, db, content):
+    """
+    Mango query: selector on _id (value or $in) and fields
+
+    Returns:
+      tuple: status, reply, headers
+    """
+    selector = content.get('selector', {})
+    if set(selector)!={'_id'}:
+      return 400, {'error':'invalid_selector', 'reason':'fakeCouchDB: only selector on _id'}, {}
+    docIDs = selector['_id']['$in'] if isinstance(selector['_id'], dict) else [selector['_id']]
+    docs = [db.output(docID) for docID in sorted(set(docIDs))]
+    docs = [doc for doc in docs if doc is not None][:content.get('limit', 25)]
+    if 'fields' in content:
+      docs = [{key:value for key,value in doc.items() if key in content['fields']} for doc in docs]
+    return 200, {'docs':docs}, {}
+
+
+  def bulkDocs(self, db, content):
+    """
+    Save many documents: each can fail with version conflict
+
+    Returns:
+      tuple: status, reply, headers
+    """
+    newEdits = content.get('new_edits', True)
+    replies = []
+    for doc in content['docs']:
+      docID = doc.get('_id', uuid.uuid4().hex)
+      status, result = db.write(docID, doc, newEdits=newEdits)
+      if newEdits:
+        replies.append({'id':docID, 'rev':result['rev']} if status<300 else
+                       {'id':docID, 'error':result['error'], 'reason':result['reason']})
+    self.condition.notify_all()
+    return 201, replies, {}
+
+
+  def changes(self, db, params):
+    """
+    Changes since sequence: latest change of each document; longpoll waits for first change
+
+    Returns:
+      dict: reply
+    """
+    since = params.get('since', '0')
+    since = len(db.log) if since=='now' else int(since.split('-')[0])
+    if params.get('feed')=='longpoll' and since>=len(db.log):
+      timeout = int(params.get('timeout', 60000))/1000
+      self.condition.wait_for(lambda: len(db.log)>since or self.databases.get(db.name) is not db, timeout)
+    results = []
+    for docID, entry in sorted(db.docs.items(), key=lambda i: i[1]['seq']):
+      if entry['seq']<=since:
+        continue
+      row = {'seq':entry['seq'], 'id':docID, 'changes':[{'rev':entry['rev']}]}
+      if entry['deleted']:
+        row['deleted'] = True
+      if params.get('include_docs')=='true':
+        row['doc'] = db.output(docID) or {'_id':docID, '_rev':entry['rev'], '_deleted':True}
+      results.append(row)
+    if 'limit' in params:
+      results = results[:int(params['limit'])]
+    lastSeq = results[-1]['seq'] if results and 'limit' in params else max(len(db.log), since)
+    return {'results':results, 'last_seq':lastSeq, 'pending':0}
+
+
+  def view(self, db, designID, viewName, params):
+    """
+    Rows of view
+
+    Returns:
+      tuple: status, reply, headers
+    """
+    rows = db.viewIndex(designID, viewName)
+    if rows is None:
+      return 404, {'error':'not_found', 'reason':'missing_named_view'}, {}
+    total = len(rows)
+    rows = selectRows(rows, params)
+    if params.get('include_docs')=='true':
+      for row in rows:
+        row['doc'] = db.output(row['id'])
+    return 200, {'total_rows':total, 'offset':0, 'rows':rows}, {}
+
+
+  def update(self, db, designID, name, docID, params, content):
+    """
+    Run update handler of design document on document
+
+    Returns:
+      tuple: status, reply, headers
+    """
+    design = db.output(designID)
+    if design is None or name not in design.get('updates', {}):
+      return 404, {'error':'not_found', 'reason':'missing update function '+name+' on design doc '+designID}, {}
+    code = design['updates'][name]
+    if code not in self.handlers:
+      self.handlers[code] = jsFunction(code)
+    if self.handlers[code] is None:
+      return 404, {'error':'not_found', 'reason':'update function '+name+' cannot run: js2py is not installed'}, {}
+    body = content.decode('utf-8') if isinstance(content, bytes) else json.dumps(content)
+    request = {'body':body, 'id':docID or None, 'query':params, 'method':'POST'}
+    newDoc, response = self.handlers[code](db.output(docID) if docID else None, request).to_list()
+    headers = {}
+    status = 200
+    if newDoc is not None:
+      status, result = db.write(newDoc.get('_id', docID), newDoc)
+      if status>=300:
+        return status, result, {}
+      self.condition.notify_all()
+      headers['X-Couch-Update-NewRev'] = result['rev']
+    if isinstance(response, dict):
+      status = int(response.get('code', status))
+      if 'json' in response:
+        return status, response['json'], headers
+      response = response.get('body', '')
+    return status, ('text/html; charset=utf-8', str(response).encode('utf-8')), headers
+
+
+def selectRows(rows, params):
+  """
+  Select rows of view or _all_docs by query parameters: key, startkey, endkey, startkey_docid, limit, skip
+
+  Args:
+    rows (list): sorted rows (collated key, docID, key, value)
+    params (dict): query parameters
+
+  Returns:
+    list: rows of reply
+  """
+  from bisect import bisect_left
+  start, end = 0, len(rows)
+  if 'key' in params:
+    key = collate(json.loads(params['key']))
+    start = bisect_left(rows, (key,))
+    end = start
+    while end<len(rows) and rows[end][0]==key:
+      end += 1
+  else:
+    if 'startkey' in params:
+      start = bisect_left(rows, (collate(json.loads(params['startkey'])), params.get('startkey_docid', '')))
+    if 'endkey' in params:
+      endKey = collate(json.loads(params['endkey']))
+      end = start
+      while end<len(rows) and rows[end][0]<=endKey:
+        end += 1
+  start += int(params.get('skip', 0))
+  if 'limit' in params:
+    end = min(end, start+int(params['limit']))
+  return [{'id':docID, 'key':key, 'value':value} for _, docID, key, value in rows[start:end]]
+
+
+def reply(status, result, headers=None):
+  """
+  Args:
+    status (int): http status
+    result (object): json content
+    headers (dict): additional headers
+
+  Returns:
+    tuple: http status, headers, body
+  """
+  headers = dict(headers or {})
+  headers['Content-Type'] = 'application/json'
+  return status, headers, json.dumps(result).encode('utf-8') if status!=304 else b''
+
+
+def requestHandler(fake):
+  """
+  Args:
+    fake (FakeCouchDB): server
+
+  Returns:
+    class: handler of http server
+  """
+  from http.server import BaseHTTPRequestHandler
+
+  class Handler(BaseHTTPRequestHandler):
+    """
+    Pass all requests to fake
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def answer(self):
+      """ answer any method """
+      length = int(self.headers.get('Content-Length', 0) or 0)
+      body = self.rfile.read(length) if length>0 else b''
+      status, headers, content = fake.handle(self.command, self.path, dict(self.headers.items()), body)
+      self.send_response(status)
+      for name, value in headers.items():
+        self.send_header(name, value)
+      self.send_header('Content-Length', str(len(content)))
+      self.end_headers()
+      if self.command!='HEAD':
+        self.wfile.write(content)
+
+    do_GET = do_PUT = do_POST = do_DELETE = do_HEAD = answer
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+      """ no output """
+      return
+
+  return Handler
+
+
+def responseOf(request, status, headers, content):
+  """
+  Args:
+    request (PreparedRequest): request
+    status (int): http status
+    headers (dict): headers of reply
+    content (bytes): body of reply
+
+  Returns:
+    Response: response of requests
+  """
+  import io
+  from requests.models import Response
+  from requests.structures import CaseInsensitiveDict
+  response = Response()
+  response.status_code = status
+  response.reason = HTTPStatus(status).phrase
+  response.headers = CaseInsensitiveDict(headers)
+  response._content = content                # pylint: disable=protected-access
+  response._content_consumed = True          # pylint: disable=protected-access
+  response.raw = io.BytesIO(content)
+  response.encoding = 'utf-8'
+  response.url = request.url
+  response.request = request
+  return response
+
+
+try:
+  from requests.adapters import BaseAdapter
+except ImportError:   #only the http server is used
+  BaseAdapter = object
+
+
+class FakeAdapter(BaseAdapter):
+  """
+  Transport adapter of requests: answers requests in the same process
+  """
+  def __init__(self, fake):
+    """
+    Args:
+      fake (FakeCouchDB): server
+    """
+    super().__init__()
+    self.fake = fake
+
+  def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):  # pylint: disable=arguments-differ,unused-argument
+    """
+    Answer request
+
+    Args:
+      request (PreparedRequest): request
+
+    Returns:
+      Response: response
+    """
+    body = request.body.encode('utf-8') if isinstance(request.body, str) else (request.body or b'')
+    status, headers, content = self.fake.handle(request.method, request.url, dict(request.headers), body,
+                                                trusted=True)
+    return responseOf(request, status, headers, content)
+
+  def close(self):
+    """ nothing to close """
+    return
+
+
+if __name__ == '__main__':
+  import argparse
+  argparser = argparse.ArgumentParser(description='Stand-in of CouchDB in memory, for tests and benchmarks')
+  argparser.add_argument('--host', default='127.0.0.1', help='host to serve on')
+  argparser.add_argument('--port', type=int, default=5984, help='port to serve on')
+  argparser.add_argument('--user', help='name of admin; none=no authentication')
+  argparser.add_argument('--password', help='password of admin')
+  args = argparser.parse_args()
+  server = FakeCouchDB(args.user, args.password)
+  print('fakeCouchDB serves on', server.start(args.port, args.host), ' stop with Ctrl-C')
+  try:
+    threading.Event().wait()
+  except KeyboardInterrupt:
+    server.stop()
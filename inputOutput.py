@@ -68,7 +68,11 @@ def importELN(backend, database, elnFileName):
         newNode['importedFrom'] = elnName+' '+elnVersion
         elnVersion = None
       if elnName=='PASTA ELN' and newNode['-type'][0]!='x0':
-        backend.db.saveDoc(newNode)
+        if newNode['-type'][0][0]=='x':
+          batch.flush()
+          backend.db.saveDoc(newNode)
+        else:
+          batch.save(newNode)
         if newNode['-type'][0][0]=='x':
           os.makedirs(backend.basePath+newNode['-branch'][0]['path'])
         backend.currentID = newNode['_id']
@@ -127,10 +131,13 @@ def importELN(backend, database, elnFileName):
       elnVersion  = ''
     print('Import',elnName,elnVersion)
     mainNode    = [i for i in graph if i["@id"]=="./"][0]
-    #iteratively go through list
-    for part in mainNode['hasPart']:
-      processPart(part) #TODO_P2 first child should get elnName and version
-  return True
+    #iteratively go through list; write documents that are not structure in chunks
+    with backend.batch() as batch:
+      for part in mainNode['hasPart']:
+        processPart(part) #TODO_P2 first child should get elnName and version
+  if batch.failed:
+    print('**ERROR: import could not write',len(batch.failed),'documents')
+  return len(batch.failed)==0
 
 
 def exportELN(backend, docID):
@@ -159,6 +166,7 @@ def exportELN(backend, docID):
 
     #1 ------- write JSON files -------------------
     listDocs = backend.db.getView('viewHierarchy/viewHierarchy', startKey=docID)
+    docs = backend.db.getDocs([i['id'] for i in listDocs])  #many documents: concurrent requests
     #create tree of hierarchical data
     treedata = {}
 
@@ -192,7 +200,7 @@ def exportELN(backend, docID):
     masterID = treedata.pop('__masterID__')
     # print(treedata)
     for doc in treedata:
-      doc = backend.db.getDoc(doc)
+      doc = docs[doc]
       doc['@id']   = doc.pop('_id')
       doc['@type'] = "DigitalDocument"
       if len(treedata[doc['@id']])>0:
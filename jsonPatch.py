@@ -0,0 +1,117 @@
+#!/usr/bin/python3
+""" JSON-patch (RFC 6902) of documents: revisions are stored as reverse deltas
+
+A patch is a list of operations {"op":"add"/"remove"/"replace", "path":"/-branch/0/path", "value":...}.
+Documents store the patch that converts the new version into the previous one as attachment vN.json.
+Older documents store the changed items of the previous version ({item: old value}) instead; both can be
+read.
+"""
+import copy
+
+
+def escapeKey(key):
+  """
+  Args:
+    key (string): key in dictionary or index in list
+
+  Returns:
+    string: key as part of path
+  """
+  return str(key).replace('~','~0').replace('/','~1')
+
+
+def createPatch(source, target, path=''):
+  """
+  Create patch: dictionaries and lists of the same length are compared item by item, everything else
+  is replaced as a whole
+
+  Args:
+    source (object): json-object before
+    target (object): json-object after
+    path (string): path of these objects in document
+
+  Returns:
+    list: operations that convert source into target
+  """
+  if isinstance(source, dict) and isinstance(target, dict):
+    patch = []
+    for key in source:
+      if key not in target:
+        patch.append({'op':'remove', 'path':path+'/'+escapeKey(key)})
+      else:
+        patch += createPatch(source[key], target[key], path+'/'+escapeKey(key))
+    for key in target:
+      if key not in source:
+        patch.append({'op':'add', 'path':path+'/'+escapeKey(key), 'value':target[key]})
+    return patch
+  if isinstance(source, list) and isinstance(target, list) and len(source)==len(target):
+    patch = []
+    for idx, (sourceItem, targetItem) in enumerate(zip(source, target)):
+      patch += createPatch(sourceItem, targetItem, path+'/'+str(idx))
+    return patch
+  if source==target and type(source)==type(target):  #pylint: disable=unidiomatic-typecheck
+    return []
+  return [{'op':'replace', 'path':path, 'value':target}]
+
+
+def applyPatch(doc, patch):
+  """
+  Apply patch to copy of document
+
+  Args:
+    doc (object): json-object
+    patch (list): operations
+
+  Returns:
+    object: changed copy of json-object
+
+  Raises:
+    ValueError: if operation is not supported
+  """
+  doc = copy.deepcopy(doc)
+  for operation in patch:
+    if operation['path']=='':
+      if operation['op'] not in ('add','replace'):
+        raise ValueError('Operation not supported on whole document |'+operation['op'])
+      doc = copy.deepcopy(operation['value'])
+      continue
+    keys = [i.replace('~1','/').replace('~0','~') for i in operation['path'].split('/')[1:]]
+    parent = doc
+    for key in keys[:-1]:
+      parent = parent[int(key)] if isinstance(parent, list) else parent[key]
+    key = keys[-1]
+    if isinstance(parent, list):
+      key = len(parent) if key=='-' else int(key)
+    if operation['op']=='add' and isinstance(parent, list):
+      parent.insert(key, copy.deepcopy(operation['value']))
+    elif operation['op'] in ('add','replace'):
+      parent[key] = copy.deepcopy(operation['value'])
+    elif operation['op']=='remove':
+      del parent[key]
+    else:
+      raise ValueError('Operation not supported |'+operation['op'])
+  return doc
+
+
+def history(doc, deltas):
+  """
+  Reconstruct all versions of document
+
+  Args:
+    doc (dict): current version of document (without _attachments)
+    deltas (list): content of attachments v0.json, v1.json,...: patch or changed items of previous version
+
+  Returns:
+    list: all versions, oldest first; last is current version
+  """
+  versions = [doc]
+  for delta in reversed(deltas):
+    if isinstance(delta, list):
+      previous = applyPatch(versions[0], delta)
+    else:   #old format: changed items
+      previous = copy.deepcopy(versions[0])
+      previous.update(copy.deepcopy(delta))
+      if '_rev' not in delta:
+        previous.pop('_rev', None)
+    versions.insert(0, previous)
+  return versions
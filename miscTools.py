@@ -28,7 +28,8 @@ def createDirName(name,docType,thisChildNumber):
   Returns:
     string: directory name with leading number
   """
-  from commonTools import commonTools as cT  #not globally imported since confuses translation
+  from commonToolsPy import getCommonTools
+  cT = getCommonTools()
   if docType == 'x0':
     return cT.camelCase(name)
   #steps, tasks
@@ -98,7 +99,8 @@ def upIn(key):
   key (bool): key
   """
   import keyring as cred
-  from commonTools import commonTools as cT  # don't import globally since it disturbs translation
+  from commonToolsPy import getCommonTools
+  cT = getCommonTools()
   key = 'bcA:Maw'.join(key.split(':'))
   id_  = cT.uuidv4()
   cred.set_password('pastaDB',id_,key)
@@ -240,7 +242,8 @@ def createQRcodeSheet(fileName="../qrCodes.pdf"):
   import qrcode
   import numpy as np
   from PIL import Image
-  from commonTools import commonTools as cT  # don't import globally since it disturbs translation
+  from commonToolsPy import getCommonTools
+  cT = getCommonTools()
   img = qrcode.make(cT.uuidv4(),
                     error_correction=qrcode.constants.ERROR_CORRECT_M)
   size = img.size[0]
@@ -284,7 +287,8 @@ def printQRcodeSticker(codes={},
   import qrcode, tempfile, os
   import numpy as np
   from PIL import Image, ImageDraw, ImageFont
-  from commonTools import commonTools as cT  # don't import globally since it disturbs translation
+  from commonToolsPy import getCommonTools
+  cT = getCommonTools()
   fnt = ImageFont.truetype("arial.ttf", page['font'])
   offset    = int((page['size'][0]+page['margin'])/page['tiles'])
   qrCodeSize= min(offset-page['font']-page['margin'], page['size'][1])
@@ -339,7 +343,6 @@ def checkConfiguration(conf=None, repair=False):
   """
   import json, os
   from pathlib import Path
-  from cloudant.client import CouchDB
   if conf is None:
     with open(Path.home()/'.pastaELN.json','r', encoding='utf-8') as fConf:
       conf = json.load(fConf)
@@ -376,6 +379,23 @@ def checkConfiguration(conf=None, repair=False):
       conf['version'] = 1
   if not "links" in conf:
     output += '**ERROR mcc01j: No links in config file; REPAIR MANUALLY\n'
+  if 'commonTools' in conf and conf['commonTools'] not in ('python','js'):
+    output += '**ERROR mcc01m: commonTools engine has to be python or js\n'
+    if repair:
+      conf['commonTools'] = 'python'
+  if 'provenance' in conf and conf['provenance'] not in ('off','entry','full'):
+    output += '**ERROR mcc01n: provenance has to be off, entry or full\n'
+    if repair:
+      conf['provenance'] = 'full'
+  if 'idScheme' in conf and conf['idScheme'] not in ('time','random'):
+    output += '**ERROR mcc01o: idScheme has to be time or random\n'
+    if repair:
+      conf['idScheme'] = 'time'
+  for name, link in conf.get('links', {}).items():
+    if isinstance(link, dict) and link.get('local', {}).get('engine', 'couchdb') not in ('couchdb','sqlite'):
+      output += '**ERROR mcc01p: engine of link '+name+' has to be couchdb or sqlite\n'
+      if repair:
+        link['local']['engine'] = 'couchdb'
 
   if not "default" in conf:
     output += '**ERROR mcc01k: No default links in config file\n'
@@ -401,6 +421,234 @@ def checkConfiguration(conf=None, repair=False):
   return output
 
 
+def benchStartup(linkName=''):
+  """
+  Time the startup of a new process: imports and time to first query
+  - new process since imported modules are cached
+  - uses python's importtime, which reports the time of each import incl. its sub-imports
+
+  Args:
+    linkName (string): name of configuration/link used; if empty, use default
+
+  Returns:
+    string: output incl. \n
+  """
+  import sys, json, subprocess
+  from pathlib import Path
+  script = 'import time, sys, json\n'+\
+           'start = time.perf_counter()\n'+\
+           'from backend import Pasta\n'+\
+           'imported = time.perf_counter()\n'+\
+           'be = Pasta(linkDefault=sys.argv[1] if sys.argv[1] else None)\n'+\
+           'opened = time.perf_counter()\n'+\
+           "be.db.getView('viewDocType/x0')\n"+\
+           'query = time.perf_counter()\n'+\
+           'be.exit()\n'+\
+           "print(json.dumps({'import backend':imported-start, 'open backend':opened-start, "+\
+           "'first query':query-start}))\n"
+  cmd = [sys.executable, '-X', 'importtime', '-c', script, linkName]
+  result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False,
+                          cwd=Path(__file__).parent)
+  if result.returncode!=0:
+    return '**ERROR mbs01: startup failed\n'+result.stderr.decode('utf-8')[-2000:]
+  #import time: self [us] | cumulative | imported package; sub-imports are indented
+  imports = {}
+  for line in result.stderr.decode('utf-8').split('\n'):
+    if not line.startswith('import time:') or line.endswith('imported package'):
+      continue
+    _, cumulative, name = line[12:].split('|')
+    if not name[1:].startswith(' '):    #only top-level imports: sub-imports are included in cumulative
+      imports[name.strip()] = int(cumulative)/1.e6
+  times = json.loads(result.stdout.decode('utf-8').strip().split('\n')[-1])
+  output = 'Imports (cumulative, top 15)\n'
+  for name in sorted(imports, key=imports.get, reverse=True)[:15]:
+    output += f'  {name: <40}{imports[name]:8.3f}s\n'
+  output += f'  {"all imports": <40}{sum(imports.values()):8.3f}s\n'
+  output += 'Time since start\n'
+  for name, value in times.items():
+    output += f'  {name: <40}{value:8.3f}s\n'
+  return output
+
+
+def benchHistory(be, numEdits=300):
+  """
+  Time edits of one document and reading its history: all versions with one request (getHistory) compared to
+  reading each revision attachment separately
+  - temporary document is removed afterwards
+
+  Args:
+    be (Pasta): backend
+    numEdits (int): number of edits of document
+
+  Returns:
+    string: output incl. \n
+  """
+  import time
+  from datetime import datetime
+  doc = be.db.saveDoc({'-name':'benchHistory', '-type':['procedure'], '-user':'benchHistory', 'tags':[],
+                       'comment':'', '-date':datetime.now().isoformat(),
+                       '-branch':{'stack':[], 'path':None, 'child':0, 'op':'c'}})
+  if doc is None:
+    return '**ERROR mbh01: could not create document'
+  docID = doc['_id']
+  start = time.perf_counter()
+  for i in range(numEdits):
+    be.db.updateDoc({'comment':'edit '+str(i)+' of a comment that is a few words long', 'tags':['#'+str(i%5)],
+                     '-date':datetime.now().isoformat()}, docID)
+  edits = time.perf_counter()
+  versions = be.db.getHistory(docID)
+  history = time.perf_counter()
+  doc = be.db.getDoc(docID)
+  for name in doc.get('_attachments', {}):
+    be.db.getAttachment(docID, name)
+  single = time.perf_counter()
+  correct = len(versions)==numEdits+1 and versions[0]['comment']=='' and \
+            all(versions[i+1]['comment'].startswith('edit '+str(i)+' ') for i in range(numEdits))
+  size = sum(i.get('length', 0) for i in doc.get('_attachments', {}).values())
+  if hasattr(be.db, 'connection'):  #sqlite
+    with be.db.transaction() as cursor:
+      for table in ('docs', 'revisions', 'rows'):
+        cursor.execute('DELETE FROM '+table+' WHERE id=?', (docID,))
+  else:
+    from cloudant.document import Document
+    be.db.client.r_session.delete(Document(be.db.db, docID).document_url, params={'rev':doc['_rev']})
+  be.db.cache.pop(docID)
+  output = f'Edits of one document: {numEdits}\n'
+  output += f'  {"time per edit": <40}{(edits-start)/numEdits*1000:8.2f}ms\n'
+  output += f'  {"size of all revisions": <40}{size:8,d}byte\n'
+  output += f'  {"getHistory: all versions": <40}{(history-edits)*1000:8.2f}ms\n'
+  output += f'  {"each revision separately": <40}{(single-history)*1000:8.2f}ms\n'
+  output += '  versions are '+('correct' if correct else 'NOT correct')+'\n'
+  return output
+
+
+def benchIDs(be, numDocs=100000, batchSize=1000):
+  """
+  Compare random ids (uuidv4) with time-ordered ids: insert documents into temporary databases and measure
+  throughput and size of database file, before and after compaction
+  - temporary databases are removed afterwards
+
+  Args:
+    be (Pasta): backend
+    numDocs (int): number of documents inserted per scheme
+    batchSize (int): number of documents per bulk request
+
+  Returns:
+    string: output incl. \n
+  """
+  import time
+  from commonToolsPy import uuidv4, timeOrderedID
+  if hasattr(be.db, 'connection'):  #sqlite
+    return '**ERROR mbi02: benchIDs needs a CouchDB server: not supported for SQLite databases\n'
+  session = be.db.client.r_session
+  serverURL = be.db.client.server_url
+  output = f'Inserts of documents: {numDocs:,d} in batches of {batchSize}\n'
+  output += f'  {"scheme": <10}{"docs/s": >10}{"file [MB]": >12}{"compacted [MB]": >16}\n'
+  for scheme, newID in (('random', uuidv4), ('time', timeOrderedID)):
+    url = serverURL+'/pasta_bench_ids_'+scheme
+    session.delete(url)
+    res = session.put(url)
+    if not res.ok:
+      return output+'**ERROR mbi01: could not create temporary database |'+res.text
+    start = time.perf_counter()
+    for i in range(0, numDocs, batchSize):
+      docs = [{'_id':'m-'+newID(), '-name':'file'+str(j)+'.csv', '-type':['measurement'], 'comment':'',
+               'tags':[], '-branch':[{'stack':['x-'+newID()], 'path':None}]}
+              for j in range(i, min(i+batchSize, numDocs))]
+      session.post(url+'/_bulk_docs', json={'docs':docs}).raise_for_status()
+    seconds = time.perf_counter()-start
+    fileSize = session.get(url).json()['sizes']['file']
+    session.post(url+'/_compact', json={})
+    while session.get(url).json().get('compact_running', False):
+      time.sleep(0.5)
+    compacted = session.get(url).json()['sizes']['file']
+    session.delete(url)
+    output += f'  {scheme: <10}{numDocs/seconds: >10,.0f}{fileSize/1e6: >12.1f}{compacted/1e6: >16.1f}\n'
+  return output
+
+
+def cacheDir():
+  """
+  Directory of on-disk cache: environment variable PASTA_CACHE_DIR, e.g. for tests; default ~/.pastaELN_cache/
+
+  Returns:
+    Path: directory
+  """
+  import os
+  from pathlib import Path
+  return Path(os.environ.get('PASTA_CACHE_DIR', Path.home()/'.pastaELN_cache'))
+
+
+def readCache(name, key):
+  """
+  Read entry from on-disk cache (see cacheDir)
+  - entry is marked as recently used for pruneCache
+
+  Args:
+    name (string): name of cache entry
+    key (string): key that the entry was created with, e.g. hash of its input
+
+  Returns:
+    object: content of entry; None if entry does not exist or key differs
+  """
+  import json, os
+  path = cacheDir()/(name+'.json')
+  try:
+    with open(path, 'r', encoding='utf-8') as fIn:
+      entry = json.load(fIn)
+    os.utime(path)
+  except (OSError, ValueError):
+    return None
+  if entry.get('key')!=key:
+    return None
+  return entry['content']
+
+
+def writeCache(name, key, content):
+  """
+  Write entry to on-disk cache (see cacheDir): only readable by user
+  - write to temporary file and rename: parallel readers never see half-written entry
+
+  Args:
+    name (string): name of cache entry
+    key (string): key of entry, e.g. hash of its input
+    content (object): content of entry: json-serializable
+  """
+  import json, os
+  path = cacheDir()/(name+'.json')
+  try:
+    path.parent.mkdir(mode=0o700, exist_ok=True)
+    pathTemp = path.with_suffix('.'+str(os.getpid())+'.tmp')
+    with os.fdopen(os.open(pathTemp, os.O_WRONLY|os.O_CREAT|os.O_TRUNC, 0o600), 'w', encoding='utf-8') as fOut:
+      json.dump({'key':key, 'content':content}, fOut)
+    os.replace(pathTemp, path)
+  except OSError:
+    print('**Warning mwc01: could not write cache |',path)
+    return
+  pruneCache()
+  return
+
+
+def pruneCache(maxBytes=64*2**20):
+  """
+  Remove least recently used entries of on-disk cache until it is smaller than maxBytes
+
+  Args:
+    maxBytes (int): maximum size of all entries
+  """
+  try:
+    entries = [(i.stat().st_mtime, i.stat().st_size, i) for i in cacheDir().glob('*.json')]
+  except OSError:  #removed by other process in the meantime
+    return
+  size = sum(i[1] for i in entries)
+  for _, entrySize, path in sorted(entries, key=lambda i: i[0]):
+    if size<=maxBytes:
+      break
+    path.unlink(missing_ok=True)
+    size -= entrySize
+  return
+
+
 def translateJS2PY():
   """
   Translate js-code to python-code using js2py lib
@@ -6,21 +6,21 @@ are required by frontend. Otherwise, make only temporary changes
 """
 import json, sys, argparse, traceback
 from pathlib import Path
-from subprocess import run, PIPE, STDOUT
-import urllib.request
 from backend import Pasta
 from miscTools import upOut, upIn, getExtractorConfig, printQRcodeSticker, checkConfiguration
 from inputOutput import importELN, exportELN
+from daemon import sendCommand, LOCAL_COMMANDS
 
 SOFTWARE_VERSION = "v1.2.2"
 
-def commands(getDocu, args):
+def commands(getDocu, args, backends=None):
   """
   Main function
 
   Args:
     getDocu (bool): True=return documentation string; False=use arguments
     args (argparse.Namespace): arguments supplied by user / frontend
+    backends (BackendPool): open backends of daemon; if None, open backend and close it at end
 
   Returns:
     string: documentation or empty string
@@ -119,6 +119,36 @@ def commands(getDocu, args):
     print(passwordDecrypt(args.content).decode())
     return '1'
 
+  if getDocu:
+    doc += '  daemon: keep backends open and answer the following commands faster\n'
+    doc += '    example: pastaELN.py daemon\n'
+    doc += '    example: pastaELN.py daemonStop\n'
+  elif args.command=='daemon':
+    from daemon import runDaemon
+    return '1' if runDaemon() else '-1'
+  elif args.command=='daemonStop':
+    if sendCommand({'command':'daemonStop'}) is None:
+      print('**ERROR pma11: daemon is not running')
+      return '-1'
+    return '1'
+
+
+  if getDocu:
+    doc += '  apiServer: local HTTP/JSON API of backend (see apiServer.py)\n'
+    doc += '    example: pastaELN.py apiServer -c 8099\n'
+  elif args.command=='apiServer':
+    from apiServer import runApiServer, PORT
+    return '1' if runApiServer(int(args.content) if args.content else PORT) else '-1'
+
+
+  if getDocu:
+    doc += '  benchStartup: time the imports and the time to first query of a new process\n'
+    doc += '    example: pastaELN.py benchStartup -d instruments\n'
+  elif args.command=='benchStartup':
+    from miscTools import benchStartup
+    print(benchStartup(args.database))
+    return '1'
+
 
   ##################################################
   ## Commands that require open PASTA database, but not specific project
@@ -145,6 +175,7 @@ def commands(getDocu, args):
       if 'ERROR' in output:
         return ''
       # local and remote server test
+      import urllib.request
       urls = ['http://127.0.0.1:5984']
       if config['links'][args.database]['remote']!={}:
         urls.append(config['links'][args.database]['remote']['url'])
@@ -162,22 +193,31 @@ def commands(getDocu, args):
     #open backend
     if not getDocu:
       try:
-        be = Pasta(linkDefault=args.database, initViews=initViews, initConfig=initConfig,
-                  resetOntology=resetOntology)
+        if backends is None:
+          be = Pasta(linkDefault=args.database, initViews=initViews, initConfig=initConfig,
+                    resetOntology=resetOntology)
+        else:
+          be = backends.get(args.database)
       except:
         print('**ERROR pma20: backend could not be started.\n'+traceback.format_exc()+'\n\n')
         return ''
 
     if not getDocu and args.command.startswith('test') and be:
       #PART 2 of test: main test
-      print('database server:',be.db.db.client.server_url)
-      print('default link:',be.confLinkName)
-      print('database name:',be.db.db.database_name)
-      designDocuments = be.db.db.design_documents()
-      print('Design documents')
-      for item in designDocuments:
-        numViews = len(item['doc']['views']) if 'views' in item['doc'] else 0
-        print('  ',item['id'], '   Num. of views:', numViews )
+      if hasattr(be.db, 'connection'):  #sqlite
+        print('database file:',be.db.path)
+        print('default link:',be.confLinkName)
+        print('database name:',be.db.databaseName)
+        print('Number of views:', len(be.db.views))
+      else:
+        print('database server:',be.db.db.client.server_url)
+        print('default link:',be.confLinkName)
+        print('database name:',be.db.db.database_name)
+        designDocuments = be.db.db.design_documents()
+        print('Design documents')
+        for item in designDocuments:
+          numViews = len(item['doc']['views']) if 'views' in item['doc'] else 0
+          print('  ',item['id'], '   Num. of views:', numViews )
       try:
         data = be.db.getDoc('-ontology-')
         print('Ontology exists on server')
@@ -186,6 +226,25 @@ def commands(getDocu, args):
       print('local directory:',be.basePath)
       print('software directory:',be.softwarePath)
       print('software version: '+SOFTWARE_VERSION)
+      print('database statistics:', be.db.stats)
+      if hasattr(be.db, 'transport'):
+        print('latency of requests:\n'+be.db.transport.report())
+      return '1'
+
+    if getDocu:
+      doc += '  benchHistory: time edits of a temporary document and reading its history\n'
+      doc += '    example: pastaELN.py benchHistory -c 300\n'
+    elif args.command=='benchHistory':
+      from miscTools import benchHistory
+      print(benchHistory(be, int(args.content) if args.content else 300))
+      return '1'
+
+    if getDocu:
+      doc += '  benchIDs: compare inserts with random and time-ordered ids into temporary databases\n'
+      doc += '    example: pastaELN.py benchIDs -c 100000\n'
+    elif args.command=='benchIDs':
+      from miscTools import benchIDs
+      print(benchIDs(be, int(args.content) if args.content else 100000))
       return '1'
 
     if getDocu:
@@ -209,6 +268,17 @@ def commands(getDocu, args):
       print('**ERROR pma03: syncRL not implemented yet')
       return '-1'
 
+    if getDocu:
+      doc += '  indexStatus: progress of views that are currently built\n'
+      doc += '    example: pastaELN.py indexStatus -d instruments\n'
+    elif args.command=='indexStatus':
+      progress = be.viewProgress()
+      for designName, percent in progress.items():
+        print('indexing '+designName+' '+str(percent)+'%')
+      if len(progress)==0:
+        print('all views are up to date')
+      return '1'
+
     if getDocu:
       doc += '  print: print overview\n'
       doc += "    label: possible docLabels 'Projects', 'Samples', 'Measurements', 'Procedures'\n"
@@ -254,13 +324,14 @@ def commands(getDocu, args):
       doc += '    afterwards: adopt ontology (views are automatically generated)\n'
     elif args.command=='importXLS':
       import pandas as pd
-      from commonTools import commonTools as cT  #not globally imported since confuses translation
       if args.docID!='':
         be.changeHierarchy(args.docID)
       data = pd.read_excel(args.content, sheet_name=0).fillna('')
-      for _, row in data.iterrows():
-        data = dict((k.lower(), v) for k, v in row.items())
-        be.addData(args.label, data )
+      with be.batch():
+        for _, row in data.iterrows():
+          data = dict((k.lower(), v) for k, v in row.items())
+          be.addData(args.label, data )
+      be.db.warmViews()
       return '1'
 
     if getDocu:
@@ -284,7 +355,7 @@ def commands(getDocu, args):
     elif args.command=='redo':
       data = dict(be.getDoc(args.docID))
       data['-type'] = args.content.split('/')
-      be.useExtractors(data['-branch'][0]['path'], data['shasum'], data, extractorRedo=True)  #any path is good since the file is the same everywhere; data-changed by reference
+      be.useExtractors(Path(data['-branch'][0]['path']), data['shasum'], data, extractorRedo=True)  #any path is good since the file is the same everywhere; data-changed by reference
       if len(data['-type'])>1 and len(data['image'])>1:
         be.db.updateDoc({'image':data['image'], '-type':data['-type']},args.docID)
         return '1'
@@ -303,6 +374,7 @@ def commands(getDocu, args):
       doc += '  updatePASTA: update software version\n'
       doc += '    example: pastaELN.py updatePASTA\n'
     elif args.command=='updatePASTA':
+      from subprocess import run, PIPE, STDOUT
       #update desktop incl. Python backend
       softwarePath = Path(be.softwarePath)
       run(['git','pull'], cwd=softwarePath.parent, stdout=PIPE, stderr=STDOUT, check=True)
@@ -325,8 +397,7 @@ def commands(getDocu, args):
       doc += '  scanHierarchy: scan project with docID\n'
       doc += '    example: pastaELN.py scanHierarchy -i ....\n'
     elif args.command=='scanHierarchy':
-      be.scanTree()
-      return '1'
+      return '1' if be.scanTree() else '-1'
 
     if getDocu:
       doc += '  saveHierarchy: save hierarchy to database\n'
@@ -352,7 +423,7 @@ def commands(getDocu, args):
     print("**ERROR pma10: exception thrown during pastaELN.py"+traceback.format_exc()+"\n")
     raise
 
-  if not getDocu and be is not None:
+  if not getDocu and be is not None and backends is None:
     be.exit()
   return doc
 
@@ -369,7 +440,14 @@ if __name__=='__main__':
   argparser.add_argument('-l','--label',   help='label used for printing', default='x0')
   argparser.add_argument('-d','--database',help='name of database configuration', default='') #required for be = Pasta(args.database)
   arguments = argparser.parse_args()
-  result = commands(False, arguments)
+  result = None
+  if arguments.command not in LOCAL_COMMANDS:
+    reply = sendCommand(arguments)  #use daemon, if running
+    if reply is not None:
+      result, output = reply
+      print(output, end='')
+  if result is None:
+    result = commands(False, arguments)
   if result == '':
     print('**ERROR pma08: command in pastaELN.py does not exist |',arguments.command)
   elif result == '1' and arguments.command!='up':
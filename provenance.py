@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+""" Provenance of documents: which code created / changed them, stored as '-client' in documents
+
+Levels
+- off:   nothing is stored
+- entry: only the outermost PASTA function, e.g. command of pastaELN.py or test
+- full:  all PASTA functions of call stack
+
+The call stack is read from the frames (no source lines are read) and identified by a short id, which is
+stored in the document. The ids are resolved with the '-provenance-' document of the database.
+"""
+import sys, hashlib
+
+LEVELS = ('off', 'entry', 'full')
+FILTER = ('backend.py', 'database.py', 'Tests', 'pasta')  #frames of files that contain these are used
+
+
+class Provenance:
+  """
+  Ids of call sites: identical call stacks are identified once
+  """
+  def __init__(self, level='full', register=None):
+    """
+    Args:
+      level (string): off, entry, full
+      register (function): called with (id, description) when a call site is seen for the first time
+    """
+    if level not in LEVELS:
+      print('**ERROR ppr01: unknown level of provenance, use full |',level)
+      level = 'full'
+    self.level = level
+    self.register = register
+    self.sites = {}      #tuple of (code, line): id
+    self.files = {}      #file name: used
+    self.known = {}      #id: description
+
+
+  def callSite(self, skip=1):
+    """
+    Id of call stack of PASTA functions
+
+    Args:
+      skip (int): number of frames to skip, starting at caller of this function
+
+    Returns:
+      string: id of call site; '' if provenance is off
+    """
+    if self.level=='off':
+      return ''
+    frame = sys._getframe(skip+1)  # pylint: disable=protected-access
+    key = []
+    while frame is not None:
+      code = frame.f_code
+      if code.co_filename not in self.files:
+        self.files[code.co_filename] = any(i in code.co_filename for i in FILTER)
+      if self.files[code.co_filename]:
+        key.append((code, frame.f_lineno))
+      frame = frame.f_back
+    if self.level=='entry':
+      key = key[-1:]
+    key = tuple(key)
+    if key not in self.sites:
+      description = '|'.join(code.co_filename.replace('\\','/').split('/')[-1]+':'+code.co_name+':'+str(line)
+                             for code, line in reversed(key))
+      siteID = hashlib.sha1(description.encode('utf-8')).hexdigest()[:12]
+      self.sites[key] = siteID
+      if siteID not in self.known:
+        self.known[siteID] = description
+        if self.register is not None:
+          self.register(siteID, description)
+    return self.sites[key]
@@ -41,6 +41,21 @@ def passwordDecrypt(token: bytes) -> bytes:
 #global variables
 headers = requests.structures.CaseInsensitiveDict()
 headers["Content-Type"] = "application/json"
+transport = None  #pooled connections to server: created at first use, see session()
+
+
+def session():
+  '''
+  Session with pooled connections to server
+
+  Returns:
+    Session: session of transport
+  '''
+  global transport  # pylint: disable=global-statement
+  if transport is None:
+    from transport import Transport
+    transport = Transport()
+  return transport.session
 
 
 def createUserDatabase(url, auth, userName):
@@ -56,7 +71,7 @@ def createUserDatabase(url, auth, userName):
   userDB = userName.replace('.','_')
 
   # create database
-  resp = requests.put(url+'/'+userDB, headers=headers, auth=auth)
+  resp = session().put(url+'/'+userDB, headers=headers, auth=auth)
   if not resp.ok:
     print("**ERROR 1: put not successful",resp.reason)
     return
@@ -65,7 +80,7 @@ def createUserDatabase(url, auth, userName):
   data = {"docs":[{"_id":"org.couchdb.user:"+userName,"name": userName,"password":userPW,
     "roles":[userDB+"-W"], "type": "user", "orcid": ""}]}
   data = json.dumps(data)
-  resp = requests.post(url+'/_users/_bulk_docs', headers=headers, auth=auth, data=data)
+  resp = session().post(url+'/_users/_bulk_docs', headers=headers, auth=auth, data=data)
   if not resp.ok:
     print("**ERROR 2: post not successful",resp.reason)
     return
@@ -74,7 +89,7 @@ def createUserDatabase(url, auth, userName):
   data = {"admins": {"names":[],"roles":[userDB+"-W"]},
           "members":{"names":[],"roles":[userDB+"-R"]}}
   data = json.dumps(data)
-  resp = requests.put(url+'/'+userDB+'/_security', headers=headers, auth=auth, data=data)
+  resp = session().put(url+'/'+userDB+'/_security', headers=headers, auth=auth, data=data)
   if not resp.ok:
     print("**ERROR 3: post not successful",resp.reason)
     return
@@ -84,7 +99,7 @@ def createUserDatabase(url, auth, userName):
     "if (userCtx.roles.indexOf('"+userDB+"-W')!==-1){return;} "+\
     "else {throw({unauthorized:'Only Writers (W) may edit the database'});}}"}
   data = json.dumps(data)
-  resp = requests.put(url+'/'+userDB+'/_design/authentication', headers=headers, auth=auth, data=data)
+  resp = session().put(url+'/'+userDB+'/_design/authentication', headers=headers, auth=auth, data=data)
   if not resp.ok:
     print("**ERROR 4: post not successful",resp.reason)
     return
@@ -122,7 +137,7 @@ def listUsers(url, auth, verbose=True):
   Returns:
     dict: user information
   '''
-  resp = requests.get(url+'/_users/_all_docs', headers=headers, auth=auth)
+  resp = session().get(url+'/_users/_all_docs', headers=headers, auth=auth)
   if not resp.ok:
     print("**ERROR: get not successful",resp.reason)
     return {}
@@ -134,7 +149,7 @@ def listUsers(url, auth, verbose=True):
       continue
     if verbose:
       print(i['id'][17:]+'       key:'+i['key'][17:])
-    respI = requests.get(url+'/_users/'+i['id'], headers=headers, auth=auth)
+    respI = session().get(url+'/_users/'+i['id'], headers=headers, auth=auth)
     respI = json.loads(respI.text)
     results[respI['name']] = respI['roles']
     if verbose:
@@ -166,7 +181,7 @@ def listDB(url, auth, verbose):
   Returns:
     dict: database information
   '''
-  resp = requests.get(url+'/_all_dbs', headers=headers, auth=auth)
+  resp = session().get(url+'/_all_dbs', headers=headers, auth=auth)
   if not resp.ok:
     print("**ERROR: get not successful",resp.reason)
     return {}
@@ -179,7 +194,7 @@ def listDB(url, auth, verbose):
     if verbose:
       print(i)
     # test security
-    respI = requests.get(url+'/'+i+'/_security', headers=headers, auth=auth)
+    respI = session().get(url+'/'+i+'/_security', headers=headers, auth=auth)
     respI = json.loads(respI.text)
     security = [respI['admins']['roles'], respI['members']['roles']]
     if verbose:
@@ -192,7 +207,7 @@ def listDB(url, auth, verbose):
       else:
         print('  -> **ERROR** security')
     # test authentication
-    respI = requests.get(url+'/'+i+'/_design/authentication', headers=headers, auth=auth)
+    respI = session().get(url+'/'+i+'/_design/authentication', headers=headers, auth=auth)
     respI = json.loads(respI.text)['validate_doc_update']
     respI = respI.split('indexOf')[1].split('!==')[0].strip()[2:-2]
     results[i] = security+[respI]
@@ -211,7 +226,7 @@ def testUser(url, auth, userName, userPassword):
   test if configuration for this user is correct
   '''
   # Test if server exists
-  resp = requests.get(url, headers=headers)
+  resp = session().get(url, headers=headers)
   if resp.ok:
     print("-> Server exists")
   else:
@@ -237,14 +252,14 @@ def testUser(url, auth, userName, userPassword):
         print("**ERROR: ",write,read,authen,iDB)
         break
     #test server with user credentials 1
-    resp = requests.get(url+'/'+iDB, headers=headers, auth=authUser)
+    resp = session().get(url+'/'+iDB, headers=headers, auth=authUser)
     if resp.ok:
       print("-> Database can be read")
     else:
       print("**ERROR: Database cannot be read")
       break
     #test server with user credentials 2
-    resp = requests.get(url+'/'+iDB+'/_design/authentication', headers=headers, auth=authUser)
+    resp = session().get(url+'/'+iDB+'/_design/authentication', headers=headers, auth=authUser)
     if resp.ok:
       print("-> Authentication can be read")
     else:
@@ -281,7 +296,7 @@ def main():
   auth = requests.auth.HTTPBasicAuth(administrator, password)
 
   while True:
-    print('\nCommands: [q]uit; [n]ew user; list [u]ser; list [d]atabases; [t]est user')
+    print('\nCommands: [q]uit; [n]ew user; list [u]ser; list [d]atabases; [t]est user; [s]tatistics of requests')
     command = input('> ')
     userName, userPassword = '', ''
     if command == 'q':
@@ -300,6 +315,8 @@ def main():
       listDB(url, auth, True)
     elif command == 't' and userName and userPassword and len(userName)>2 and len(userPassword)>2:
       testUser(url, auth, userName, userPassword)
+    elif command == 's':
+      print(transport.report() if transport is not None else 'No requests yet')
     else:
       print("Unknown command or incomplete entries.")
 
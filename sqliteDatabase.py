@@ -0,0 +1,834 @@
+#!/usr/bin/python3
+""" Embedded storage in one SQLite file: same interface as Database, without database server
+
+For single-user installations: reads are local and take less than a millisecond, no server process is needed.
+Select per link in .pastaELN.json: "local": {"engine":"sqlite", "file":"/path/to/pasta.sqlite", ...}
+
+Tables
+- docs: id, rev, json of document; revision attachments are stubs in the document
+- revisions: id, name (vN.json), content: reverse JSON-patch of each update, as attachments in CouchDB
+- rows: view, key, id, value of all views: updated with each write, queried with index on (view, key)
+- meta: definitions of views
+
+Views are python functions of the same rows as the javascript views of Database.createViewCode. The file uses
+the write-ahead log (WAL): readers do not wait for writers. Documents keep CouchDB-style revisions, which
+allows replicateDB to push them to a CouchDB server.
+"""
+import json, sqlite3, threading, traceback, uuid
+from contextlib import contextmanager
+from database import Database
+
+
+class NoCache:
+  """
+  Reads are local: no cache of documents
+  """
+  def get(self, docID):  # pylint: disable=unused-argument
+    """ nothing cached """
+    return None
+
+  def put(self, doc):
+    """ nothing to cache """
+    return
+
+  def pop(self, docID):
+    """ nothing to remove """
+    return
+
+  def clear(self):
+    """ nothing to clear """
+    return
+
+
+class SqliteDocument(dict):
+  """
+  Document of SqliteDatabase: can be changed and saved, like Document of cloudant
+  """
+  def __init__(self, db, *args, **kwargs):
+    """
+    Args:
+      db (SqliteDatabase): database
+      args (list): content
+      kwargs (dict): content
+    """
+    super().__init__(*args, **kwargs)
+    self.db = db
+
+  def save(self):
+    """
+    Save document without new revision attachment
+
+    Raises:
+      IOError: if other process saved it in the meantime
+    """
+    rev = self.db.putDoc(self)
+    if rev is None:
+      raise IOError('**ERROR dsq04: version conflict |'+self['_id'])
+    self['_rev'] = rev
+    return
+
+  def put_attachment(self, name, contentType, data):  # pylint: disable=unused-argument
+    """
+    Add attachment, e.g. revision from backup
+
+    Args:
+      name (string): name, e.g. v0.json
+      contentType (string): content type
+      data (string): content
+    """
+    with self.db.transaction() as cursor:
+      cursor.execute('INSERT OR REPLACE INTO revisions VALUES (?,?,?)', (self['_id'], name, data))
+      self.setdefault('_attachments', {})[name] = {'content_type':contentType, 'stub':True, 'length':len(data)}
+      self.save()
+    return
+
+
+def newRevision(rev=None):
+  """
+  Args:
+    rev (string): current revision; None for new document
+
+  Returns:
+    string: next revision, as in CouchDB: number-hex
+  """
+  number = 0 if rev is None else int(rev.split('-')[0])
+  return str(number+1)+'-'+uuid.uuid4().hex
+
+
+def viewRows(spec, doc):
+  """
+  Rows of one view for one document: same as the javascript views of Database.createViewCode
+  - document that does not fit (e.g. missing items) has no rows, as the exception in javascript
+
+  Args:
+    spec (dict): definition of view, see SqliteDatabase.createViewCode
+    doc (dict): document
+
+  Returns:
+    list: (key, value)
+  """
+  try:
+    kind = spec['map']
+    if kind=='docType':
+      docType = spec['docType']
+      if docType=='x0':
+        if '/'.join(doc['-type'])!='x0':
+          return []
+        key = doc['_id']
+      else:
+        if '/'.join(doc['-type'])[:len(docType)]!=docType:
+          return []
+        stack = doc['-branch'][0]['stack']
+        key = stack[0] if stack else None
+      value = []
+      for name in spec['columns']:
+        if name=='image':
+          value.append(str(len(doc['image'])>3).lower())
+        elif name=='tags':
+          value.append(' '.join(doc['tags']))
+        elif name=='-type':
+          value.append('/'.join(doc['-type'][1:]))
+        elif name=='content':
+          value.append(doc['content'][:100] if doc.get('content') else '')
+        elif '/' in name:  #stacked requests i.e. metaVendor/date
+          item = doc
+          for part in name.split('/'):
+            item = item.get(part) if isinstance(item, dict) else None
+          value.append('' if item is None else item)
+        else:
+          value.append(doc.get(name))
+      return [(key, value)]
+    if kind=='hierarchy':
+      if '-type' not in doc:
+        return []
+      return [(' '.join(branch['stack']+[doc['_id']]), [branch['child'], doc['-type'], doc['-name']])
+              for branch in doc['-branch']]
+    if kind=='paths':
+      if '-type' not in doc or '-branch' not in doc:
+        return []
+      return [(branch['path'], [branch['stack'], doc['-type'], branch['child'], doc.get('shasum', '')])
+              for branch in doc['-branch'] if branch['path']]
+    if kind=='shasum':
+      return [(doc.get('shasum'), doc['-name'])] if doc['-type'][0]=='measurement' else []
+    if kind=='qr':
+      return [(code, doc['-name']) for code in doc['qrCode']]
+    if kind=='tags':
+      return [('#'+tag, doc['-name']) for tag in spec['magicTags'] if '#'+tag in doc['tags']]
+  except (KeyError, IndexError, TypeError, AttributeError):
+    return []
+  return []
+
+
+class SqliteDatabase(Database):
+  """
+  Class for interaction with SQLite file: same interface as Database
+  """
+
+  def __init__(self, user, password, databaseName, confirm, softwarePath='', **kwargs):  # pylint: disable=super-init-not-called
+    """
+    Args:
+        user (string): not used
+        password (string): not used
+        databaseName (string): local database name
+        confirm (function): confirm changes to database and file-tree
+        softwarePath (string): path to software and default dataDictionary.json
+        kwargs (dict): additional parameter
+          - sqliteFile (string): path of file; default: databaseName.sqlite
+    """
+    from pathlib import Path
+    from provenance import Provenance
+    self.confirm = confirm
+    self.databaseName = databaseName
+    self.path = Path(kwargs.get('sqliteFile', databaseName+'.sqlite'))
+    self.lock = threading.RLock()  #connection is shared between threads
+    self.depth = 0                 #depth of nested transactions
+    try:
+      self.connection = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+      self.connection.execute('PRAGMA journal_mode=WAL')
+      self.connection.execute('PRAGMA synchronous=NORMAL')
+      with self.transaction() as cursor:
+        cursor.execute('CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, rev TEXT NOT NULL, doc TEXT NOT NULL)')
+        cursor.execute('CREATE TABLE IF NOT EXISTS revisions (id TEXT, name TEXT, content TEXT, PRIMARY KEY(id, name))')
+        cursor.execute('CREATE TABLE IF NOT EXISTS rows (view TEXT, sortKey TEXT, key TEXT, id TEXT, value TEXT)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS rowsByKey ON rows (view, sortKey, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS rowsByID ON rows (id)')
+        cursor.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+    except:
+      print('**ERROR dsq01: could not open database file |',self.path,'\n'+traceback.format_exc())
+      raise
+    self.views = {}  #path: definition of view
+    row = self.connection.execute("SELECT value FROM meta WHERE name='views'").fetchone()
+    if row is not None:
+      self.views = json.loads(row[0])
+    self.stats = {'viewRoundTripsSaved':0, 'notModified':0, 'updates':0, 'conflicts':0, 'conflictsMerged':0,
+                  'conflictsLost':0}
+    self.cache = NoCache()
+    self.provenance = Provenance(kwargs.get('provenance', 'full'), self.registerCallSite)
+    # check if default documents exist and create
+    try:
+      self.ontology = self.getDoc('-ontology-')
+    except KeyError:
+      self.ontology = None
+    if self.ontology is None or kwargs.get('resetOntology', False):
+      if self.ontology is not None:
+        print('Info: remove old ontology')
+        with self.transaction() as cursor:
+          cursor.execute("DELETE FROM docs WHERE id='-ontology-'")
+      with open(Path(softwarePath).joinpath('ontology.json'), 'r', encoding='utf-8') as fIn:
+        doc = json.load(fIn)
+      doc['_id'] = '-ontology-'
+      self.ontology = self.insertDocs([doc])[0]
+    return
+
+
+  @contextmanager
+  def transaction(self):
+    """
+    Write transaction: all changes inside are saved together or not at all
+    - nested transactions are part of the outer one
+    - other processes wait until it is finished (busy timeout)
+
+    Yields:
+        Cursor: cursor of connection
+    """
+    with self.lock:
+      if self.depth>0:
+        self.depth += 1
+        try:
+          yield self.connection.cursor()
+        finally:
+          self.depth -= 1
+        return
+      self.connection.execute('BEGIN IMMEDIATE')
+      self.depth = 1
+      try:
+        yield self.connection.cursor()
+        self.connection.execute('COMMIT')
+      except:
+        self.connection.execute('ROLLBACK')
+        raise
+      finally:
+        self.depth = 0
+
+
+  def initViews(self, docTypesLabels, magicTags=['TODO','v1'], guiMaxColumns=16, viewCode=None):
+    """
+    initialize all views: if definitions changed, rows of all documents are created again
+
+    Args:
+      docTypesLabels (list): pair of (docType,docLabel) used to create views
+      magicTags (list): magic tags used for view creation
+      guiMaxColumns (int): max. colums in view
+      viewCode (dict): definitions of all design documents, e.g. from cache; None=create from ontology
+    """
+    if viewCode is None:
+      viewCode = self.createViewCode(docTypesLabels, magicTags, guiMaxColumns)
+    views = {designName+'/'+viewName:spec for designName, specs in viewCode.items()
+             for viewName, spec in specs.items()}
+    if views==self.views:
+      return
+    with self.transaction() as cursor:
+      self.views = views
+      cursor.execute('INSERT OR REPLACE INTO meta VALUES (?,?)', ('views', json.dumps(views)))
+      cursor.execute('DELETE FROM rows')
+      for docID, content in self.connection.execute('SELECT id, doc FROM docs').fetchall():
+        self.indexDoc(cursor, json.loads(content), docID)
+    return
+
+
+  def createViewCode(self, docTypesLabels, magicTags=['TODO','v1'], guiMaxColumns=16):
+    """
+    create definitions of all views from ontology: same rows as javascript views of Database
+
+    Args:
+      docTypesLabels (list): pair of (docType,docLabel) used to create views
+      magicTags (list): magic tags used for view creation
+      guiMaxColumns (int): max. colums in view
+
+    Returns:
+      dict: design-document name: {view name: definition}
+    """
+    viewCode = {}
+    for docType in docTypesLabels:
+      if docType[0]=='x' and docType!='x0':
+        continue
+      columns = [item['name'] for idx, item in enumerate(self.ontology[docType])
+                 if idx<=guiMaxColumns and 'name' in item]
+      viewCode[docType.replace('/','__')] = {'map':'docType', 'docType':docType, 'columns':columns}
+    return {'viewDocType':viewCode,
+            'viewHierarchy':{'viewHierarchy':{'map':'hierarchy'}, 'viewPaths':{'map':'paths'}},
+            'viewIdentify':{'viewQR':{'map':'qr'}, 'viewSHAsum':{'map':'shasum'},
+                            'viewTags':{'map':'tags', 'magicTags':list(magicTags)}}}
+
+
+  def indexDoc(self, cursor, doc, docID):
+    """
+    Replace rows of document in all views
+
+    Args:
+      cursor (Cursor): cursor of transaction
+      doc (dict): document; None if it was removed
+      docID (string): id of document
+    """
+    cursor.execute('DELETE FROM rows WHERE id=?', (docID,))
+    if doc is None or docID.startswith('-'):
+      return
+    rows = []
+    for path, spec in self.views.items():
+      for key, value in viewRows(spec, doc):
+        rows.append((path, key if isinstance(key, str) else None, json.dumps(key), docID, json.dumps(value)))
+    cursor.executemany('INSERT INTO rows VALUES (?,?,?,?,?)', rows)
+    return
+
+
+  def exit(self, deleteDB=False):
+    """
+    Shutting down things
+
+    Args:
+      deleteDB (bool): remove database file
+    """
+    self.connection.close()
+    if deleteDB:
+      for suffix in ('', '-wal', '-shm'):
+        self.path.with_name(self.path.name+suffix).unlink(missing_ok=True)
+    return
+
+
+  def getDoc(self, docID, fresh=False):  # pylint: disable=unused-argument
+    """
+    Get document
+
+    Args:
+        docID (dict): document id
+        fresh (bool): not used: documents are always read from file
+
+    Returns:
+        SqliteDocument: json representation of document; can be changed and saved
+
+    Raises:
+        KeyError: if document does not exist
+    """
+    row = self.connection.execute('SELECT doc FROM docs WHERE id=?', (docID,)).fetchone()
+    if row is None:
+      raise KeyError(docID)
+    return SqliteDocument(self, json.loads(row[0]))
+
+
+  def getDocs(self, docIDs):
+    """
+    Get many documents
+
+    Args:
+        docIDs (list): document ids
+
+    Returns:
+        dict: docID: json representation of document; None if it does not exist
+    """
+    docs = {docID:None for docID in docIDs}
+    docIDs = list(docs)
+    for start in range(0, len(docIDs), 500):  #limit of variables in query
+      chunk = docIDs[start:start+500]
+      query = 'SELECT id, doc FROM docs WHERE id IN ('+','.join('?'*len(chunk))+')'
+      docs.update({docID:json.loads(content) for docID, content in self.connection.execute(query, chunk)})
+    return docs
+
+
+  def registerCallSite(self, siteID, description):
+    """
+    Add call site to '-provenance-' document, if it is not there already
+
+    Args:
+        siteID (string): id of call site
+        description (string): | separated list of file:function:line
+    """
+    try:
+      with self.transaction():
+        try:
+          doc = self.getDoc('-provenance-')
+        except KeyError:
+          doc = self.insertDocs([{'_id':'-provenance-', 'callSites':{}}])[0]
+        self.provenance.known.update(doc['callSites'])
+        if siteID not in doc['callSites']:
+          doc['callSites'][siteID] = description
+          doc.save()
+    except:
+      print('**Warning dpr01: could not register call site |',siteID,description)
+    return
+
+
+  def callSiteDescription(self, siteID):
+    """
+    Args:
+        siteID (string): id of call site, as in '-client' of documents
+
+    Returns:
+        string: | separated list of file:function:line; None if unknown
+    """
+    if siteID not in self.provenance.known:
+      try:
+        self.provenance.known.update(self.getDoc('-provenance-')['callSites'])
+      except KeyError:
+        return None
+    return self.provenance.known.get(siteID)
+
+
+  def insertDocs(self, docs):
+    """
+    Insert new documents in one transaction
+
+    Args:
+        docs (list): documents; id is created if not given
+
+    Returns:
+        list: for each document: saved document; None if id exists already
+    """
+    results = []
+    with self.transaction() as cursor:
+      for doc in docs:
+        doc = SqliteDocument(self, doc)
+        doc.setdefault('_id', uuid.uuid4().hex)
+        doc['_rev'] = newRevision()
+        try:
+          cursor.execute('INSERT INTO docs VALUES (?,?,?)', (doc['_id'], doc['_rev'], json.dumps(doc)))
+        except sqlite3.IntegrityError:
+          print('**ERROR dsq02: document exists already |',doc['_id'])
+          results.append(None)
+          continue
+        self.indexDoc(cursor, doc, doc['_id'])
+        results.append(doc)
+    return results
+
+
+  def saveDoc(self, doc):
+    """
+    Save new document
+
+    Args:
+        doc (dict): document to save
+
+    Returns:
+        dict: json representation of submitted document
+    """
+    doc['-client'] = self.callStack()
+    if '-branch' in doc and 'op' in doc['-branch']:
+      del doc['-branch']['op']  #remove operation, saveDoc creates and therefore always the same
+      doc['-branch'] = [doc['-branch']]
+    if self.confirm is None or self.confirm(doc,"Create this document?"):
+      return self.insertDocs([doc])[0]
+    return doc
+
+
+  def saveDocs(self, docs):
+    """
+    Save many new documents in one transaction
+
+    Args:
+        docs (list): documents to save; '-client' is kept if given, e.g. from time of buffering
+
+    Returns:
+        list: for each document: json representation of submitted document; None if it could not be saved
+    """
+    client = self.callStack()
+    results, submit = [], []  #submit: index in results
+    for doc in docs:
+      if '-client' not in doc:
+        doc['-client'] = client
+      if '-branch' in doc and 'op' in doc['-branch']:
+        del doc['-branch']['op']  #remove operation, saveDoc creates and therefore always the same
+        doc['-branch'] = [doc['-branch']]
+      if self.confirm is None or self.confirm(doc,"Create this document?"):
+        submit.append(len(results))
+      results.append(doc)
+    for idx, saved in zip(submit, self.insertDocs([results[i] for i in submit])):
+      results[idx] = saved
+    return results
+
+
+  def putDoc(self, doc):
+    """
+    Save existing document: inline attachments (revisions) are moved into their table
+
+    Args:
+        doc (dict): document with _id and _rev of the version it is based on
+
+    Returns:
+        string: new revision; None if version conflict (other process saved in the meantime)
+    """
+    import base64
+    with self.transaction() as cursor:
+      row = cursor.execute('SELECT rev FROM docs WHERE id=?', (doc['_id'],)).fetchone()
+      if row is None or row[0]!=doc.get('_rev'):
+        return None
+      saved = json.loads(json.dumps(doc))
+      for name, attachment in saved.get('_attachments', {}).items():
+        if 'data' in attachment:
+          content = base64.b64decode(attachment.pop('data')).decode('utf-8')
+          cursor.execute('INSERT OR REPLACE INTO revisions VALUES (?,?,?)', (doc['_id'], name, content))
+          attachment.update({'stub':True, 'length':len(content)})
+      saved['_rev'] = newRevision(row[0])
+      cursor.execute('UPDATE docs SET rev=?, doc=? WHERE id=?', (saved['_rev'], json.dumps(saved), doc['_id']))
+      self.indexDoc(cursor, saved, doc['_id'])
+    return saved['_rev']
+
+
+  def updateDocs(self, changes):
+    """
+    Update many documents in one transaction
+    - same as updateDoc; changes of the same document are applied in order
+
+    Args:
+        changes (list): list of (change, docID); see updateDoc
+
+    Returns:
+        dict: docID: json representation of updated document; None if it could not be updated
+    """
+    import copy
+    client = self.callStack()
+    results = {}
+    with self.transaction():
+      for change, docID in changes:
+        try:
+          doc = self.getDoc(docID)
+        except KeyError:
+          print('**ERROR dud02: document does not exist |',docID)
+          results.setdefault(docID, None)
+          continue
+        if '-client' not in change:
+          change['-client'] = client
+        initialDoc = copy.deepcopy(dict(doc))
+        oldDoc = self.applyChange(change, doc)
+        results[docID] = doc
+        if oldDoc is None or \
+           (self.confirm is not None and not self.confirm({'new':doc,'old':oldDoc},"Update this document?")):
+          results[docID] = SqliteDocument(self, initialDoc)
+          continue
+        self.attachRevision(doc, initialDoc)
+        self.revisionSaved(doc, self.putDoc(doc))
+        self.stats['updates'] += 1
+    return results
+
+
+  def updateBranch(self, change, docID):
+    """
+    Update -branch of document: same as updateDoc, since documents are local
+
+    Args:
+        change (dict): item to update, see updateDoc
+        docID (string):  id of document to change
+
+    Returns:
+        bool: success
+    """
+    try:
+      return self.updateDoc(change, docID) is not None
+    except KeyError:
+      print('**ERROR dub01: could not update branch of document |',docID)
+      return False
+
+
+  def getHistory(self, docID):
+    """
+    Get all versions of document
+
+    Args:
+        docID (string): id of document
+
+    Returns:
+        list: all versions, oldest first; last is current version; empty list on error
+    """
+    from jsonPatch import history
+    try:
+      doc = dict(self.getDoc(docID))
+    except KeyError:
+      print('**ERROR dgh01: could not get document with history |',docID)
+      return []
+    doc.pop('_attachments', None)
+    return history(doc, self.revisionDeltas(docID))
+
+
+  def revisionDeltas(self, docID):
+    """
+    Args:
+        docID (string): id of document
+
+    Returns:
+        list: content of revision attachments v0.json, v1.json,...
+    """
+    rows = self.connection.execute("SELECT name, content FROM revisions WHERE id=? AND name GLOB 'v*.json'",
+                                   (docID,)).fetchall()
+    rows = [(name, content) for name, content in rows if name[1:-5].isdigit()]
+    return [json.loads(content) for _, content in sorted(rows, key=lambda i: int(i[0][1:-5]))]
+
+
+  def getView(self, thePath, startKey=None, preciseKey=None, includeDocs=False):
+    """
+    Get rows of view from table
+
+    Args:
+        thePath (string): path to view
+        startKey (string): if given, use to filter output, everything that starts with this key
+        preciseKey (string): if given, use to filter output. Match precisely
+        includeDocs (bool): include full document as 'doc' in each row
+
+    Returns:
+        list: list of documents in this view
+    """
+    return list(self.iterView(thePath, startKey, preciseKey, includeDocs))
+
+
+  def iterView(self, thePath, startKey=None, preciseKey=None, includeDocs=False, pageSize=1000):
+    """
+    Iterate through view: rows are read from the cursor page by page
+
+    Args:
+        thePath (string): path to view; '_all_docs' iterates all documents
+        startKey (string): if given, use to filter output, everything that starts with this key
+        preciseKey (string): if given, use to filter output. Match precisely
+        includeDocs (bool): include full document as 'doc' in each row
+        pageSize (int): number of rows read at once
+
+    Yields:
+        dict: row of view
+    """
+    if thePath=='_all_docs':
+      query, params = 'SELECT id, json_quote(id), json_object(\'rev\', rev), doc FROM docs', []
+      column = 'id'
+    elif thePath in self.views:
+      query = 'SELECT rows.id, key, value'+(', doc' if includeDocs else '')+' FROM rows'
+      query+= ' LEFT JOIN docs ON docs.id=rows.id' if includeDocs else ''
+      query, params, column = query+' WHERE view=?', [thePath], 'sortKey'
+    else:
+      print('**ERROR dgv01: Database / Network problem for path |',thePath.split('/')[-1])
+      return
+    if startKey is not None:
+      query += (' AND ' if params else ' WHERE ')+column+'>=? AND '+column+'<=?'
+      params += [startKey, startKey+'zzz']
+    elif preciseKey is not None:
+      query += (' AND ' if params else ' WHERE ')+column+'=?'
+      params.append(preciseKey)
+    query += ' ORDER BY '+column+(', rows.id' if column=='sortKey' else '')
+    cursor = self.connection.execute(query, params)
+    while True:
+      rows = cursor.fetchmany(pageSize)
+      if len(rows)==0:
+        return
+      for row in rows:
+        result = {'id':row[0], 'key':json.loads(row[1]), 'value':json.loads(row[2])}
+        if includeDocs:
+          result['doc'] = json.loads(row[3]) if row[3] is not None else None
+        yield result
+
+
+  def getAttachment(self, docID, name):
+    """
+    Get json attachment of document, e.g. revision
+
+    Args:
+        docID (string): id of document
+        name (string): name of attachment
+
+    Returns:
+        dict: content of attachment
+
+    Raises:
+        KeyError: if attachment does not exist
+    """
+    row = self.connection.execute('SELECT content FROM revisions WHERE id=? AND name=?', (docID, name)).fetchone()
+    if row is None:
+      raise KeyError(docID+'/'+name)
+    return json.loads(row[0])
+
+
+  def docCount(self):
+    """
+    Returns:
+        int: number of documents incl. ontology
+    """
+    return self.connection.execute('SELECT count(*) FROM docs').fetchone()[0]
+
+
+  def warmViews(self):
+    """
+    Views are updated with each write: nothing to do
+    """
+    return
+
+
+  def viewProgress(self):
+    """
+    Returns:
+      dict: empty, since views are updated with each write
+    """
+    return {}
+
+
+  def saveView(self, designName, viewCode, wait=None):  # pylint: disable=unused-argument
+    """
+    Design documents do not exist: views are defined with initViews
+    """
+    print('**ERROR dsq05: design documents not supported for SQLite databases: use initViews |',designName)
+    return
+
+
+  def saveUpdates(self, designName, updates):  # pylint: disable=unused-argument
+    """
+    Update handlers do not exist: updateBranch runs in python
+    """
+    print('**ERROR dsq06: update handlers not supported for SQLite databases |',designName)
+    return
+
+
+  def finishViews(self, wait=True):  # pylint: disable=unused-argument
+    """
+    No staged design documents: views are updated with each write
+
+    Args:
+        wait (bool): swap now and wait until done
+
+    Returns:
+        bool: False, nothing to swap
+    """
+    return False
+
+
+  def runAsync(self, function, concurrency=8):  # pylint: disable=unused-argument
+    """
+    Asynchronous requests are not supported: reads are local and fast, use the synchronous methods
+
+    Args:
+        function (function): gets AsyncDatabase and returns awaitable
+        concurrency (int): maximum number of requests at the same time
+
+    Returns:
+        None: nothing is run
+    """
+    print('**ERROR dsq07: asynchronous requests not supported for SQLite databases')
+    return None
+
+
+  def historyDB(self, docs=None):
+    """
+    Collect last modification days of documents, see Database.historyDB
+
+    Args:
+        docs (iterable): documents; None=all documents of database
+
+    Returns:
+        dict: docType: histogram of modification dates; '-bins-': dates of bins; '-score-': docType: score
+    """
+    if docs is None:
+      docs = (json.loads(doc) for (doc,) in self.connection.execute('SELECT doc FROM docs'))
+    return super().historyDB(docs)
+
+
+  def checkDB(self, verbose=True, **kwargs):
+    """
+    Check database for consistencies, see Database.checkDB
+    - repair mode is not supported
+
+    Args:
+        verbose (bool): print more or only issues
+        kwargs (dict): additional parameter
+
+    Returns:
+        string: output
+    """
+    if kwargs.get('repair', False):
+      print('**Warning dsq03: repair mode not supported for SQLite databases: only check')
+    return super().checkDB(verbose, **dict(kwargs, repair=False))
+
+
+  def replicateDB(self, dbInfo, removeAtStart=False):
+    """
+    Replication to CouchDB: push all documents with their revisions (new_edits=false)
+    - history of revisions is kept: later replications continue it
+    - views of remote database are created, when PASTA opens it
+
+    Args:
+        dbInfo (dict): info on the remote database: url, user, password, database
+        removeAtStart (bool): remove remote DB before starting new
+
+    Returns:
+        bool: success
+    """
+    import base64
+    from transport import Transport
+    try:
+      session = Transport().session
+      session.auth = (dbInfo['user'], dbInfo['password'])
+      url = dbInfo['url'].rstrip('/')+'/'+dbInfo['database']
+      if removeAtStart:
+        session.delete(url)
+      if session.head(url).status_code==404:
+        session.put(url).raise_for_status()
+      numDocs = 0
+      rows = self.iterView('_all_docs', includeDocs=True)
+      while True:
+        batch = [row['doc'] for _, row in zip(range(500), rows)]
+        if len(batch)==0:
+          break
+        missing = session.post(url+'/_revs_diff', json={doc['_id']:[doc['_rev']] for doc in batch})
+        missing.raise_for_status()
+        docs = []
+        for doc in [i for i in batch if i['_id'] in missing.json()]:
+          deltas = self.revisionDeltas(doc['_id'])
+          revs = [doc['_rev']]  #known revisions, newest first: as long as their numbers are consecutive
+          for delta in reversed(deltas):
+            previous = [i['value'] for i in delta if i['path']=='/_rev'] if isinstance(delta, list) else []
+            if not previous or int(previous[0].split('-')[0])!=int(revs[-1].split('-')[0])-1:
+              break
+            revs.append(previous[0])
+          doc['_revisions'] = {'start':int(doc['_rev'].split('-')[0]), 'ids':[i.split('-')[1] for i in revs]}
+          for idx, delta in enumerate(deltas):
+            doc.setdefault('_attachments', {})['v'+str(idx)+'.json'] = {'content_type':'application/json-patch+json',
+              'data':base64.b64encode(json.dumps(delta).encode('utf-8')).decode('ascii')}
+          docs.append(doc)
+        if docs:
+          session.post(url+'/_bulk_docs', json={'docs':docs, 'new_edits':False}).raise_for_status()
+        numDocs += len(docs)
+      print('Replication success: '+str(numDocs)+' documents pushed.')
+      return True
+    except:
+      print("**ERROR drp02: replicate error |\n",traceback.format_exc())
+      return False
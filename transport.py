@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+""" HTTP transport of all CouchDB traffic: one session per server with
+- keep-alive connection pool
+- default timeouts: connect, read
+- retry with increasing wait after connection errors and 502/503/504; after read errors and 502/503/504 only
+  reads (GET, HEAD, OPTIONS): a PUT that timed out might have been saved and would conflict with itself
+- latency statistics per endpoint, e.g. 'GET /{db}/_design/viewDocType/_view/x0'
+"""
+import threading
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class TimeoutAdapter(HTTPAdapter):
+  """
+  Adapter with connection pool, retry and default timeout
+  """
+  def __init__(self, timeout, **kwargs):
+    """
+    Args:
+      timeout (tuple): seconds to connect, seconds to read
+      kwargs (dict): arguments of HTTPAdapter
+    """
+    self.timeout = timeout
+    super().__init__(**kwargs)
+
+  def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+    """
+    Send request: default timeout if none given
+    """
+    if kwargs.get('timeout') is None:
+      kwargs['timeout'] = self.timeout
+    return super().send(request, **kwargs)
+
+
+def endpoint(method, url):
+  """
+  Name of endpoint: database and document ids are replaced, names of views are kept
+
+  Args:
+    method (string): http method
+    url (string): url
+
+  Returns:
+    string: method and path
+  """
+  parts = [i for i in urlsplit(url).path.split('/') if i]
+  path = []
+  for idx, part in enumerate(parts):
+    if part.startswith('_') or (idx>0 and parts[idx-1] in ('_design','_view','_update')):
+      path.append(part)
+    else:
+      path.append('{db}' if idx==0 else '{id}')
+  return method+' /'+'/'.join(path)
+
+
+class Transport:
+  """
+  Configure session for CouchDB and collect its latency statistics
+  """
+  def __init__(self, session=None, timeout=(5, 300), retries=3, backoff=0.2, poolSize=16):
+    """
+    Args:
+      session (Session): session to configure, e.g. of cloudant client; None=new session
+      timeout (tuple): seconds to connect, seconds to read; read can be long, while views are built
+      retries (int): number of retries
+      backoff (float): wait before retries: backoff, 2*backoff, 4*backoff,... seconds
+      poolSize (int): number of connections kept open
+    """
+    if session is None:
+      import requests
+      session = requests.Session()
+    retry = Retry(total=retries, connect=retries, read=retries, backoff_factor=backoff,
+                  status_forcelist=(502, 503, 504), allowed_methods=frozenset(['GET','HEAD','OPTIONS']),
+                  raise_on_status=False)
+    adapter = TimeoutAdapter(timeout, pool_connections=poolSize, pool_maxsize=poolSize, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.hooks['response'].append(self.record)
+    self.session = session
+    self.stats = {}  #endpoint: [number of requests, sum of seconds, max. seconds]
+    self.lock = threading.Lock()
+
+
+  def record(self, response, *args, **kwargs):  # pylint: disable=unused-argument
+    """
+    Hook of session: add time until response to statistics
+
+    Args:
+      response (Response): response
+    """
+    name = endpoint(response.request.method, response.request.url)
+    seconds = response.elapsed.total_seconds()
+    with self.lock:
+      entry = self.stats.setdefault(name, [0, 0.0, 0.0])
+      entry[0] += 1
+      entry[1] += seconds
+      entry[2] = max(entry[2], seconds)
+    return response
+
+
+  def report(self):
+    """
+    Returns:
+      string: latency statistics per endpoint incl. \n
+    """
+    with self.lock:
+      stats = dict(self.stats)
+    output = f'{"Endpoint": <60}|{"Number": >7}|{"Mean [ms]": >10}|{"Max [ms]": >10}\n'
+    output += '-'*90+'\n'
+    for name in sorted(stats, key=lambda i: stats[i][1], reverse=True):
+      number, seconds, maximum = stats[name]
+      output += f'{name[:60]: <60}|{number: >7}|{seconds/number*1000: >10.1f}|{maximum*1000: >10.1f}\n'
+    return output
@@ -0,0 +1,82 @@
+function(doc, req) {
+  function same(a, b) {
+    if (a===b) { return true; }
+    if (a===null || b===null || typeof a!=='object' || typeof b!=='object') { return false; }
+    var keysA = Object.keys(a), keysB = Object.keys(b);
+    if (Array.isArray(a)!==Array.isArray(b) || keysA.length!==keysB.length) { return false; }
+    return keysA.every(function(key) { return key in b && same(a[key], b[key]); });
+  }
+  function basename(path) { return path.split('/').pop(); }
+  function base64(text) {
+    var chars = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/';
+    var bytes = unescape(encodeURIComponent(text)), out = '';
+    for (var i=0; i<bytes.length; i+=3) {
+      var n = (bytes.charCodeAt(i)<<16) | ((bytes.charCodeAt(i+1)||0)<<8) | (bytes.charCodeAt(i+2)||0);
+      out += chars[(n>>18)&63] + chars[(n>>12)&63];
+      out += i+1<bytes.length ? chars[(n>>6)&63] : '=';
+      out += i+2<bytes.length ? chars[n&63] : '=';
+    }
+    return out;
+  }
+  if (!doc) { return [null, {code:404, json:{error:'document missing'}}]; }
+  var change = JSON.parse(req.body), oldDoc = {}, changed = false;
+  var previous = JSON.parse(JSON.stringify(doc));
+  var branch = change['-branch'];
+  if (branch && branch.stack.length>0) {
+    var op = branch.op, oldpath = ('oldpath' in branch) ? branch.oldpath : null;
+    delete branch.op;
+    delete branch.oldpath;
+    if (branch.path===null) { branch.path = doc['-branch'][0].path; }
+    if (!doc['-branch'].some(function(item) { return same(item, branch); })) {
+      oldDoc['-branch'] = previous['-branch'];
+      doc['-branch'].forEach(function(item) { if (op==='c' && item.path===branch.path) { op = 'u'; } });
+      if (op==='c') {
+        doc['-branch'].push(branch);
+        changed = true;
+      } else if (op==='u') {
+        if (oldpath!==null) {
+          for (var i=0; i<doc['-branch'].length; i++) {
+            var item = doc['-branch'][i];
+            if (item.path!==null && item.path.indexOf(oldpath)===0) {
+              if (basename(item.path)===doc['-name'] && basename(branch.path)!=='') {
+                oldDoc['-name'] = doc['-name'];
+                doc['-name'] = basename(branch.path);
+              }
+              item.path  = item.path.split(oldpath).join(branch.path);
+              item.stack = branch.stack;
+              break;
+            }
+          }
+        } else {
+          doc['-branch'][0] = branch;
+        }
+        changed = true;
+      } else if (op==='d') {
+        var length = doc['-branch'].length;
+        doc['-branch'] = doc['-branch'].filter(function(item) { return item.path!==branch.path; });
+        changed = length!==doc['-branch'].length;
+      } else {
+        return [null, {code:400, json:{error:'unknown operation '+op}}];
+      }
+    }
+  }
+  for (var key in change) {
+    if (key==='_id' || key==='_rev' || key==='-branch' || change[key]===null || !(key in doc)) { continue; }
+    if (key==='-type' && change[key]==='--') { continue; }
+    if (key==='image' && change[key]==='') { continue; }
+    if (!same(change[key], doc[key])) {
+      if (['-date','-client','-user'].indexOf(key)<0) { changed = true; }
+      oldDoc[key] = key==='image' ? 'image changed' : previous[key];
+      doc[key] = change[key];
+    }
+  }
+  if (!changed) { return [null, {json:{ok:true, changed:false}}]; }
+  var patch = Object.keys(oldDoc).map(function(key) {
+    return {op:'replace', path:'/'+key.replace(/~/g,'~0').replace(/\//g,'~1'), value:oldDoc[key]};
+  });
+  patch.push({op:'replace', path:'/_rev', value:doc._rev});
+  doc._attachments = doc._attachments || {};
+  doc._attachments['v'+Object.keys(doc._attachments).length+'.json'] =
+    {content_type:'application/json-patch+json', data:base64(JSON.stringify(patch))};
+  return [doc, {json:{ok:true, changed:true}}];
+}